@@ -0,0 +1,42 @@
+# ability_ratings.py
+# ハンドブックの「能力測定」(物理強度/戦場機動/...) の評価を扱うモジュール
+# populate_db.py (評価を数値にして *_rank カラムに保存) とボット側の表示・並べ替えの両方でここの定義を使うこと！
+import re
+
+# (カラム名, 能力測定での項目名) ※ この対応は populate_db.py / 表示 / ランキングで共通
+ABILITY_COLUMNS = (
+    ("physical_strength", "物理強度"),
+    ("mobility", "戦場機動"),
+    ("endurance", "生理的耐性"),
+    ("tactical_acumen", "戦術立案"),
+    ("combat_skill", "戦闘技術"),
+    ("arts_adaptability", "アーツ適性"),
+)
+
+# 数値にした評価を入れるカラム (元の文字列は ABILITY_COLUMNS のカラムにそのまま残す)
+RANK_COLUMNS = tuple(f"{column}_rank" for column, _ in ABILITY_COLUMNS)
+
+# 評価 -> 順位 (大きいほど高評価)。■■ (検閲) や ―― (測定不能) は順位を付けられないので None
+RATING_LEVELS = {
+    "欠落": 1,
+    "普通": 2,
+    "標準": 3,
+    "優秀": 4,
+    "卓越": 5,
+}
+
+# '卓越（追記を参照）' の括弧書きを取り除く
+_NOTE_PATTERN = re.compile(r"[（(].*?[）)]")
+
+
+def parse_rating(text: str) -> int | None:
+    """能力測定の評価の文字列を順位 (1〜5) にする
+
+    '普通/■■' や '標準/優秀' のように複数書かれている場合は、読み取れた中で一番高い評価を使う。
+    例: '優秀' → 4, '卓越（追記を参照）' → 5, '普通/■■' → 2, '■■' → None
+    """
+    if not text:
+        return None
+    text = _NOTE_PATTERN.sub("", text)
+    levels = [RATING_LEVELS[part.strip()] for part in re.split(r"[/／]", text) if part.strip() in RATING_LEVELS]
+    return max(levels) if levels else None
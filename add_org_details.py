@@ -1,6 +1,7 @@
 # add_org_details.py
 import sqlite3
 import os
+from create_db import bump_data_version # 起動中のボットに再読み込みさせるため
 
 # データベースファイルのパス (my_bot フォルダにあるはず)
 DB_PATH = os.path.join(os.path.dirname(__file__), 'arknights_data.db')
@@ -830,6 +831,7 @@ try:
         update_count += cursor.rowcount # 更新された行数をカウント
 
     print(f"organizations テーブルに {update_count} 件の詳細データを追記/更新しました。")
+    print(f"データバージョン: {bump_data_version(cursor)}")
 
     # 変更を保存
     conn.commit()
@@ -0,0 +1,527 @@
+# arknights_catalog.py
+# アークナイツのオペレーター/組織データを起動時に一度だけ読み込んで、メモリ上で検索するためのカタログ
+# データが変わるのは populate_db.py を実行した時だけなので、コマンドのたびに SQLite を開く必要はない
+import sqlite3
+import unicodedata
+from collections import Counter, defaultdict
+import numpy as np
+from name_normalize import normalize_name # 表記ゆれ (半角/ひらがな/長音など) を吸収する正規化
+from ability_ratings import ABILITY_COLUMNS, RANK_COLUMNS, parse_rating # 能力測定のカラムと評価の数値化
+from operator_similarity import SimilarityIndex # /similar 用の類似度行列
+from effect_index import EFFECT_SLOTS, EffectIndex, normalize_text # /effect_search 用の転置インデックス
+from operator_locales import DEFAULT_LOCALE, OPERATOR_LOCALES_TABLE # 日本語以外の名前
+from recruitment import RecruitIndex # /recruit 用の公開求人のビットマスク
+from operator_dps import DpsTable # /dps 用のステータスとスキル倍率の配列
+from material_planner import MaterialPlanner # /materials 用の素材のレシピと育成素材
+from stage_drops import load_farm_items # /farm 用のドロップのある素材
+from enemies import ENEMIES_TABLE, ENEMY_COLUMNS # /enemy・GeminiChat 用の敵
+
+OPERATORS_TABLE = "operators"
+ORGANIZATIONS_TABLE = "organizations"
+
+# operators テーブルのカラム (create_db.py と合わせる)
+OPERATOR_COLUMNS = (
+    "name", "char_id", "rarity", "operator_class", "archetype", "affiliation", "team", "race", "birthplace",
+    "physical_strength", "combat_skill", "mobility", "endurance", "tactical_acumen", "arts_adaptability",
+    *RANK_COLUMNS,
+    "profile_summary", "lore_notes",
+    "skill1_name", "skill1_desc", "skill2_name", "skill2_desc", "skill3_name", "skill3_desc",
+    "talent1_name", "talent1_desc", "talent2_name", "talent2_desc",
+)
+
+# organizations テーブルのカラム
+ORGANIZATION_COLUMNS = ("id", "name", "type", "description", "lore", "color", "order_num")
+
+# /compare で並べる項目 (カラム名, 表示名)。カタログ読み込み時に表示用の文字列にしておく
+COMPARE_FIELDS = (
+    ("rarity", "レア"), ("operator_class", "クラス"), ("archetype", "職分"),
+    *ABILITY_COLUMNS,
+    ("skill1_name", "S1"), ("skill2_name", "S2"), ("skill3_name", "S3"),
+)
+
+# *_rank が入っていない古いDBでは、能力測定が別のカラムに保存されていた (正しいカラム -> 古いDBでのカラム)
+LEGACY_ABILITY_COLUMNS = {
+    "mobility": "combat_skill",      # 戦場機動
+    "endurance": "mobility",         # 生理的耐性
+    "tactical_acumen": "endurance",  # 戦術立案
+    "combat_skill": "tactical_acumen", # 戦闘技術
+}
+
+# Discord のオートコンプリートで返せる候補の最大数
+AUTOCOMPLETE_LIMIT = 25
+
+# メッセージ中の敵の名前を探す時の最短の名前の長さ (正規化後)
+# 通常の敵には「兵士」「猟犬」のような普通の単語と同じ短い名前が多いので、ボス・精鋭より長い名前だけにする
+ENEMY_MENTION_MIN_LENGTH = 4
+ENEMY_MENTION_MIN_LENGTHS = {"BOSS": 2, "ELITE": 2}
+
+# /operators で絞り込みに使えるカラム
+FACETS = ("rarity", "operator_class", "archetype", "affiliation", "race")
+
+
+def _select_list(conn, table, columns):
+    """テーブルに実在するカラムだけを SELECT 句用に並べる"""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    return ", ".join(column for column in columns if column in existing)
+
+
+class _Record:
+    """sqlite3.Row と同じように record['カラム名'] でもアクセスできる軽量レコード"""
+    __slots__ = ()
+
+    def __init__(self, row):
+        available = row.keys()
+        for column in self.__slots__:
+            # populate_db.py を再実行していない古いDBには無いカラムもあるので、その場合は None
+            setattr(self, column, row[column] if column in available else None)
+
+    def __getitem__(self, column):
+        return getattr(self, column)
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def with_overrides(self, values: dict):
+        """values (カラム -> 値) で上書きしたコピーを返す (None の値と無いカラムは元のまま)"""
+        record = self.__class__.__new__(self.__class__)
+        for column in self.__slots__:
+            value = values.get(column)
+            setattr(record, column, getattr(self, column) if value is None else value)
+        return record
+
+
+class OperatorRecord(_Record):
+    """operators テーブル1行分 (__slots__ でメモリを節約)"""
+    __slots__ = OPERATOR_COLUMNS
+
+
+class OrganizationRecord(_Record):
+    """organizations テーブル1行分"""
+    __slots__ = ORGANIZATION_COLUMNS
+
+
+class EnemyRecord(_Record):
+    """enemies テーブル1行分 (def は予約語なので record['def'] で読むこと)"""
+    __slots__ = ENEMY_COLUMNS
+
+
+def _mention_form(text: str) -> str:
+    """メッセージ中の名前探し用の表記 (全角/半角と大文字小文字だけそろえる)
+
+    normalize_name() はひらがなをカタカナにして長音も消すので、「スカルシュレッダーについて」の
+    「について」が名前の続きに見えてしまう。文字の種類で区切りを判定するため、ここでは元の文字を残す。
+    """
+    return unicodedata.normalize('NFKC', text or "").casefold()
+
+
+def _char_kind(char: str):
+    """区切りの判定用の文字の種類 (英数字 / カタカナ / ひらがな / 漢字など。記号・空白は None)"""
+    if char.isascii():
+        return "latin" if char.isalnum() else None
+    code = ord(char)
+    if 0x30A1 <= code <= 0x30FA or code == 0x30FC: # カタカナと長音 (中黒は区切り)
+        return "katakana"
+    if 0x3041 <= code <= 0x309F:
+        return "hiragana"
+    return "word" if char.isalnum() else None
+
+
+def _bigrams(text: str) -> set:
+    """文字 bigram の集合 (1文字の場合はその文字だけ)"""
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {} # 文字 -> _TrieNode
+        self.ids = [] # この接頭辞を持つ名前のID (上限 AUTOCOMPLETE_LIMIT 件まで、名前順)
+
+
+class NameIndex:
+    """オートコンプリート用の名前インデックス (接頭辞トライ + 文字 bigram の転置インデックス)
+
+    構築時に全部計算しておくので、キー入力ごとの問い合わせは辞書を数回引くだけで終わる。
+    """
+
+    def __init__(self, names, limit: int = AUTOCOMPLETE_LIMIT):
+        self.limit = limit
+        self.names = sorted(set(filter(None, names)))
+        self.keys = [normalize_name(name) for name in self.names]
+
+        # 接頭辞トライ: 各ノードに「その接頭辞で始まる名前」の先頭 limit 件を持たせる
+        self.root = _TrieNode()
+        for name_id, key in enumerate(self.keys):
+            node = self.root
+            if len(node.ids) < limit:
+                node.ids.append(name_id)
+            for char in key:
+                node = node.children.setdefault(char, _TrieNode())
+                if len(node.ids) < limit:
+                    node.ids.append(name_id)
+
+        # bigram -> 名前IDのリスト (途中一致・表記ゆれ用)
+        self.postings = defaultdict(list)
+        for name_id, key in enumerate(self.keys):
+            for gram in _bigrams(key):
+                self.postings[gram].append(name_id)
+
+    def _prefix_ids(self, key: str) -> list:
+        node = self.root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.ids
+
+    def complete(self, text: str) -> list:
+        """入力途中の文字列から候補名を最大 limit 件返す (接頭辞一致 → bigram の一致数が多い順)"""
+        key = normalize_name(text)
+        result_ids = list(self._prefix_ids(key))
+        if len(result_ids) >= self.limit or not key:
+            return [self.names[i] for i in result_ids[:self.limit]]
+
+        # 接頭辞で足りない分は、共有する bigram の数で並べて補う
+        query_grams = _bigrams(key)
+        scores = Counter()
+        for gram in query_grams:
+            for name_id in self.postings.get(gram, ()):
+                scores[name_id] += 1
+        seen = set(result_ids)
+        ranked = sorted(
+            (name_id for name_id in scores if name_id not in seen),
+            key=lambda i: (-scores[i] / len(query_grams), abs(len(self.keys[i]) - len(key)), self.names[i]),
+        )
+        result_ids.extend(ranked[:self.limit - len(result_ids)])
+        return [self.names[i] for i in result_ids]
+
+
+class FacetIndex:
+    """/operators の絞り込み用のビットマップインデックス
+
+    オペレーターを表示順 (レアリティ降順 → 名前順) に並べ、その位置をビット番号として
+    「カラムの値ごとに該当するオペレーターのビットを立てた int」を持っておく。
+    複数条件の絞り込みは int の AND、件数は bit_count() だけで求まるので、テーブルを走査しなくて済む。
+    """
+
+    def __init__(self, records, facets=FACETS):
+        self.facets = facets
+        self.records = sorted(records, key=lambda r: (-(r.rarity or 0), r.name or "", r.char_id or ""))
+        self.all_mask = (1 << len(self.records)) - 1
+        self.bitmaps = {facet: {} for facet in facets} # カラム -> 値 -> ビットマップ
+        self.value_keys = {facet: {} for facet in facets} # カラム -> 正規化した値 -> 元の値
+        for position, record in enumerate(self.records):
+            bit = 1 << position
+            for facet in facets:
+                value = record[facet]
+                if value is None or value == "":
+                    continue
+                bitmaps = self.bitmaps[facet]
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+                self.value_keys[facet].setdefault(normalize_name(str(value)), value)
+
+    def resolve(self, facet: str, value):
+        """入力された値 (表記ゆれ可) をインデックス上の値に直す (無ければ None)"""
+        return self.value_keys[facet].get(normalize_name(str(value)))
+
+    def mask(self, filters: dict) -> int:
+        """{カラム: 値} の条件をすべて満たすオペレーターのビットマップ (値が None の条件は無視)"""
+        mask = self.all_mask
+        for facet, value in filters.items():
+            if value is None or value == "":
+                continue
+            mask &= self.bitmaps[facet].get(self.resolve(facet, value), 0)
+        return mask
+
+    def counts(self, facet: str, filters: dict) -> list:
+        """facet 以外の条件で絞り込んだ時の、facet の値ごとの件数 [(値, 件数), ...] (件数の多い順)"""
+        base = self.mask({key: value for key, value in filters.items() if key != facet})
+        counts = [(value, (base & bitmap).bit_count()) for value, bitmap in self.bitmaps[facet].items()]
+        return sorted((item for item in counts if item[1]), key=lambda item: (-item[1], str(item[0])))
+
+    def page(self, mask: int, start: int, limit: int):
+        """ビット位置 start 以降のオペレーターを最大 limit 件返す (キーセット方式のページング)
+
+        戻り値は (レコードのリスト, 次のページの start)。次のページが無ければ start は None。
+        """
+        results = []
+        remaining = mask >> start
+        position = start
+        while remaining and len(results) < limit:
+            skip = (remaining & -remaining).bit_length() - 1 # 一番下の立っているビットまで飛ばす
+            position += skip
+            results.append(self.records[position])
+            remaining >>= skip + 1
+            position += 1
+        return results, (position if remaining else None)
+
+
+class AbilityMatrix:
+    """能力測定の順位を NumPy の配列にまとめたもの (/ranking 用)
+
+    ranks[i, j] は i 番目のオペレーターの ABILITY_COLUMNS[j] の順位 (1〜5、不明は 0)。
+    「先鋒の中で戦場機動が高い順」のような問い合わせは、配列の比較とソートだけで終わる。
+    """
+
+    def __init__(self, records):
+        self.records = list(records)
+        self.columns = [column for column, _ in ABILITY_COLUMNS]
+        self.ranks = np.array(
+            [[record[f"{column}_rank"] or 0 for column in self.columns] for record in self.records],
+            dtype=np.int8,
+        ).reshape(len(self.records), len(self.columns))
+        self.rarity = np.array([record.rarity or 0 for record in self.records], dtype=np.int8)
+        # クラスは番号にしておく (文字列の配列より比較が速い)
+        self.class_names = sorted({record.operator_class for record in self.records if record.operator_class})
+        self.class_codes = {normalize_name(name): code for code, name in enumerate(self.class_names)}
+        self.classes = np.array(
+            [self.class_codes.get(normalize_name(record.operator_class or ""), -1) for record in self.records],
+            dtype=np.int16,
+        )
+
+    def top(self, column: str, limit: int, operator_class: str = None, minimum: int = 1) -> list:
+        """column の順位が minimum 以上のオペレーターを順位の高い順 (同順位はレアリティ順) に最大 limit 件返す
+
+        戻り値は [(OperatorRecord, 順位), ...]。operator_class を指定するとそのクラスだけに絞る。
+        """
+        values = self.ranks[:, self.columns.index(column)]
+        mask = values >= max(minimum, 1)
+        if operator_class:
+            code = self.class_codes.get(normalize_name(operator_class))
+            if code is None:
+                return []
+            mask &= self.classes == code
+        candidates = np.flatnonzero(mask)
+        # np.lexsort は最後のキーが第1キー。符号を反転して降順にする (同点は records の並び順のまま)
+        order = np.lexsort((-self.rarity[candidates], -values[candidates].astype(np.int16)))
+        return [(self.records[i], int(values[i])) for i in candidates[order[:limit]]]
+
+
+class OperatorCatalog:
+    """operators / organizations テーブル全体を保持し、正規化した名前で引けるようにしたもの"""
+
+    def __init__(self, operators, organizations, localized_names=(), farm_items=(), enemies=()):
+        # 正規化名 -> OperatorRecord のリスト (同名の別バージョンがあるので複数になりうる)
+        # char_id 順に並べるので、'char_002_amiya' のような元のオペレーターが先頭に来る
+        self.operators = {}
+        self.records = sorted(operators, key=lambda r: r.char_id or "")
+        for record in self.records:
+            self.operators.setdefault(normalize_name(record.name), []).append(record)
+        self.operators_by_id = {record.char_id: record for record in operators if record.char_id}
+
+        # 英語・中国語・韓国語の正規化名 -> OperatorRecord のリスト (日本語名と一致しない時だけ使う)
+        self.aliases = {}
+        alias_names = set()
+        for char_id, name in sorted(localized_names):
+            record = self.operators_by_id.get(char_id)
+            key = normalize_name(name)
+            if record is None or not key or key in self.operators:
+                continue
+            records = self.aliases.setdefault(key, [])
+            if record not in records:
+                records.append(record)
+            alias_names.add(name)
+
+        self.organizations = {} # 正規化した日本語名・ID -> OrganizationRecord
+        for record in organizations:
+            if record.name:
+                self.organizations.setdefault(normalize_name(record.name), record)
+        for record in organizations:
+            # ID ('ursus' など) でも引けるようにする (日本語名と衝突した場合は日本語名を優先)
+            if record.id:
+                self.organizations.setdefault(normalize_name(record.id), record)
+
+        # /search・/faction のオートコンプリート用
+        self.name_index = NameIndex([records[0].name for records in self.operators.values()] + sorted(alias_names))
+        self.organization_index = NameIndex(record.name for record in organizations)
+        # /farm 用: ドロップするステージがある素材の正規化名 -> (item_id, 名前) とオートコンプリート
+        self.farm_items = {}
+        for item_id, name in farm_items:
+            self.farm_items.setdefault(normalize_name(name), (item_id, name))
+        self.farm_item_index = NameIndex(name for _, name in self.farm_items.values())
+        # /enemy・GeminiChat 用: 正規化した敵の名前 -> EnemyRecord のリスト (図鑑の並び順)
+        self.enemies = {}
+        for record in sorted(enemies, key=lambda r: (r.sort_id is None, r.sort_id or 0, r.enemy_id)):
+            self.enemies.setdefault(record.name_key or normalize_name(record.name), []).append(record)
+        self.enemy_index = NameIndex(records[0].name for records in self.enemies.values())
+        # メッセージ中の敵の名前探し用: 表記 (_mention_form) -> 正規化名
+        # 長い名前から順に調べて、短い名前が長い名前の一部として引っかからないようにする
+        self._enemy_mentions = {}
+        for key, records in self.enemies.items():
+            min_length = min(ENEMY_MENTION_MIN_LENGTHS.get(record.enemy_level, ENEMY_MENTION_MIN_LENGTH) for record in records)
+            if len(key) >= min_length:
+                for record in records:
+                    self._enemy_mentions.setdefault(_mention_form(record.name), key)
+        self._enemy_mention_names = sorted(self._enemy_mentions, key=len, reverse=True)
+        # /operators の絞り込み用
+        self.facets = FacetIndex(self.records)
+        # /ranking 用
+        self.abilities = AbilityMatrix(self.records)
+        # /similar・/effect_search・/recruit・/dps・/materials 用 (from_connection() で読み込む。古いDBでは None)
+        self.similarity = None
+        self.effects = None
+        self.recruit = None
+        self.dps = None
+        self.materials = None
+        # /compare 用: OperatorRecord -> COMPARE_FIELDS の順に並べた表示用の値のタプル
+        # (古いDBでは char_id が無いので、レコードそのものをキーにする)
+        self.compare_rows = {
+            record: tuple("-" if record[column] in (None, "", "N/A") else str(record[column]) for column, _ in COMPARE_FIELDS)
+            for record in self.records
+        }
+
+    @classmethod
+    def from_connection(cls, conn: sqlite3.Connection) -> "OperatorCatalog":
+        """開いている接続から両テーブルを丸ごと読み込んでカタログを作る (起動時に1回だけ呼ぶ想定)"""
+        conn.row_factory = sqlite3.Row
+        operator_rows = conn.execute(
+            f"SELECT {_select_list(conn, OPERATORS_TABLE, OPERATOR_COLUMNS)} FROM {OPERATORS_TABLE}"
+        ).fetchall()
+        organization_rows = conn.execute(
+            f"SELECT {_select_list(conn, ORGANIZATIONS_TABLE, ORGANIZATION_COLUMNS)} FROM {ORGANIZATIONS_TABLE}"
+        ).fetchall()
+
+        operators = [OperatorRecord(row) for row in operator_rows]
+        if operators and all(record[column] is None for record in operators for column in RANK_COLUMNS):
+            # populate_db.py を再実行していない古いDB: 能力測定を正しいカラムに入れ直して、順位もここで計算する
+            # (create_db.py が *_rank カラムを足しただけのDBもあるので、カラムの有無ではなく中身が全部 NULL かで見る。
+            #  populate_db.py を実行したDBでは、■■ などで NULL になるのは一部のオペレーターだけ)
+            for record in operators:
+                legacy_values = {column: record[legacy] for column, legacy in LEGACY_ABILITY_COLUMNS.items()}
+                for column, value in legacy_values.items():
+                    setattr(record, column, value)
+                for column, _ in ABILITY_COLUMNS:
+                    setattr(record, f"{column}_rank", parse_rating(record[column]))
+
+        try:
+            # どの言語の名前でも引けるように、日本語以外の名前だけ読み込んでおく (本文は /search の時に DB から引く)
+            localized_names = [
+                (row[0], row[1]) for row in conn.execute(
+                    f"SELECT char_id, name FROM {OPERATOR_LOCALES_TABLE} WHERE locale != ?", (DEFAULT_LOCALE,)
+                )
+            ]
+        except sqlite3.OperationalError:
+            localized_names = [] # populate_db.py を再実行していない古いDB
+
+        catalog = cls(
+            operators,
+            [OrganizationRecord(row) for row in organization_rows],
+            localized_names,
+            load_farm_items(conn),
+            cls._load_enemies(conn),
+        )
+        catalog.similarity = SimilarityIndex.from_connection(conn)
+        catalog.effects = EffectIndex.from_connection(conn)
+        catalog.recruit = RecruitIndex.from_connection(conn, catalog.operators_by_id)
+        catalog.dps = DpsTable.from_connection(conn, catalog.records)
+        catalog.materials = MaterialPlanner.from_connection(conn)
+        print(f"✅ オペレーターカタログを読み込みました: オペレーター {len(catalog)} 件 / 組織 {len(organization_rows)} 件 / 他言語の名前 {len(catalog.aliases)} 件 / 敵 {len(catalog.enemies)} 件")
+        return catalog
+
+    @staticmethod
+    def _load_enemies(conn) -> list:
+        """enemies テーブルを読み込む (テーブルが無い古いDBでは空)"""
+        try:
+            return [
+                EnemyRecord(row) for row in conn.execute(
+                    f"SELECT {_select_list(conn, ENEMIES_TABLE, ENEMY_COLUMNS)} FROM {ENEMIES_TABLE}"
+                )
+            ]
+        except sqlite3.OperationalError:
+            return [] # populate_db.py を再実行していない古いDB
+
+    @classmethod
+    def load(cls, db_path: str) -> "OperatorCatalog":
+        """DBファイルを開いてカタログを作る"""
+        conn = sqlite3.connect(db_path)
+        try:
+            return cls.from_connection(conn)
+        finally:
+            conn.close()
+
+    def find_operator(self, name: str):
+        """名前 (日本語・英語・中国語・韓国語) からオペレーターを探す (同名が複数いる場合は char_id が最初のもの。見つからなければ None)"""
+        records = self.find_operators(name)
+        return records[0] if records else None
+
+    def find_operators(self, name: str) -> list:
+        """名前が一致するオペレーターを全員返す (同名の別バージョンを含む。日本語名を優先)"""
+        key = normalize_name(name)
+        return list(self.operators.get(key) or self.aliases.get(key, ()))
+
+    def find_operator_batch(self, names) -> list:
+        """複数の名前をまとめて引く (見つからなかった名前は None)"""
+        return [self.find_operator(name) for name in names]
+
+    def search_effects(self, query: str) -> list:
+        """スキル・素質の説明文に query を含むものを [(OperatorRecord, 表示名, スキル/素質名, 説明文), ...] で返す
+
+        転置インデックスで候補を絞ってから、本当に query を含むかを説明文で確認する。
+        """
+        if not self.effects:
+            return []
+        labels = dict(EFFECT_SLOTS)
+        key = normalize_text(query)
+        results = []
+        for doc_id in self.effects.candidates(query):
+            char_id, slot = self.effects.docs[doc_id]
+            record = self.operators_by_id.get(char_id)
+            if record is None:
+                continue
+            desc = record[f"{slot}_desc"] or ""
+            if key in normalize_text(desc):
+                results.append((record, labels[slot], record[f"{slot}_name"], desc))
+        return results
+
+    def find_farm_item(self, name: str):
+        """素材名 (表記ゆれ可) から (item_id, 名前) を返す (ドロップするステージが無い素材・見つからない場合は None)"""
+        return self.farm_items.get(normalize_name(name))
+
+    def find_enemy(self, name: str):
+        """敵の名前 (表記ゆれ可) から EnemyRecord を返す (同名が複数いる場合は図鑑の並び順で最初のもの。無ければ None)"""
+        records = self.enemies.get(normalize_name(name))
+        return records[0] if records else None
+
+    def enemies_in_text(self, text: str, limit: int = 3) -> list:
+        """文章 (チャットのメッセージなど) に名前が出てくる敵を長い名前から順に最大 limit 体返す
+
+        名前の前後が同じ種類の文字 (カタカナの名前の直後のカタカナなど) の場合は、別の単語の一部とみなして数えない。
+        """
+        text = _mention_form(text)
+        found, keys = [], []
+        for name in self._enemy_mention_names:
+            if any(name in longer for longer in found) or not self._mentioned(text, name):
+                continue
+            found.append(name)
+            key = self._enemy_mentions[name]
+            if key not in keys: # 表記違いの同じ敵は1体として数える
+                keys.append(key)
+                if len(keys) >= limit:
+                    break
+        return [self.enemies[key][0] for key in keys]
+
+    @staticmethod
+    def _mentioned(text: str, name: str) -> bool:
+        """text の中に name が単語として (前後が name の端と違う種類の文字で) 出てくるか"""
+        start = text.find(name)
+        while start >= 0:
+            end = start + len(name)
+            before = _char_kind(text[start - 1]) if start > 0 else None
+            after = _char_kind(text[end]) if end < len(text) else None
+            if (before is None or before != _char_kind(name[0])) and (after is None or after != _char_kind(name[-1])):
+                return True
+            start = text.find(name, start + 1)
+        return False
+
+    def get_operator_by_id(self, char_id: str):
+        return self.operators_by_id.get(char_id)
+
+    def find_organization(self, name: str):
+        """日本語名またはIDから組織を探す (見つからなければ None)"""
+        return self.organizations.get(normalize_name(name))
+
+    def __len__(self):
+        return len(self.records)
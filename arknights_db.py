@@ -0,0 +1,384 @@
+# arknights_db.py
+# アークナイツDB (arknights_data.db) への読み取りアクセスをまとめたモジュール
+# GeminiChat / ArknightsCommands などの Cog はここの get_database() 経由でDBを使うこと！
+#  - SQLite の呼び出しは専用のスレッドプールで実行するので、重いクエリでもイベントループ (ハートビート) を止めない
+#  - 接続は小さなプールで使い回す
+#  - 遅いクエリはここでまとめてログに出す
+#  - ボットはDBに書き込まないので、読み取り専用 (immutable) + mmap で開く (ARKNIGHTS_DB_READONLY=0 で無効化)
+#  - meta テーブルのデータバージョンを定期的に確認し、変わっていたら接続とカタログを作り直す
+import asyncio
+import contextlib
+import functools
+import os
+import queue
+import sqlite3
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from arknights_catalog import EnemyRecord, OperatorCatalog, OperatorRecord, OrganizationRecord
+from operator_locales import DEFAULT_LOCALE, LOCALIZED_COLUMNS # /search の表示言語
+
+# データベースファイルのパス (このファイルと同じ場所)
+DB_PATH = os.path.join(os.path.dirname(__file__), 'arknights_data.db')
+
+OPERATORS_TABLE = 'operators'
+OPERATOR_SECTIONS_TABLE = 'operator_sections'
+FACTION_MEMBERS_TABLE = 'faction_members'
+META_TABLE = 'meta'
+SKILLS_TABLE = 'skills'
+OPERATOR_SKILLS_TABLE = 'operator_skills'
+OPERATOR_LOCALES_TABLE = 'operator_locales'
+STAGE_DROPS_TABLE = 'stage_drops'
+LORE_FTS_TABLE = 'lore_fts' # populate_db.py が作る全文検索テーブル
+
+# 読み取り用のスレッド数 (= 接続数)。ラズパイなので少なめ
+DB_WORKERS = int(os.getenv("ARKNIGHTS_DB_WORKERS", "2"))
+# これより時間のかかったクエリはログに出す (ミリ秒)
+SLOW_QUERY_MS = float(os.getenv("ARKNIGHTS_DB_SLOW_MS", "200"))
+
+# ★★★ 読み取り専用スナップショットモード ★★★
+# DBを書き換えるのは populate_db.py / add_org_details.py だけで、その後は update_arknights_data.sh がコンテナを再起動する。
+# なので、ボットは mode=ro&immutable=1 で開いてロック・変更検知を省略し、ファイル全体を mmap して読む。
+# (ボット起動中に populate_db.py を実行した場合も、data_version の変化を検知して接続とカタログを作り直す。
+#  ただし書き込み中に読むと壊れた内容が見える可能性があるので、基本はボットを再起動すること！)
+READONLY_MODE = os.getenv("ARKNIGHTS_DB_READONLY", "1") != "0"
+# mmap する最大サイズ (DBファイル 3.7MB に対して十分大きく)
+MMAP_SIZE = int(os.getenv("ARKNIGHTS_DB_MMAP_MB", "64")) * 1024 * 1024
+# 接続ごとにキャッシュしておくプリペアドステートメント数 (sqlite3 の既定は 128)
+STATEMENT_CACHE_SIZE = 256
+# データバージョンを確認する間隔 (秒)。確認は schedule_refresh() が呼ばれた時にだけ行う
+# (ArknightsCommands.interaction_check() と GeminiChat.on_message_chat() が毎回呼ぶ)
+VERSION_CHECK_SEC = float(os.getenv("ARKNIGHTS_DB_VERSION_CHECK_SEC", "60"))
+# meta テーブルが無い古いDBのデータバージョン
+LEGACY_DATA_VERSION = "legacy"
+
+
+class ArknightsDB:
+    """アークナイツDBへの非同期アクセスをまとめたクラス (読み取り専用)"""
+
+    def __init__(self, db_path: str = DB_PATH, workers: int = DB_WORKERS):
+        self.db_path = db_path
+        self.available = False # probe() でDBが使えると分かったら True
+        self.catalog = None # OperatorCatalog (start() で読み込む)
+        self.data_version = None # meta テーブルの data_version (start() で読み込む)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="arknights-db")
+        # スレッド数と同じだけ接続を持てば、接続待ちが起きることはない
+        self._pool = queue.LifoQueue(maxsize=workers)
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self._generation = 0 # 接続を作り直すたびに増やす (古い接続をプールに戻さないように)
+        self._last_version_check = 0.0
+        self._refresh_task = None # schedule_refresh() が動かしている refresh_if_changed() (1つだけ)
+
+    # --- 起動時の確認 ---
+    def probe(self) -> bool:
+        """DBファイルと operators テーブルがあるかを確認する (起動時に1回だけ)"""
+        if not os.path.exists(self.db_path):
+            print(f"🚨 データベースファイルが見つかりません: {self.db_path}。アークナイツ関連の機能は無効です。")
+            return False
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                table_exists = conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table' AND name=?", (OPERATORS_TABLE,)
+                ).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"🚨 データベース接続またはテーブル確認中にエラー: {e}")
+            return False
+        if not table_exists:
+            print(f"🚨 データベースファイル '{self.db_path}' は存在しますが、'{OPERATORS_TABLE}' テーブルが見つかりません。populate_db.py は実行しましたか？")
+            return False
+        print(f"✅ データベースファイル確認OK: {self.db_path}")
+        return True
+
+    async def start(self):
+        """DBの確認とカタログの読み込み (何度呼んでも1回しか実行しない)"""
+        async with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+            self.available = await self._run(self.probe)
+            if not self.available:
+                return
+            try:
+                self.data_version = await self._run(self._read_data_version)
+                await self._run(self._warm_up)
+                self.catalog = await self._run(self._load_catalog)
+                self._last_version_check = time.monotonic()
+            except (sqlite3.Error, OSError) as e:
+                print(f"🚨 オペレーターカタログの読み込みに失敗しました: {e}")
+                self.available = False
+
+    def schedule_refresh(self):
+        """refresh_if_changed() をバックグラウンドで実行する (待たずにすぐ戻る)
+
+        作り直しには数秒かかることがあり、待つと Discord の応答期限 (3秒) を過ぎてしまう。
+        作り直しが終わって self.catalog が入れ替わるまでは、今のカタログのまま応答する。
+        """
+        if not self.available or time.monotonic() - self._last_version_check < VERSION_CHECK_SEC:
+            return
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return # 確認/作り直しの途中
+        self._refresh_task = asyncio.create_task(self.refresh_if_changed())
+
+    async def refresh_if_changed(self) -> bool:
+        """データバージョンが変わっていたら接続とカタログを作り直す (作り直したら True)
+
+        前回の確認から VERSION_CHECK_SEC 秒経っていなければ何もしない。
+        """
+        if not self.available or time.monotonic() - self._last_version_check < VERSION_CHECK_SEC:
+            return False
+        async with self._start_lock:
+            if time.monotonic() - self._last_version_check < VERSION_CHECK_SEC:
+                return False # 待っている間に他のコマンドが確認した
+            self._last_version_check = time.monotonic()
+            try:
+                version = await self._run(self._read_data_version)
+                if version == self.data_version:
+                    return False
+                print(f"🔄 データバージョンが変わりました: {self.data_version} → {version}。接続とカタログを作り直します。")
+                await self._run(self._reset_pool)
+                await self._run(self._warm_up)
+                self.catalog = await self._run(self._load_catalog)
+                self.data_version = version
+                return True
+            except (sqlite3.Error, OSError) as e:
+                # populate_db.py の書き込み中などは次の確認で再挑戦する (今のカタログはそのまま使う)
+                print(f"⚠️ データバージョンの確認/再読み込みに失敗しました: {e}")
+                return False
+
+    # --- スレッドプール / 接続プール ---
+    def _connect(self) -> sqlite3.Connection:
+        if READONLY_MODE:
+            uri = f"file:{urllib.parse.quote(os.path.abspath(self.db_path))}?mode=ro&immutable=1"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+            conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextlib.contextmanager
+    def _connection(self):
+        """プールから接続を借りる (無ければ作る)。使い終わったらプールに戻す"""
+        generation = self._generation
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if generation != self._generation:
+                conn.close() # 借りている間に作り直された (immutable の接続は古いファイルの内容を前提にしている)
+            else:
+                try:
+                    self._pool.put_nowait(conn)
+                except queue.Full:
+                    conn.close()
+
+    def _reset_pool(self):
+        """プールの接続を全部閉じる (次に借りる時に新しく開き直す)"""
+        self._generation += 1
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _read_data_version(self) -> str:
+        """meta テーブルの data_version を読む
+
+        immutable の接続はファイルの変更を見ないので、ここでは毎回普通の読み取り専用接続を開く。
+        """
+        uri = f"file:{urllib.parse.quote(os.path.abspath(self.db_path))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True)
+        try:
+            row = conn.execute(f"SELECT value FROM {META_TABLE} WHERE key = 'data_version'").fetchone()
+        except sqlite3.OperationalError:
+            row = None # populate_db.py を再実行していない古いDB (meta テーブルが無い)
+        finally:
+            conn.close()
+        return row[0] if row else LEGACY_DATA_VERSION
+
+    def _query(self, sql: str, params=()) -> list:
+        """プールから接続を借りてクエリを実行する (ワーカースレッド上で呼ばれる)"""
+        with self._connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _warm_up(self):
+        """起動直後の検索が遅くならないように、DBファイルをページキャッシュに載せて接続を作っておく"""
+        started = time.perf_counter()
+        # ファイルを先頭から読むだけで OS のページキャッシュに載る (SDカードのランダムリードを避ける)
+        with open(self.db_path, 'rb') as f:
+            while f.read(1024 * 1024):
+                pass
+        # プールを接続で満たしておく
+        while not self._pool.full():
+            self._pool.put_nowait(self._connect())
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        mode = "読み取り専用 (immutable + mmap)" if READONLY_MODE else "通常"
+        print(f"✅ DBのウォームアップ完了: {mode}モード, 接続 {self._pool.qsize()} 本, {elapsed_ms:.0f}ms")
+
+    def _load_catalog(self) -> OperatorCatalog:
+        with self._connection() as conn:
+            return OperatorCatalog.from_connection(conn)
+
+    async def _run(self, func, *args):
+        """func(*args) を DB 用スレッドで実行し、遅ければログに出す"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= SLOW_QUERY_MS:
+                name = getattr(func, "__name__", str(func))
+                print(f"⚠️ 遅いDBアクセス: {name}{args[:1]} に {elapsed_ms:.0f}ms かかりました")
+
+    async def fetch(self, sql: str, params=()) -> list:
+        """任意の読み取りクエリを実行して sqlite3.Row のリストを返す"""
+        return await self._run(self._query, sql, params)
+
+    # --- 型付きの問い合わせ ---
+    async def get_operator(self, name: str) -> OperatorRecord | None:
+        """オペレーターを名前 (表記ゆれ可) で取得する"""
+        if not self.catalog:
+            return None
+        return self.catalog.find_operator(name)
+
+    async def get_operators(self, names) -> list[OperatorRecord | None]:
+        """複数のオペレーターを1回でまとめて取得する (見つからなかった名前は None)"""
+        if not self.catalog:
+            return [None for _ in names]
+        return self.catalog.find_operator_batch(names)
+
+    async def get_localized_operator(self, operator: OperatorRecord, locale: str) -> OperatorRecord:
+        """operator の名前・クラス・スキルなどを locale の言語にしたコピーを返す
+
+        operator_locales に行が無い (そのサーバーに未実装・古いDB) 場合や ja_JP の場合は operator をそのまま返す。
+        """
+        if locale == DEFAULT_LOCALE or not operator['char_id']:
+            return operator
+        try:
+            rows = await self.fetch(
+                f"SELECT {', '.join(LOCALIZED_COLUMNS)} FROM {OPERATOR_LOCALES_TABLE} WHERE locale = ? AND char_id = ?",
+                (locale, operator['char_id']),
+            )
+        except sqlite3.OperationalError as e:
+            # populate_db.py を再実行していない古いDB (テーブルが無い) の場合
+            print(f"⚠️ {locale} のオペレーター情報を取得できません ({operator['char_id']}): {e}")
+            return operator
+        return operator.with_overrides(dict(rows[0])) if rows else operator
+
+    async def get_organization(self, name: str) -> OrganizationRecord | None:
+        """組織を日本語名 (表記ゆれ可) またはIDで取得する"""
+        if not self.catalog:
+            return None
+        return self.catalog.find_organization(name)
+
+    async def get_enemy(self, name: str) -> EnemyRecord | None:
+        """敵を名前 (表記ゆれ可) で取得する"""
+        if not self.catalog:
+            return None
+        return self.catalog.find_enemy(name)
+
+    async def find_enemies_in_text(self, text: str, limit: int = 3) -> list[EnemyRecord]:
+        """文章に名前が出てくる敵を取得する (GeminiChat の回答の材料用)"""
+        if not self.catalog:
+            return []
+        return self.catalog.enemies_in_text(text, limit)
+
+    async def get_sections(self, char_id: str, titles) -> list[tuple[str, str]]:
+        """ハンドブックのセクションを (タイトル, 本文) のリストでハンドブック順に返す"""
+        placeholders = ", ".join("?" for _ in titles)
+        try:
+            rows = await self.fetch(
+                f"SELECT title, text FROM {OPERATOR_SECTIONS_TABLE} WHERE char_id = ? AND title IN ({placeholders}) ORDER BY ord",
+                (char_id, *titles),
+            )
+        except sqlite3.OperationalError as e:
+            # populate_db.py を再実行していない古いDB (テーブルが無い) の場合
+            print(f"⚠️ ハンドブックセクションを取得できません ({char_id}): {e}")
+            return []
+        return [(row['title'], row['text']) for row in rows]
+
+    async def get_faction_members(self, org_id: str) -> list[tuple[str, str]]:
+        """組織のメンバーを (関係, char_id) のリストで返す (関係は 'group' / 'nation' / 'team')"""
+        try:
+            rows = await self.fetch(
+                f"SELECT relation, char_id FROM {FACTION_MEMBERS_TABLE} WHERE org_id = ?", (org_id,)
+            )
+        except sqlite3.OperationalError as e:
+            # populate_db.py を再実行していない古いDB (テーブルが無い) の場合
+            print(f"⚠️ 組織のメンバーを取得できません ({org_id}): {e}")
+            return []
+        return [(row['relation'], row['char_id']) for row in rows]
+
+    async def get_skill_level(self, char_id: str, slot: int, level: int):
+        """オペレーターのスキル枠 slot (1〜3) のレベル level (1〜10) を sqlite3.Row で返す (無ければ None)
+
+        行には name / desc_template / blackboard_json / sp_cost / initial_sp / duration が入る。
+        skills テーブルが無い場合は sqlite3.OperationalError をそのまま投げる。
+        """
+        rows = await self.fetch(
+            f"""
+            SELECT s.name, s.desc_template, s.blackboard_json, s.sp_cost, s.initial_sp, s.duration
+            FROM {OPERATOR_SKILLS_TABLE} os
+            JOIN {SKILLS_TABLE} s ON s.skill_id = os.skill_id AND s.level = ?
+            WHERE os.char_id = ? AND os.slot = ?
+            """,
+            (level, char_id, slot),
+        )
+        return rows[0] if rows else None
+
+    async def get_stage_drops(self, item_id: str, limit: int) -> list:
+        """素材をドロップするステージをおすすめ順に最大 limit 件返す (主キーの範囲読み出し1回)
+
+        行には code / stage_name / stage_type / ap_cost / drop_type / occurrence が入る。
+        stage_drops テーブルが無い場合は sqlite3.OperationalError をそのまま投げる。
+        """
+        return await self.fetch(
+            f"""
+            SELECT code, stage_name, stage_type, ap_cost, drop_type, occurrence
+            FROM {STAGE_DROPS_TABLE}
+            WHERE item_id = ?
+            ORDER BY priority
+            LIMIT ?
+            """,
+            (item_id, limit),
+        )
+
+    async def search_lore(self, query: str, limit: int) -> list[tuple[str, str]]:
+        """lore_fts を rank (populate_db.py が設定した重み付きの bm25) 順で全文検索して (名前, ハイライト付きスニペット) のリストを返す
+
+        lore_fts が無い場合は sqlite3.OperationalError をそのまま投げる。
+        """
+        # ユーザー入力はフレーズとして扱う (FTS5 の演算子として解釈させない)
+        fts_query = '"' + query.replace('"', '""') + '"'
+        rows = await self.fetch(
+            f"""
+            SELECT name, snippet({LORE_FTS_TABLE}, -1, '**', '**', '…', 24) AS snippet
+            FROM {LORE_FTS_TABLE}
+            WHERE {LORE_FTS_TABLE} MATCH ?
+            ORDER BY rank
+            LIMIT ?
+            """,
+            (fts_query, limit),
+        )
+        return [(row['name'], row['snippet']) for row in rows]
+
+
+# --- Cog 間で共有するインスタンス ---
+_database = None
+
+
+def get_database() -> ArknightsDB:
+    """共有の ArknightsDB を返す (最初の呼び出しで作成)"""
+    global _database
+    if _database is None:
+        _database = ArknightsDB()
+    return _database
@@ -1,81 +1,438 @@
 # commands/arknights_commands.py
+import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands
-import sqlite3 # データベース用
-import os # パス指定用
-import re # テキスト解析用 (section抜き出しとか)
-
-# データベースファイルのパス (my_bot フォルダにあるはず)
-# このファイルは commands/ の中なので、../ で一つ上に戻る
-DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'arknights_data.db')
-
-# ★★★ スキル/素質説明の {} を blackboard の値で置換する関数 (populate_db.py にも必要なら置いてね) ★★★
-def replace_skill_value(match, blackboard_list):
-    # ... (前のコードと同じ。populate_db.py と共通の関数) ...
-    full_match = match.group(0)
-    key_with_format = match.group(1)
-    parts = key_with_format.split(':')
-    key = parts[0]
-    format_str = parts[1] if len(parts) > 1 else None
-
-    value = None
-    key_lower = key.lower()
-    for item in blackboard_list:
-        bb_key = item.get('key')
-        if bb_key and bb_key.lower() == key_lower:
-            value = item.get('value')
+import io
+import os
+import sqlite3 # データベース用 (エラー型)
+import unicodedata # /compare の表の幅揃え用
+from arknights_db import get_database # DBアクセスは共通モジュール経由 (スレッドプールで実行される)
+from arknights_catalog import AUTOCOMPLETE_LIMIT, COMPARE_FIELDS
+from recruitment import MAX_SELECTED_TAGS, ROBOT_TAG_ID # /recruit のタグ
+from operator_dps import DAMAGE_TYPE_LABELS # /dps のダメージの種類の表示名
+from material_planner import GOLD_ITEM_ID, MAX_ELITE, MAX_MASTERY, MAX_SKILL_LEVEL # /materials の育成目標
+from stage_drops import DROP_TYPE_LABELS, OCCURRENCE_LABELS, STAGE_TYPE_LABELS # /farm の表示名
+from enemies import ENEMY_LEVEL_LABELS, DAMAGE_TYPE_LABELS as ENEMY_DAMAGE_TYPE_LABELS # /enemy の表示名
+from effect_index import normalize_text
+from ability_ratings import ABILITY_COLUMNS # 能力測定のカラムと項目名の対応
+from embed_cache import EmbedCache # 作成済みの /search のページを使い回す
+from operator_card import get_card_png # /card の画像 (Pillow で描画、ディスクにキャッシュ)
+from name_normalize import normalize_name
+# スキル説明のテンプレートに値を埋め込む (populate_db.py と共通。コンパイル済みのテンプレートと結果をキャッシュする)
+from skill_template import render_json as render_skill_json
+from commands.configure import get_guild_locale # サーバーごとの表示言語 (/configure_locale)
+
+LORE_SEARCH_LIMIT = 5 # /lore_search で表示する最大件数
+
+# /search の結果ページ (ボタンのラベル順)
+SEARCH_PAGES = [
+    ("overview", "概要"),
+    ("profile", "プロファイル"),
+    ("skills", "スキル"),
+    ("talents", "素質"),
+    ("lore", "経歴"),
+]
+SEARCH_VIEW_TIMEOUT = 300 # ボタンを受け付ける秒数
+# /search のページをキャッシュしておくオペレーター数 (よく検索されるオペレーターは Embed を作り直さない)
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "128"))
+# プロファイル/経歴ページに表示するハンドブックのセクション (populate_db.py が operator_sections に保存する)
+PROFILE_SECTION_TITLES = ("基礎情報", "個人履歴", "健康診断")
+LORE_SECTION_TITLES = ("第一資料", "第二資料", "第三資料", "第四資料", "昇進記録")
+RANKING_DEFAULT_COUNT = 10 # /ranking の既定の表示件数
+SIMILAR_DEFAULT_COUNT = 5 # /similar の既定の表示件数
+SIMILAR_MAX_COUNT = 10
+# /skill のレベルの選択肢 (skills.level の値)
+SKILL_LEVELS = [(f"Lv{level}", level) for level in range(1, 8)] + [(f"特化{rank}", 7 + rank) for rank in range(1, 4)]
+EFFECT_SEARCH_LIMIT = 10 # /effect_search で表示する最大件数
+EFFECT_SNIPPET_RADIUS = 40 # /effect_search で一致した位置の前後に表示する文字数
+RECRUIT_RESULT_LIMIT = 10 # /recruit で表示する組み合わせの最大数
+RECRUIT_NOTABLE_RARITY = 4 # /recruit で「確定」として表示する最低レアリティ
+DPS_MAX_ENEMY_DEF = 3000 # /dps で指定できる敵の防御力の上限
+# /materials の特化するスキルの選択肢 (値はスキル枠のビット)
+MASTERY_SLOT_CHOICES = [("なし", 0), ("S1", 0b001), ("S2", 0b010), ("S3", 0b100), ("全スキル", 0b111)]
+FARM_DEFAULT_COUNT = 8 # /farm の既定の表示件数
+# /operators の1ページの表示件数
+OPERATORS_PAGE_SIZE = 15
+# /operators の絞り込み条件の表示名
+FACET_LABELS = {
+    "rarity": "レアリティ",
+    "operator_class": "クラス",
+    "archetype": "職分",
+    "affiliation": "所属",
+    "race": "種族",
+}
+# /faction でメンバーを表示する順番と見出し (faction_members.relation)
+FACTION_RELATIONS = [
+    ("group", "所属"),
+    ("team", "チーム"),
+    ("nation", "出身"),
+]
+FACTION_LORE_LIMIT = 1000 # /faction で表示する組織 Lore の最大文字数
+COMPARE_CELL_WIDTH = 12 # /compare の表の1列の幅 (半角換算)
+# Embed の制限 (フィールドは1024文字、Embed 全体は6000文字。少し余裕を持たせる)
+EMBED_FIELD_LIMIT = 1024
+EMBED_TOTAL_BUDGET = 5500
+
+# ★★★ /search の結果をページ (概要 / プロファイル / スキル / 素質 / 経歴) に分けて表示する View ★★★
+# /search の時に全ページの Embed を作り (build_pages)、ボタンが押されたらそれを表示するだけにする
+class OperatorPagesView(discord.ui.View):
+    def __init__(self, db, operator, author_id: int, variant_count: int = 1, pages: dict = None):
+        super().__init__(timeout=SEARCH_VIEW_TIMEOUT)
+        self.db = db
+        self.operator = operator
+        self.author_id = author_id
+        self.variant_count = variant_count
+        self.message = None # 送信後に設定する (タイムアウト時にボタンを無効化するため)
+        # ページキー -> Embed の dict のタプル (build_pages() で全ページ作る)
+        # EmbedCache に入っている作成済みの dict を渡された場合は、他の View と共有する (中身を書き換えないこと！)
+        self._pages = pages if pages is not None else {}
+        self.current_page = None
+        self.current_part = 0
+
+        # ページ切り替えボタン (1段目)
+        for page_key, label in SEARCH_PAGES:
+            self.add_item(_PageButton(page_key, label))
+        # 1ページに収まらない時の前後ボタン (2段目)
+        self.prev_button = _PartButton(-1, "◀", row=1)
+        self.next_button = _PartButton(1, "▶", row=1)
+        self.add_item(self.prev_button)
+        self.add_item(self.next_button)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # ページを切り替えられるのは検索した本人だけ
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("このページ操作は検索した本人のみが行える。必要なら自分で /search を実行したまえ。", ephemeral=True)
+            return False
+        return True
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+    async def build_pages(self) -> dict:
+        """全ページの Embed を組み立てて返す (/search が EmbedCache に入れて、次の検索ではそのまま渡す)"""
+        for page_key, _ in SEARCH_PAGES:
+            if page_key not in self._pages:
+                self._pages[page_key] = tuple(await PAGE_BUILDERS[page_key](self))
+        return self._pages
+
+    async def render(self, page_key: str, part: int = 0) -> discord.Embed:
+        """作成済みのページの Embed を返す (フッターだけはこの View に合わせて付ける)"""
+        parts = self._pages[page_key]
+        self.current_page = page_key
+        self.current_part = max(0, min(part, len(parts) - 1))
+
+        # ボタンの状態を今のページに合わせる
+        for item in self.children:
+            if isinstance(item, _PageButton):
+                item.style = discord.ButtonStyle.primary if item.page_key == page_key else discord.ButtonStyle.secondary
+        self.prev_button.disabled = self.current_part == 0
+        self.next_button.disabled = self.current_part >= len(parts) - 1
+
+        embed = discord.Embed.from_dict(parts[self.current_part])
+        footer = f"{dict(SEARCH_PAGES)[page_key]} ({self.current_part + 1}/{len(parts)})"
+        if self.variant_count > 1:
+            footer += f" | 同名のオペレーターが他に {self.variant_count - 1} 件登録されている。"
+        embed.set_footer(text=footer)
+        return embed
+
+    # --- 各ページの組み立て ---
+    def _base_embed(self) -> discord.Embed:
+        op = self.operator
+        return discord.Embed(title=f"オペレーター情報: {op['name']} (★{op['rarity']})", color=discord.Color.blue())
+
+    def _paged(self, fields) -> list:
+        """(フィールド名, 本文) のリストを Embed の文字数制限に収まるように複数の Embed (dict) に分ける"""
+        parts = []
+        embed = self._base_embed()
+        for field_name, text in fields:
+            for i, chunk in enumerate(_split_text(text or "説明なし", EMBED_FIELD_LIMIT)):
+                name = field_name if i == 0 else f"{field_name} (続き)"
+                if embed.fields and (len(embed) + len(name) + len(chunk) > EMBED_TOTAL_BUDGET or len(embed.fields) >= 25):
+                    parts.append(embed.to_dict())
+                    embed = self._base_embed()
+                embed.add_field(name=name, value=chunk, inline=False)
+        if embed.fields or not parts:
+            if not embed.fields:
+                embed.description = "記録なし"
+            parts.append(embed.to_dict())
+        return parts
+
+    async def _build_overview(self) -> list:
+        op = self.operator
+        embed = self._base_embed()
+        embed.description = (
+            f"**クラス/職分:** {op['operator_class']} / {op['archetype']}\n"
+            f"**所属:** {op['affiliation'] if op['affiliation'] else '不明'}" + (f" / **チーム:** {op['team']}" if op['team'] else "") +
+            f"\n**出身:** {op['birthplace'] if op['birthplace'] else '不明'}" +
+            f"\n**種族:** {op['race'] if op['race'] else '不明'}"
+        )
+        # Ability Stats フィールドを追加 (取得できていれば)
+        # None や 'N/A' みたいな文字列は除外したい
+        stats_list_text = []
+        for column, label in ABILITY_COLUMNS:
+            value = op[column]
+            if value is not None and value != 'N/A':
+                stats_list_text.append(f"{label}:{value}")
+        if stats_list_text:
+            embed.add_field(name="能力測定", value=" ".join(stats_list_text), inline=False)
+        # スキル名・素質名だけ一覧で見せる (詳細は各ページ)
+        skill_names = [op[f'skill{n}_name'] for n in (1, 2, 3) if op[f'skill{n}_name']]
+        if skill_names:
+            embed.add_field(name="スキル", value=" / ".join(skill_names), inline=False)
+        talent_names = [op[f'talent{n}_name'] for n in (1, 2) if op[f'talent{n}_name']]
+        if talent_names:
+            embed.add_field(name="素質", value=" / ".join(talent_names), inline=False)
+        return [embed.to_dict()]
+
+    async def _build_sections(self, titles, fallback_title, fallback_text) -> list:
+        # ハンドブックのセクションは populate 時に分割済み (operator_sections)
+        sections = []
+        if self.operator['char_id']:
+            sections = [(title, text) for title, text in await self.db.get_sections(self.operator['char_id'], titles) if text]
+        if not sections and fallback_text:
+            sections = [(fallback_title, fallback_text)] # 古いDBの場合は結合済みのテキストで代用
+        return self._paged(sections)
+
+    async def _build_profile(self) -> list:
+        return await self._build_sections(PROFILE_SECTION_TITLES, "プロファイル", self.operator['profile_summary'])
+
+    async def _build_lore(self) -> list:
+        return await self._build_sections(LORE_SECTION_TITLES, "経歴", self.operator['lore_notes'])
+
+    async def _build_skills(self) -> list:
+        op = self.operator
+        return self._paged([(f"S{n}: {op[f'skill{n}_name']}", op[f'skill{n}_desc']) for n in (1, 2, 3) if op[f'skill{n}_name']])
+
+    async def _build_talents(self) -> list:
+        op = self.operator
+        return self._paged([(f"素質{n}: {op[f'talent{n}_name']}", op[f'talent{n}_desc']) for n in (1, 2) if op[f'talent{n}_name']])
+
+
+class _PageButton(discord.ui.Button):
+    def __init__(self, page_key: str, label: str):
+        super().__init__(label=label, style=discord.ButtonStyle.secondary, row=0)
+        self.page_key = page_key
+
+    async def callback(self, interaction: discord.Interaction):
+        view: OperatorPagesView = self.view
+        embed = await view.render(self.page_key)
+        await interaction.response.edit_message(embed=embed, view=view)
+
+
+class _PartButton(discord.ui.Button):
+    def __init__(self, step: int, label: str, row: int):
+        super().__init__(label=label, style=discord.ButtonStyle.secondary, row=row)
+        self.step = step
+
+    async def callback(self, interaction: discord.Interaction):
+        view: OperatorPagesView = self.view
+        embed = await view.render(view.current_page, view.current_part + self.step)
+        await interaction.response.edit_message(embed=embed, view=view)
+
+
+def _split_text(text: str, limit: int) -> list:
+    """長いテキストを limit 文字以下に分ける (なるべく改行の位置で切る)"""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut].strip())
+        text = text[cut:].strip()
+    if text:
+        chunks.append(text)
+    return [chunk for chunk in chunks if chunk] or ["説明なし"]
+
+
+def _clean_org_text(text: str) -> str:
+    """add_org_details.py の三重引用符の文字列から行頭のインデントを取り除く"""
+    return "\n".join(line.strip() for line in (text or "").splitlines()).strip()
+
+
+def _roster_text(names: list, limit: int = 1024) -> str:
+    """名前を「、」区切りで並べ、フィールドに収まらない分は「…他N名」にまとめる"""
+    text = ""
+    for i, name in enumerate(names):
+        candidate = f"{text}、{name}" if text else name
+        rest = f" …他{len(names) - i}名"
+        if len(candidate) + len(rest) > limit:
+            return text + rest
+        text = candidate
+    return text
+
+
+def _format_stat(value) -> str:
+    """ステータスの数値を表示用にする (整数は小数点なし、無い値は '-')"""
+    if value is None:
+        return "-"
+    return f"{value:,.0f}" if float(value).is_integer() else f"{value:g}"
+
+
+def _display_width(text: str) -> int:
+    """全角文字を2、半角文字を1として数えた表示幅"""
+    return sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
+
+
+def _fit_cell(text: str, width: int) -> str:
+    """表示幅 width に収まるように切り詰めて、足りない分を空白で埋める"""
+    result = ""
+    for char in text:
+        if _display_width(result + char) > width - (1 if _display_width(text) > width else 0):
+            result += "…"
             break
+        result += char
+    return result + " " * max(0, width - _display_width(result))
 
-    if value is not None:
-        try:
-            num_value = float(value)
-            if format_str == '0%': return f"{num_value:.0%}"
-            elif format_str == '0.0%': return f"{num_value:.1%}"
-            elif format_str == '0':
-                if num_value == int(num_value): return f"{int(num_value)}"
-                else: return f"{num_value}"
-            elif format_str == '0.0': return f"{num_value:.1f}"
-            else:
-                if num_value == int(num_value): return f"{int(num_value)}"
-                else: return f"{num_value}"
-        except (ValueError, TypeError):
-            return f"{value}"
-    else:
-        return full_match
+
+def _compare_table(headers: list, rows: list) -> str:
+    """/compare 用の等幅の表 (コードブロック内で列が揃う)"""
+    label_width = max(_display_width(label) for label, _ in rows)
+    lines = [_fit_cell("", label_width) + " | " + " | ".join(_fit_cell(h, COMPARE_CELL_WIDTH) for h in headers)]
+    lines.append("-" * _display_width(lines[0]))
+    for label, values in rows:
+        lines.append(_fit_cell(label, label_width) + " | " + " | ".join(_fit_cell(v, COMPARE_CELL_WIDTH) for v in values))
+    return "\n".join(line.rstrip() for line in lines)
+
+
+def _effect_snippet(desc: str, keyword: str) -> str:
+    """説明文の keyword が出てくる位置の前後を切り出し、keyword を太字にする"""
+    text = normalize_text(desc).replace("\n", " ")
+    key = normalize_text(keyword)
+    position = text.find(key)
+    if position < 0:
+        return text[:EFFECT_SNIPPET_RADIUS * 2]
+    start = max(0, position - EFFECT_SNIPPET_RADIUS)
+    end = min(len(text), position + len(key) + EFFECT_SNIPPET_RADIUS)
+    return (
+        ("…" if start > 0 else "") + text[start:position] + f"**{text[position:position + len(key)]}**"
+        + text[position + len(key):end] + ("…" if end < len(text) else "")
+    )
+
+
+PAGE_BUILDERS = {
+    "overview": OperatorPagesView._build_overview,
+    "profile": OperatorPagesView._build_profile,
+    "skills": OperatorPagesView._build_skills,
+    "talents": OperatorPagesView._build_talents,
+    "lore": OperatorPagesView._build_lore,
+}
+
+
+# ★★★ /operators の結果一覧 (◀ ▶ で次のページ / 前のページ) ★★★
+# ページは「前のページの最後の位置の次から」読む (キーセット方式) ので、何ページ目でも先頭から数え直さない
+class OperatorListView(discord.ui.View):
+    def __init__(self, facets, filters: dict, author_id: int):
+        super().__init__(timeout=SEARCH_VIEW_TIMEOUT)
+        self.facets = facets
+        self.filters = filters
+        self.author_id = author_id
+        self.message = None
+        self.mask = facets.mask(filters)
+        self.total = self.mask.bit_count()
+        self.starts = [0] # これまでに表示したページの開始位置 (戻る用)
+        self.next_start = None
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("このページ操作は検索した本人のみが行える。必要なら自分で /operators を実行したまえ。", ephemeral=True)
+            return False
+        return True
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+    def render(self) -> discord.Embed:
+        records, self.next_start = self.facets.page(self.mask, self.starts[-1], OPERATORS_PAGE_SIZE)
+        self.prev_page.disabled = len(self.starts) == 1
+        self.next_page.disabled = self.next_start is None
+
+        conditions = " / ".join(f"{FACET_LABELS[facet]}: {value}" for facet, value in self.filters.items() if value not in (None, ""))
+        embed = discord.Embed(
+            title="オペレーター一覧",
+            description=f"{conditions or '条件なし'}\n該当 {self.total} 名",
+            color=discord.Color.blue()
+        )
+        lines = []
+        for op in records:
+            line = f"★{op.rarity} **{op.name}** — {op.operator_class}/{op.archetype}"
+            if op.affiliation:
+                line += f" ({op.affiliation})"
+            lines.append(line)
+        embed.add_field(name="オペレーター", value="\n".join(lines)[:1024], inline=False)
+
+        # 次に絞り込む時の目安として、指定していない条件の内訳を出す (ビットマップの AND だけなので一瞬)
+        for facet in ("operator_class", "rarity"):
+            if self.filters.get(facet) in (None, ""):
+                counts = self.facets.counts(facet, self.filters)
+                label = "★" if facet == "rarity" else ""
+                embed.add_field(name=f"{FACET_LABELS[facet]}別", value=" / ".join(f"{label}{value} {count}" for value, count in counts)[:1024], inline=False)
+
+        total_pages = max(1, -(-self.total // OPERATORS_PAGE_SIZE))
+        embed.set_footer(text=f"{len(self.starts)}/{total_pages} ページ")
+        return embed
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self.starts) > 1:
+            self.starts.pop()
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.next_start is not None:
+            self.starts.append(self.next_start)
+        await interaction.response.edit_message(embed=self.render(), view=self)
 
 
 class ArknightsCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.db_path = DB_PATH # データベースパスを保持
-
-        # ★★★ 起動時にデータベースファイルが存在するか確認 (任意だけど推奨) ★★★
-        if not os.path.exists(self.db_path):
-            print(f"🚨 データベースファイルが見つかりません: {self.db_path}。Arknights検索コマンドは無効です。")
-            self.db_available = False # DBが使えないフラグ
-        else:
-             try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='operators'")
-                table_exists = cursor.fetchone()
-                conn.close()
-                if table_exists:
-                    print(f"✅ データベースファイル確認OK: {self.db_path}")
-                    self.db_available = True # DBが使えるフラグ
-                else:
-                    print(f"🚨 データベースファイル '{self.db_path}' は存在しますが、'operators' テーブルが見つかりません。populate_db.py は実行しましたか？")
-                    self.db_available = False
-             except sqlite3.Error as e:
-                print(f"🚨 データベース接続またはテーブル確認中にエラー: {e}")
-                print("🚨 Arknights検索コマンドは無効です。")
-                self.db_available = False
+        self.db = get_database() # GeminiChat と共有のDBアクセス (setup() で start() 済み)
+        # /search の作成済みページ ((正規化した名前, 表示言語, データバージョン) -> ページ)
+        # 最大 SEARCH_CACHE_SIZE 件を LRU で残す。キーにデータバージョンを入れているので、DBが更新されたら古いページは引かれない
+        self.search_cache = EmbedCache(SEARCH_CACHE_SIZE)
+        self.search_cache_version = None # search_cache を作った時のデータバージョン
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """このCogの全スラッシュコマンドの前に呼ばれる: populate_db.py でデータが更新されていたらカタログを読み直す
+
+        確認は VERSION_CHECK_SEC 秒に1回だけ (ArknightsDB.schedule_refresh() が間引く)。
+        読み直しはバックグラウンドで行うので、このコマンドは今のカタログで応答する (次のコマンドから新しいデータになる)。
+        """
+        self.db.schedule_refresh()
+        if self.search_cache_version != self.db.data_version:
+            # GeminiChat が先に読み直した場合もここで古いページを捨てる
+            if len(self.search_cache):
+                print(f"🔄 /search のキャッシュを破棄しました ({self.search_cache.stats()})")
+            self.search_cache.clear()
+            self.search_cache_version = self.db.data_version
+        return True
+
+    @property
+    def db_available(self) -> bool:
+        return self.db.available
+
+    @property
+    def catalog(self):
+        return self.db.catalog
 
 
     # ★★★ /arknights_search (または /search) スラッシュコマンド定義 ★★★
     @app_commands.command(name="search", description="アークナイツのオペレーター情報を検索します（完全一致）。") # 説明文を変更
-    @app_commands.describe(operator_name="検索したいオペレーターの名前（例：ジェシカ）")
+    @app_commands.describe(operator_name="検索したいオペレーターの名前（例：ジェシカ / Jessica、入力中に候補が表示されます）")
     async def search(self, interaction: discord.Interaction, operator_name: str):
         await interaction.response.defer(ephemeral=False) # Thinky face を表示
 
@@ -84,169 +441,767 @@ class ArknightsCommands(commands.Cog):
             await interaction.followup.send("🚨 データベースが利用できないため、オペレーター情報を検索できません。管理者に連絡してください。")
             return
 
-        conn = None # データベース接続オブジェクト
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row # カラム名をキーにして結果にアクセスできるようになる (便利！)
-            cursor = conn.cursor()
+            # ★★★ メモリ上のカタログから検索 (SQLiteには問い合わせない) ★★★
+            # 表記ゆれ (ｱｰﾐﾔ / あーみや) や大文字小文字は区別しない。英語・中国語・韓国語の名前でも引ける
+            operator = await self.db.get_operator(operator_name)
 
-            # ★★★ オペレーター名を検索！(完全一致に戻す) ★★★
-            # name=? で完全一致検索
-            cursor.execute("SELECT * FROM operators WHERE name = ? COLLATE NOCASE", (operator_name,)) # COLLATE NOCASE はそのまま使う
+            # ▼▼▼ オペレーターが見つからなかった場合 ▼▼▼
+            if not operator:
+                await interaction.followup.send(f"オペレーター「{operator_name}」に関する情報はない。名称が正確か再確認してくれ。")
+                return
 
-            # ★★★ 結果の取得を fetchone に戻す！ ★★★
-            operator = cursor.fetchone() # ヒットした最初の1件だけを取得！
+            # ▼▼▼ 見つかった場合は全ページ作って概要ページを送信 ▼▼▼
+            # 作ったページはキャッシュに残るので、同じオペレーターの次の検索では作り直さない
+            # キーは名前を引いた後の char_id (アーミヤ / Amiya / ｱｰﾐﾔ のどれで検索しても同じページを使う)
+            # 名前・クラス・スキルなどはサーバーの表示言語で出す (プロファイルと経歴は日本語のまま)
+            locale = get_guild_locale(interaction.guild_id)
+            cache_key = (operator['char_id'] or operator['name'], locale, self.db.data_version)
+            variant_count = len(self.catalog.find_operators(operator_name))
+            pages = self.search_cache.get(cache_key)
+            if pages is None:
+                operator = await self.db.get_localized_operator(operator, locale)
+                view = OperatorPagesView(self.db, operator, interaction.user.id, variant_count)
+                self.search_cache.put(cache_key, await view.build_pages())
+            else:
+                view = OperatorPagesView(self.db, operator, interaction.user.id, variant_count, pages)
+            embed = await view.render("overview")
+            view.message = await interaction.followup.send(embed=embed, view=view)
+
+        except Exception as e:
+            # エラー発生時はログに出力して、ユーザーにも通知
+            print(f"❌ /search コマンド実行中にエラー: {e}", flush=True)
+            await interaction.followup.send("検索中にエラーが発生しました。", ephemeral=True)
+
+    # ★★★ /search のオートコンプリート (キー入力ごとに呼ばれるので SQLite は使わずメモリ上の索引だけを見る) ★★★
+    @search.autocomplete('operator_name')
+    async def operator_name_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        if not self.catalog:
+            return []
+        return [app_commands.Choice(name=name, value=name) for name in self.catalog.name_index.complete(current)]
+
+    # ★★★ /operators (条件でオペレーターを絞り込む) ★★★
+    # 絞り込みも件数もカタログのビットマップインデックス (FacetIndex) だけで行い、SQLite は使わない
+    @app_commands.command(name="operators", description="レアリティ・クラス・職分・所属・種族でオペレーターを絞り込みます。")
+    @app_commands.describe(
+        rarity="レアリティ (1〜6)",
+        operator_class="クラス（例：術師）",
+        archetype="職分（例：中堅術師）",
+        affiliation="所属（例：ウルサス）",
+        race="種族（例：ウルサス）",
+    )
+    async def operators(self, interaction: discord.Interaction,
+                        rarity: app_commands.Range[int, 1, 6] | None = None,
+                        operator_class: str | None = None,
+                        archetype: str | None = None,
+                        affiliation: str | None = None,
+                        race: str | None = None):
+        if not self.db_available or not self.catalog:
+            await interaction.response.send_message("🚨 データベースが利用できないため、オペレーターを絞り込めません。管理者に連絡してください。")
+            return
+
+        facets = self.catalog.facets
+        filters = {"rarity": rarity, "operator_class": operator_class, "archetype": archetype, "affiliation": affiliation, "race": race}
+        # 入力された値をインデックス上の表記に揃える (存在しない値はそのまま → 0件になる)
+        filters = {facet: (facets.resolve(facet, value) or value) if value is not None else None for facet, value in filters.items()}
+
+        view = OperatorListView(facets, filters, interaction.user.id)
+        if view.total == 0:
+            await interaction.response.send_message("条件に合うオペレーターはいない。条件を緩めて再検索してくれ。")
+            return
+        await interaction.response.send_message(embed=view.render(), view=view)
+        view.message = await interaction.original_response()
+
+    async def _facet_autocomplete(self, interaction: discord.Interaction, facet: str, current: str) -> list[app_commands.Choice[str]]:
+        """入力済みの他の条件で絞り込んだ時の件数付きで候補を返す"""
+        if not self.catalog:
+            return []
+        namespace = interaction.namespace
+        filters = {key: getattr(namespace, key, None) for key in FACET_LABELS if key != facet}
+        key = normalize_name(current)
+        choices = []
+        for value, count in self.catalog.facets.counts(facet, filters):
+            if key and key not in normalize_name(str(value)):
+                continue
+            choices.append(app_commands.Choice(name=f"{value} ({count})", value=str(value)))
+            if len(choices) >= AUTOCOMPLETE_LIMIT:
+                break
+        return choices
+
+    @operators.autocomplete('operator_class')
+    async def operator_class_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return await self._facet_autocomplete(interaction, "operator_class", current)
+
+    @operators.autocomplete('archetype')
+    async def archetype_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return await self._facet_autocomplete(interaction, "archetype", current)
+
+    @operators.autocomplete('affiliation')
+    async def affiliation_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return await self._facet_autocomplete(interaction, "affiliation", current)
+
+    @operators.autocomplete('race')
+    async def race_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return await self._facet_autocomplete(interaction, "race", current)
+
+    # ★★★ /faction (組織の説明とメンバー一覧) ★★★
+    # メンバーは faction_members テーブルから組織IDで1回引くだけ (表示名の LIKE 検索はしない)
+    @app_commands.command(name="faction", description="組織・国家の説明と所属オペレーターを表示します。")
+    @app_commands.describe(organization_name="組織・国家の名前（例：ペンギン急便、入力中に候補が表示されます）")
+    async def faction(self, interaction: discord.Interaction, organization_name: str):
+        await interaction.response.defer(ephemeral=False)
+
+        if not self.db_available:
+            await interaction.followup.send("🚨 データベースが利用できないため、組織情報を検索できません。管理者に連絡してください。")
+            return
+
+        try:
+            organization = await self.db.get_organization(organization_name)
+            if not organization:
+                await interaction.followup.send(f"組織「{organization_name}」に関する記録はない。名称が正確か再確認してくれ。")
+                return
 
-            # --- 結果の表示 ---
-            # ▼▼▼ オペレーターが見つからなかった場合 ▼▼▼
-            if not operator: # 結果が None かどうかでチェック
-                await interaction.followup.send(f"オペレーター「{operator_name}」に関する情報はない。名称が正確か再確認してくれ。") # メッセージ変更
-                return # 見つからなかった場合はここで終了
-
-            # ▼▼▼ オペレーターが1件見つかった場合 (検索結果が None でなかった場合) ▼▼▼
-            # ここに、前のコードの「--- ▼▼▼ データベースから取得した情報を整形 ▼▼▼ ---」以降の全てが入る！
-
-            # --- ▼▼▼ データベースから取得した情報を整形 ▼▼▼ ---
-            # operator['カラム名'] で値にアクセス！ .get() や () は使わない！
-
-            # 各カラムから値を取り出す
-            name = operator['name']
-            rarity = operator['rarity']
-            op_class = operator['operator_class']
-            archetype = operator['archetype']
-            affiliation = operator['affiliation']
-            team = operator['team'] # ★team カラムも追加したはず！
-            race = operator['race']
-            birthplace = operator['birthplace']
-
-            # Ability Stats
-            # None の可能性があるので、Embed に追加する前にチェックが必要
-            physical_strength = operator['physical_strength']
-            combat_skill = operator['combat_skill']
-            mobility = operator['mobility']
-            endurance = operator['endurance']
-            tactical_acumen = operator['tactical_acumen']
-            arts_adaptability = operator['arts_adaptability']
-
-            # Profile Summary と Lore Notes (DBに結合されて保存されてるテキスト) を取得
-            full_profile_text = operator['profile_summary'] # None になりうる
-            full_lore_text = operator['lore_notes']       # None になりうる
-
-            # ★★★ 必要なセクションだけを抽出するロジック (修正版) ★★★
-            # 今回表示したいセクションのタイトルリスト (能力測定は除外)
-            sections_to_include_in_text = ["基礎情報", "個人履歴", "健康診断"] # ★★★ ここを修正！ ★★★
-
-            extracted_text = "" # 表示用に抽出・整形したテキストを入れる変数
-
-            # profile_summary と lore_notes を結合して全体テキストとして扱う (None チェックも含む)
-            combined_text = ""
-            if full_profile_text:
-                combined_text += full_profile_text
-            if full_lore_text:
-                if combined_text: combined_text += "\n\n" # profile_summary と lore_notes の間に区切り線
-                combined_text += full_lore_text
-
-            if combined_text:
-                # 各セクションのタイトルを正規表現で探す
-                section_pattern = re.compile(r'---\s*(.+?)\s*---\n(.*?)(?=\n---\s*.+?\s*---|\Z)', re.DOTALL)
-
-                # 全体テキストから、指定のタイトルにマッチするセクションを抽出
-                for match in section_pattern.finditer(combined_text):
-                    title = match.group(1).strip() # タイトル部分 (例: "基礎情報")
-                    text = match.group(2).strip()  # そのタイトルの下の本文
-
-                    # 表示したいタイトルリストに含まれているかチェック
-                    if title in sections_to_include_in_text:
-                        # 見出し付きで抽出テキストに追加
-                        if text: # 本文が空でなければ追加
-                            extracted_text += f"--- {title} ---\n{text}\n\n"
-
-            # 抽出したテキストが空で、かつ fallback (profile_summary全体) が利用可能な場合
-            fallback_profile = operator['profile_summary'] # DBから取得 (Noneになりうる)
-            if not extracted_text and fallback_profile: # 何も抽出できなかった & fallback がNoneでないか空でない
-                extracted_text = fallback_profile # fallback として profile_summary 全体を入れる
-                # タイトルがないので見出しは付けない
-
-            # --- ▼▼▼ Embed 作成 ▼▼▼ ---
-            # オペレーター一人につき Embed を一つ作成！
             embed = discord.Embed(
-                title=f"オペレーター情報: {name} (★{rarity})",
-                description=f"**クラス/職分:** {op_class} / {archetype}\n"
-                            f"**所属:** {affiliation if affiliation else '不明'}" + (f" / **チーム:** {team}" if team else "") +
-                            f"\n**出身:** {birthplace if birthplace else '不明'}" +
-                            f"\n**種族:** {race if race else '不明'}",
-                color=discord.Color.blue() # 好きな色
+                title=f"組織情報: {organization['name']}",
+                description=_clean_org_text(organization['description'])[:4000] or "説明なし",
+                color=discord.Color.blue()
             )
-            # team もあれば description に追加しても良いかも (上の f-string に組み込み済み)
-
-            # Ability Stats フィールドを追加 (取得できていれば)
-            stats_list_text = [] # 表示用の文字列リスト
-            # 各変数に値が入っているかチェックしてリストに追加
-            # None や 'N/A' みたいな文字列は除外したい
-            if physical_strength is not None and physical_strength != 'N/A': stats_list_text.append(f"物理強度:{physical_strength}")
-            if combat_skill is not None and combat_skill != 'N/A': stats_list_text.append(f"戦場機動:{combat_skill}")
-            if mobility is not None and mobility != 'N/A': stats_list_text.append(f"生理的耐性:{mobility}")
-            if endurance is not None and endurance != 'N/A': stats_list_text.append(f"戦術立案:{endurance}")
-            if tactical_acumen is not None and tactical_acumen != 'N/A': stats_list_text.append(f"戦闘技術:{tactical_acumen}")
-            if arts_adaptability is not None and arts_adaptability != 'N/A': stats_list_text.append(f"アーツ適性:{arts_adaptability}")
-
-            if stats_list_text:
-                embed.add_field(name="能力測定", value=" ".join(stats_list_text), inline=False)
-
-            # 抽出したプロファイル・経歴テキストを Embed フィールドに追加
-            if extracted_text:
-                # Embedのvalueは1024文字制限があるので分割が必要かも
-                # シンプルに、1024文字を超える場合は切り詰める
-                if len(extracted_text) > 1024:
-                    # フィールド名は分割に合わせて変更が必要 (例: プロファイル・経歴 (続き))
-                    embed.add_field(name="プロファイル・経歴", value=extracted_text[:1020] + "...", inline=False)
-                else:
-                    embed.add_field(name="プロファイル・経歴", value=extracted_text, inline=False)
-                # もっとちゃんと分割するなら、テキストを1024文字以下に分割して、複数のフィールドを追加する必要がある
-                # (例: title="プロファイル・経歴 Part 1", value=..., title="プロファイル・経歴 Part 2", value=...)
-
-            # スキル情報、素質情報も Embed フィールドとして追加するならここ！
-            # populate_db.py で保存した sX_name, sX_desc, tX_name, tX_desc を利用
-            # DBから s1_name, s1_desc なども operator[...] で取得
-            s1_name = operator['skill1_name']
-            s1_desc = operator['skill1_desc']
-            s2_name = operator['skill2_name']
-            s2_desc = operator['skill2_desc']
-            s3_name = operator['skill3_name']
-            s3_desc = operator['skill3_desc']
-            t1_name = operator['talent1_name']
-            t1_desc = operator['talent1_desc']
-            t2_name = operator['talent2_name']
-            t2_desc = operator['talent2_desc']
-
-            if s1_name:
-                embed.add_field(name=f"S1: {s1_name}", value=s1_desc if s1_desc else "説明なし", inline=False)
-            if s2_name:
-                embed.add_field(name=f"S2: {s2_name}", value=s2_desc if s2_desc else "説明なし", inline=False)
-            if s3_name:
-                embed.add_field(name=f"S3: {s3_name}", value=s3_desc if s3_desc else "説明なし", inline=False)
-            if t1_name:
-                embed.add_field(name=f"素質1: {t1_name}", value=t1_desc if t1_desc else "説明なし", inline=False)
-            if t2_name:
-                embed.add_field(name=f"素質2: {t2_name}", value=t2_desc if t2_desc else "説明なし", inline=False)
-
-
-            # --- ▼▼▼ Embed 応答 ▼▼▼ ---
-            # 1件表示なので、Embed は最後に1つだけ送信！
+            lore = _clean_org_text(organization['lore'])
+            if lore:
+                if len(lore) > FACTION_LORE_LIMIT:
+                    lore = lore[:FACTION_LORE_LIMIT] + "…"
+                embed.add_field(name="詳細", value=lore, inline=False)
+
+            # メンバーを関係ごとに分けて、レアリティの高い順に並べる
+            members = {}
+            for relation, char_id in await self.db.get_faction_members(organization['id']):
+                operator = self.catalog.get_operator_by_id(char_id)
+                if operator:
+                    members.setdefault(relation, []).append(operator)
+            for relation, label in FACTION_RELATIONS:
+                operators = sorted(members.get(relation, []), key=lambda op: (-(op.rarity or 0), op.name))
+                if operators:
+                    names = [f"★{op.rarity} {op.name}" for op in operators]
+                    embed.add_field(name=f"{label} ({len(operators)}名)", value=_roster_text(names), inline=False)
+            if not members:
+                embed.add_field(name="メンバー", value="所属オペレーターの記録はない。", inline=False)
+
             await interaction.followup.send(embed=embed)
 
+        except Exception as e:
+            print(f"❌ /faction コマンド実行中にエラー: {e}", flush=True)
+            await interaction.followup.send("検索中にエラーが発生しました。", ephemeral=True)
+
+    @faction.autocomplete('organization_name')
+    async def organization_name_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        if not self.catalog:
+            return []
+        return [app_commands.Choice(name=name, value=name) for name in self.catalog.organization_index.complete(current)]
+
+    # ★★★ /compare (最大4人のオペレーターを並べて比較) ★★★
+    # 名前はカタログで一度にまとめて引き、表示用の値はカタログ読み込み時に作ってある compare_rows を使う
+    @app_commands.command(name="compare", description="オペレーターを最大4人まで並べて比較します。")
+    @app_commands.describe(
+        operator1="比較するオペレーター1",
+        operator2="比較するオペレーター2",
+        operator3="比較するオペレーター3（省略可）",
+        operator4="比較するオペレーター4（省略可）",
+    )
+    async def compare(self, interaction: discord.Interaction, operator1: str, operator2: str,
+                      operator3: str | None = None, operator4: str | None = None):
+        if not self.db_available or not self.catalog:
+            await interaction.response.send_message("🚨 データベースが利用できないため、オペレーターを比較できません。管理者に連絡してください。")
+            return
+
+        names = [name for name in (operator1, operator2, operator3, operator4) if name]
+        operators = await self.db.get_operators(names)
+        missing = [name for name, op in zip(names, operators) if op is None]
+        if missing:
+            await interaction.response.send_message(f"オペレーター「{'」「'.join(missing)}」に関する情報はない。名称が正確か再確認してくれ。")
+            return
+
+        columns = [self.catalog.compare_rows[op] for op in operators]
+        rows = [(label, [column[i] for column in columns]) for i, (_, label) in enumerate(COMPARE_FIELDS)]
+        table = _compare_table([op.name for op in operators], rows)
+        embed = discord.Embed(
+            title="オペレーター比較: " + " / ".join(op.name for op in operators),
+            description=f"```\n{table}\n```",
+            color=discord.Color.blue()
+        )
+        await interaction.response.send_message(embed=embed)
+
+    @compare.autocomplete('operator1')
+    @compare.autocomplete('operator2')
+    @compare.autocomplete('operator3')
+    @compare.autocomplete('operator4')
+    async def compare_operator_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return await self.operator_name_autocomplete(interaction, current)
+
+    # ★★★ /ranking (能力測定の評価が高い順) ★★★
+    # 評価は populate_db.py で数値にしてあり、カタログの AbilityMatrix (NumPy 配列) で絞り込み・並べ替えする
+    @app_commands.command(name="ranking", description="能力測定の評価が高いオペレーターを表示します（クラスで絞り込み可）。")
+    @app_commands.describe(
+        ability="並べ替える能力測定の項目",
+        operator_class="クラス（例：先鋒、省略すると全クラス）",
+        count=f"表示する人数 (1〜{AUTOCOMPLETE_LIMIT}、既定 {RANKING_DEFAULT_COUNT})",
+    )
+    @app_commands.choices(ability=[app_commands.Choice(name=label, value=column) for column, label in ABILITY_COLUMNS])
+    async def ranking(self, interaction: discord.Interaction, ability: app_commands.Choice[str],
+                      operator_class: str | None = None,
+                      count: app_commands.Range[int, 1, AUTOCOMPLETE_LIMIT] = RANKING_DEFAULT_COUNT):
+        if not self.db_available or not self.catalog:
+            await interaction.response.send_message("🚨 データベースが利用できないため、ランキングを作成できません。管理者に連絡してください。")
+            return
+
+        results = self.catalog.abilities.top(ability.value, count, operator_class)
+        scope = operator_class or "全クラス"
+        if not results:
+            await interaction.response.send_message(f"{scope}で{ability.name}の記録があるオペレーターはいない。")
+            return
+
+        lines = [
+            f"{i}. ★{op.rarity} **{op.name}** ({op.operator_class}) — {op[ability.value]}"
+            for i, (op, _) in enumerate(results, start=1)
+        ]
+        embed = discord.Embed(
+            title=f"能力測定ランキング: {ability.name} ({scope})",
+            description="\n".join(lines),
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text="同じ評価の場合はレアリティの高い順")
+        await interaction.response.send_message(embed=embed)
+
+    @ranking.autocomplete('operator_class')
+    async def ranking_class_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return await self._facet_autocomplete(interaction, "operator_class", current)
+
+    # ★★★ /card (オペレーターのプロフィールカードを画像で送る) ★★★
+    # 描画もキャッシュファイルの読み込みもワーカースレッドで行う (イベントループを止めない)
+    @app_commands.command(name="card", description="オペレーターのプロフィールカードを画像で表示します。")
+    @app_commands.describe(operator_name="オペレーターの名前（入力中に候補が表示されます）")
+    async def card(self, interaction: discord.Interaction, operator_name: str):
+        await interaction.response.defer(ephemeral=False)
+
+        if not self.db_available:
+            await interaction.followup.send("🚨 データベースが利用できないため、カードを作成できません。管理者に連絡してください。")
+            return
+
+        try:
+            operator = await self.db.get_operator(operator_name)
+            if not operator:
+                await interaction.followup.send(f"オペレーター「{operator_name}」に関する情報はない。名称が正確か再確認してくれ。")
+                return
+
+            png = await asyncio.to_thread(get_card_png, operator)
+            file = discord.File(io.BytesIO(png), filename="operator_card.png")
+            await interaction.followup.send(file=file)
 
         except Exception as e:
-            # エラー発生時はログに出力して、ユーザーにも通知
-            print(f"❌ /search コマンド実行中にエラー: {e}", flush=True)
+            print(f"❌ /card コマンド実行中にエラー: {e}", flush=True)
+            await interaction.followup.send("カードの作成中にエラーが発生しました。", ephemeral=True)
+
+    @card.autocomplete('operator_name')
+    async def card_operator_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return await self.operator_name_autocomplete(interaction, current)
+
+    # ★★★ /similar (似ているオペレーター) ★★★
+    # 類似度行列は populate_db.py で計算済み。ここでは1行取り出して上位を選ぶだけ
+    @app_commands.command(name="similar", description="クラス・職分・能力測定・所属・スキルの傾向が似ているオペレーターを表示します。")
+    @app_commands.describe(
+        operator_name="基準にするオペレーターの名前（入力中に候補が表示されます）",
+        count=f"表示する人数 (1〜{SIMILAR_MAX_COUNT}、既定 {SIMILAR_DEFAULT_COUNT})",
+    )
+    async def similar(self, interaction: discord.Interaction, operator_name: str,
+                      count: app_commands.Range[int, 1, SIMILAR_MAX_COUNT] = SIMILAR_DEFAULT_COUNT):
+        if not self.db_available or not self.catalog:
+            await interaction.response.send_message("🚨 データベースが利用できないため、検索できません。管理者に連絡してください。")
+            return
+        if not self.catalog.similarity:
+            await interaction.response.send_message("類似度データがまだ作られていない。populate_db.py の再実行が必要だ。")
+            return
+
+        operator = self.catalog.find_operator(operator_name)
+        if not operator:
+            await interaction.response.send_message(f"オペレーター「{operator_name}」に関する情報はない。名称が正確か再確認してくれ。")
+            return
+
+        lines = []
+        for char_id, score in self.catalog.similarity.most_similar(operator.char_id, count):
+            other = self.catalog.get_operator_by_id(char_id)
+            if other:
+                lines.append(f"★{other.rarity} **{other.name}** — {other.operator_class}/{other.archetype} (類似度 {score:.2f})")
+        if not lines:
+            await interaction.response.send_message(f"「{operator.name}」の類似度データは見当たらない。")
+            return
+
+        embed = discord.Embed(
+            title=f"{operator.name} に似ているオペレーター",
+            description="\n".join(lines),
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text="クラス・職分・能力測定・所属・スキル/素質の説明文から計算")
+        await interaction.response.send_message(embed=embed)
+
+    @similar.autocomplete('operator_name')
+    async def similar_operator_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return await self.operator_name_autocomplete(interaction, current)
+
+    # ★★★ /effect_search (スキル・素質の効果で検索) ★★★
+    # populate_db.py が作った bigram の転置インデックスで候補を絞るので、説明文を全部なめることはない
+    @app_commands.command(name="effect_search", description="スキル・素質の説明文に含まれる効果からオペレーターを検索します。")
+    @app_commands.describe(keyword="効果の言葉（2文字以上、例：停止、SP、スタン）")
+    async def effect_search(self, interaction: discord.Interaction, keyword: str):
+        if not self.db_available or not self.catalog:
+            await interaction.response.send_message("🚨 データベースが利用できないため、検索できません。管理者に連絡してください。")
+            return
+        if not self.catalog.effects:
+            await interaction.response.send_message("効果検索インデックスがまだ作られていない。populate_db.py の再実行が必要だ。")
+            return
+
+        keyword = keyword.strip()
+        if len(keyword) < 2:
+            await interaction.response.send_message("検索語は2文字以上で指定してくれ。")
+            return
+
+        results = self.catalog.search_effects(keyword)
+        if not results:
+            await interaction.response.send_message(f"「{keyword}」に該当するスキル・素質は見当たらない。")
+            return
+
+        # 同じオペレーターの複数のスキルが当たった場合はまとめる (レアリティの高い順)
+        by_operator = {}
+        for op, label, skill_name, desc in results:
+            by_operator.setdefault(op, []).append(f"{label} {skill_name}: {_effect_snippet(desc, keyword)}")
+        ranked = sorted(by_operator.items(), key=lambda item: (-(item[0].rarity or 0), item[0].name))
+
+        embed = discord.Embed(
+            title=f"効果検索: {keyword}",
+            description=f"{len(ranked)} 名のオペレーターの {len(results)} 件のスキル・素質が該当",
+            color=discord.Color.blue()
+        )
+        for op, lines in ranked[:EFFECT_SEARCH_LIMIT]:
+            embed.add_field(name=f"★{op.rarity} {op.name}", value="\n".join(lines)[:1024], inline=False)
+        if len(ranked) > EFFECT_SEARCH_LIMIT:
+            embed.set_footer(text=f"他 {len(ranked) - EFFECT_SEARCH_LIMIT} 名。言葉を増やして絞り込んでくれ。")
+        await interaction.response.send_message(embed=embed)
+
+    # ★★★ /skill (スキルを好きなレベルで表示) ★★★
+    # populate_db.py が全レベルを skills テーブルに保存している。説明文の値は表示する時に埋める
+    @app_commands.command(name="skill", description="オペレーターのスキルを指定したレベル (Lv1〜7、特化1〜3) で表示します。")
+    @app_commands.describe(
+        operator_name="オペレーターの名前（入力中に候補が表示されます）",
+        slot="スキル (S1〜S3)",
+        level="スキルレベル",
+    )
+    @app_commands.choices(
+        slot=[app_commands.Choice(name=f"S{n}", value=n) for n in (1, 2, 3)],
+        level=[app_commands.Choice(name=name, value=value) for name, value in SKILL_LEVELS],
+    )
+    async def skill(self, interaction: discord.Interaction, operator_name: str,
+                    slot: app_commands.Choice[int], level: app_commands.Choice[int]):
+        await interaction.response.defer(ephemeral=False)
+
+        if not self.db_available:
+            await interaction.followup.send("🚨 データベースが利用できないため、スキル情報を検索できません。管理者に連絡してください。")
+            return
+
+        try:
+            operator = await self.db.get_operator(operator_name)
+            if not operator:
+                await interaction.followup.send(f"オペレーター「{operator_name}」に関する情報はない。名称が正確か再確認してくれ。")
+                return
+
+            skill_row = await self.db.get_skill_level(operator['char_id'], slot.value, level.value)
+            if not skill_row:
+                await interaction.followup.send(f"{operator['name']} の {slot.name} の {level.name} の記録はない。（低レアのスキルは Lv7 まで、特化は★4以上のみ）")
+                return
+
+            embed = discord.Embed(
+                title=f"{operator['name']} {slot.name}: {skill_row['name']} ({level.name})",
+                description=render_skill_json(skill_row['desc_template'], skill_row['blackboard_json']) or "説明なし",
+                color=discord.Color.blue()
+            )
+            if skill_row['sp_cost'] is not None:
+                embed.add_field(name="必要SP", value=str(skill_row['sp_cost']), inline=True)
+                embed.add_field(name="初期SP", value=str(skill_row['initial_sp']), inline=True)
+            if skill_row['duration'] and skill_row['duration'] > 0:
+                embed.add_field(name="持続時間", value=f"{skill_row['duration']:g}秒", inline=True)
+            await interaction.followup.send(embed=embed)
+
+        except sqlite3.OperationalError as e:
+            # populate_db.py が古く skills テーブルが無い場合など
+            print(f"❌ /skill 実行中にエラー: {e}", flush=True)
+            await interaction.followup.send("スキルのレベル別データが利用できない。populate_db.py の再実行が必要だ。")
+        except Exception as e:
+            print(f"❌ /skill コマンド実行中にエラー: {e}", flush=True)
+            await interaction.followup.send("検索中にエラーが発生しました。", ephemeral=True)
+
+    @skill.autocomplete('operator_name')
+    async def skill_operator_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return await self.operator_name_autocomplete(interaction, current)
+
+    # ★★★ /recruit (公開求人のタグの組み合わせ計算) ★★★
+    # 起動時に作ったビットマスク (RecruitIndex) で全組み合わせを絞り込むので、SQLite には問い合わせない
+    @app_commands.command(name="recruit", description="公開求人のタグから、高レアリティが確定する組み合わせを計算します。")
+    @app_commands.describe(
+        tag1="タグ1（入力中に候補が表示されます）",
+        tag2="タグ2", tag3="タグ3", tag4="タグ4", tag5="タグ5",
+    )
+    async def recruit(self, interaction: discord.Interaction, tag1: str,
+                      tag2: str | None = None, tag3: str | None = None, tag4: str | None = None, tag5: str | None = None):
+        if not self.db_available or not self.catalog:
+            await interaction.response.send_message("🚨 データベースが利用できないため、公開求人を計算できません。管理者に連絡してください。")
+            return
+        recruit_index = self.catalog.recruit
+        if not recruit_index:
+            await interaction.response.send_message("公開求人のデータがまだ作られていない。populate_db.py の再実行が必要だ。")
+            return
+
+        tag_ids = []
+        for name in filter(None, (tag1, tag2, tag3, tag4, tag5)):
+            tag_id = recruit_index.resolve_tag(name)
+            if tag_id is None:
+                await interaction.response.send_message(f"タグ「{name}」は公開求人のタグにない。候補から選んでくれ。")
+                return
+            if tag_id not in tag_ids:
+                tag_ids.append(tag_id)
+
+        # レアリティが高い順 → タグが少ない順 (同じ結果なら選ぶタグは少ない方がよい)
+        results = sorted(recruit_index.combinations(tag_ids), key=lambda item: (-item[1], len(item[0])))
+        notable = [item for item in results if item[1] >= RECRUIT_NOTABLE_RARITY or ROBOT_TAG_ID in item[0]]
+
+        tag_names = recruit_index.tag_names
+        embed = discord.Embed(
+            title=f"公開求人: {' / '.join(tag_names[tag_id] for tag_id in tag_ids)}",
+            description=f"{len(results)} 通りの組み合わせのうち、★{RECRUIT_NOTABLE_RARITY}以上が確定するものは {len(notable)} 通り",
+            color=discord.Color.blue()
+        )
+        for chosen, min_rarity, operators in notable[:RECRUIT_RESULT_LIMIT]:
+            label = "★1 (ロボット)" if min_rarity == 1 else f"★{min_rarity}以上"
+            embed.add_field(
+                name=f"{label}確定: {' + '.join(tag_names[tag_id] for tag_id in chosen)}",
+                value=_roster_text([f"★{op.rarity} {op.name}" for op in operators]),
+                inline=False,
+            )
+        if not notable:
+            embed.add_field(name="結果", value="高レアリティが確定する組み合わせはない。★3以上がランダムに出る。", inline=False)
+        embed.set_footer(text="求人時間 9:00 の場合（★1・★2は出ない。ロボットは 3:50 以下の時のみ）")
+        await interaction.response.send_message(embed=embed)
+
+    @recruit.autocomplete('tag1')
+    @recruit.autocomplete('tag2')
+    @recruit.autocomplete('tag3')
+    @recruit.autocomplete('tag4')
+    @recruit.autocomplete('tag5')
+    async def recruit_tag_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        if not self.catalog or not self.catalog.recruit:
+            return []
+        # 他の欄で選んだタグは候補から外す
+        namespace = interaction.namespace
+        chosen = {normalize_name(getattr(namespace, f"tag{n}", None) or "") for n in range(1, MAX_SELECTED_TAGS + 1)}
+        key = normalize_name(current)
+        choices = []
+        for _, name in self.catalog.recruit.tags:
+            tag_key = normalize_name(name)
+            if (key and key not in tag_key) or (tag_key in chosen and tag_key != key):
+                continue
+            choices.append(app_commands.Choice(name=name, value=name))
+            if len(choices) >= AUTOCOMPLETE_LIMIT:
+                break
+        return choices
+
+    # ★★★ /dps (敵の防御力・術耐性に対する DPS) ★★★
+    # 全オペレーターのステータスとスキル倍率はカタログの DpsTable (NumPy 配列) にあるので、ランキングも配列演算1回で終わる
+    @app_commands.command(name="dps", description="敵の防御力・術耐性に対するオペレーターの DPS を計算します（クラスのランキングも可）。")
+    @app_commands.describe(
+        operator_name="オペレーターの名前（省略するとランキング）",
+        operator_class="ランキングのクラス（例：術師、省略すると全クラス。operator_name と一緒には指定できない）",
+        enemy_def=f"敵の防御力 (0〜{DPS_MAX_ENEMY_DEF})",
+        enemy_res="敵の術耐性 (0〜100)",
+        count=f"ランキングの人数 (1〜{AUTOCOMPLETE_LIMIT}、既定 {RANKING_DEFAULT_COUNT})",
+    )
+    async def dps(self, interaction: discord.Interaction, operator_name: str | None = None, operator_class: str | None = None,
+                  enemy_def: app_commands.Range[int, 0, DPS_MAX_ENEMY_DEF] = 0,
+                  enemy_res: app_commands.Range[int, 0, 100] = 0,
+                  count: app_commands.Range[int, 1, AUTOCOMPLETE_LIMIT] = RANKING_DEFAULT_COUNT):
+        if not self.db_available or not self.catalog:
+            await interaction.response.send_message("🚨 データベースが利用できないため、DPS を計算できません。管理者に連絡してください。")
+            return
+        dps_table = self.catalog.dps
+        if not dps_table:
+            await interaction.response.send_message("ステータスのデータがまだ作られていない。populate_db.py の再実行が必要だ。")
+            return
+
+        if operator_name and operator_class:
+            # クラスはランキングの絞り込みにしか使わないので、黙って無視せずに指摘する
+            await interaction.response.send_message("operator_class はランキング用だ。オペレーターを指定する時は operator_name だけにしてくれ。", ephemeral=True)
+            return
+
+        enemy = f"防御力 {enemy_def} / 術耐性 {enemy_res}"
+        footer = "最大昇進・最大レベル・スキル最終レベル。単体1ヒット、素質・潜在・信頼度・モジュールは含まない"
+        if operator_name:
+            operator = self.catalog.find_operator(operator_name)
+            result = dps_table.operator(operator.char_id, enemy_def, enemy_res) if operator else None
+            if not result:
+                await interaction.response.send_message(f"オペレーター「{operator_name}」のステータスは見当たらない。名称が正確か再確認してくれ。")
+                return
+            kind = DAMAGE_TYPE_LABELS[result["damage_type"]]
+            unit = "HPS" if result["damage_type"] == "heal" else "DPS"
+            embed = discord.Embed(
+                title=f"{operator.name} の {unit} ({enemy})",
+                description=f"{kind} / 攻撃力 {result['atk']:.0f} / 攻撃間隔 {result['interval']:.2f}秒\n通常攻撃: **{result['normal']:.0f}** {unit}",
+                color=discord.Color.blue()
+            )
+            for slot, name, burst, sustained, sp_cost, duration in result["skills"]:
+                if duration < 0:
+                    timing = "退場まで"
+                elif duration == 0:
+                    timing = "攻撃1回"
+                else:
+                    timing = f"{duration:g}秒"
+                embed.add_field(
+                    name=f"S{slot} {name or '-'} (SP {sp_cost} / {timing})",
+                    value=f"スキル中 **{burst:.0f}** / 平均 **{sustained:.0f}** {unit}",
+                    inline=False,
+                )
+            embed.set_footer(text=footer)
+            await interaction.response.send_message(embed=embed)
+            return
+
+        results = dps_table.rank(enemy_def, enemy_res, operator_class, count)
+        scope = operator_class or "全クラス"
+        if not results:
+            await interaction.response.send_message(f"{scope}のステータスの記録があるオペレーターはいない。")
+            return
+        lines = [
+            f"{i}. ★{op.rarity} **{op.name}** ({DAMAGE_TYPE_LABELS[kind]}) — 平均 {sustained:.0f} / スキル中 {burst:.0f}"
+            + (f" (S{slot})" if slot else "")
+            for i, (op, kind, sustained, burst, slot) in enumerate(results, start=1)
+        ]
+        unit = "HPS" if all(item[1] == "heal" for item in results) else "DPS"
+        embed = discord.Embed(
+            title=f"{unit} ランキング: {scope} ({enemy})",
+            description="\n".join(lines),
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text=f"平均が一番高いスキルで比較。{footer}")
+        await interaction.response.send_message(embed=embed)
+
+    @dps.autocomplete('operator_name')
+    async def dps_operator_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return await self.operator_name_autocomplete(interaction, current)
+
+    @dps.autocomplete('operator_class')
+    async def dps_class_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return await self._facet_autocomplete(interaction, "operator_class", current)
+
+    # ★★★ /materials (昇進・スキル・特化に必要な素材) ★★★
+    # 素材の分解はカタログの MaterialPlanner がメモ化しているので、同じ目標の2回目以降はキャッシュから返る
+    @app_commands.command(name="materials", description="オペレーターの昇進・スキル・特化に必要な素材を計算します（3人まで合算）。")
+    @app_commands.describe(
+        operator1="オペレーターの名前（入力中に候補が表示されます）",
+        operator2="一緒に計算するオペレーター", operator3="一緒に計算するオペレーター",
+        elite=f"目標の昇進段階 (0〜{MAX_ELITE}、既定 {MAX_ELITE})",
+        skill_level=f"目標のスキルレベル (1〜{MAX_SKILL_LEVEL}、既定 {MAX_SKILL_LEVEL})",
+        mastery_slot="特化するスキル（既定 なし）",
+        mastery=f"目標の特化ランク (1〜{MAX_MASTERY}、既定 {MAX_MASTERY})",
+    )
+    @app_commands.choices(mastery_slot=[app_commands.Choice(name=name, value=value) for name, value in MASTERY_SLOT_CHOICES])
+    async def materials(self, interaction: discord.Interaction, operator1: str,
+                        operator2: str | None = None, operator3: str | None = None,
+                        elite: app_commands.Range[int, 0, MAX_ELITE] = MAX_ELITE,
+                        skill_level: app_commands.Range[int, 1, MAX_SKILL_LEVEL] = MAX_SKILL_LEVEL,
+                        mastery_slot: app_commands.Choice[int] | None = None,
+                        mastery: app_commands.Range[int, 1, MAX_MASTERY] = MAX_MASTERY):
+        if not self.db_available or not self.catalog:
+            await interaction.response.send_message("🚨 データベースが利用できないため、素材を計算できません。管理者に連絡してください。")
+            return
+        planner = self.catalog.materials
+        if not planner:
+            await interaction.response.send_message("素材のデータがまだ作られていない。populate_db.py の再実行が必要だ。")
+            return
+
+        slots = mastery_slot.value if mastery_slot else 0
+        masteries = tuple(mastery if slots >> i & 1 else 0 for i in range(3))
+        operators = []
+        for name in filter(None, (operator1, operator2, operator3)):
+            operator = self.catalog.find_operator(name)
+            if not operator:
+                await interaction.response.send_message(f"オペレーター「{name}」に関する情報はない。名称が正確か再確認してくれ。")
+                return
+            if operator not in operators:
+                operators.append(operator)
+
+        # 目標はタプルにして LRU キャッシュのキーにする (並び順が違っても同じ計算になるように char_id 順)
+        targets = tuple(sorted((op.char_id, elite, skill_level, masteries) for op in operators))
+        direct, base = planner.plan(targets)
+        if not direct:
+            await interaction.response.send_message("その目標までに必要な素材はない。")
+            return
+
+        def item_lines(counts):
+            return _roster_text([f"{planner.item_name(item_id)} x{count:,}" for item_id, count in counts if item_id != GOLD_ITEM_ID])
+
+        goal = f"昇進{elite} / スキルLv{skill_level}"
+        if slots:
+            goal += " / " + "・".join(f"S{i + 1}" for i in range(3) if slots >> i & 1) + f"特化{mastery}"
+        gold = dict(base).get(GOLD_ITEM_ID, 0)
+        embed = discord.Embed(
+            title=f"必要素材: {'、'.join(op.name for op in operators)}",
+            description=f"{goal}\n龍門幣 (加工費込み): {gold:,}",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="必要な素材", value=item_lines(direct) or "-", inline=False)
+        embed.add_field(name="基本素材まで分解した場合", value=item_lines(base) or "-", inline=False)
+        embed.set_footer(text="未育成 (昇進0・スキルLv1) からの合計。レベル上げの作戦記録・龍門幣は含まない")
+        await interaction.response.send_message(embed=embed)
+
+    @materials.autocomplete('operator1')
+    @materials.autocomplete('operator2')
+    @materials.autocomplete('operator3')
+    async def materials_operator_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        return await self.operator_name_autocomplete(interaction, current)
+
+    # ★★★ /farm (素材をドロップするステージ) ★★★
+    # stage_drops は (item_id, priority) の順に並んでいるので、おすすめ順の上位は主キーの範囲読み出し1回で取れる
+    @app_commands.command(name="farm", description="素材をドロップするステージをおすすめ順に表示します。")
+    @app_commands.describe(
+        item="素材の名前（入力中に候補が表示されます）",
+        count=f"表示するステージの数 (1〜{AUTOCOMPLETE_LIMIT}、既定 {FARM_DEFAULT_COUNT})",
+    )
+    async def farm(self, interaction: discord.Interaction, item: str,
+                   count: app_commands.Range[int, 1, AUTOCOMPLETE_LIMIT] = FARM_DEFAULT_COUNT):
+        if not self.db_available or not self.catalog:
+            await interaction.response.send_message("🚨 データベースが利用できないため、検索できません。管理者に連絡してください。")
+            return
+        if not self.catalog.farm_items:
+            await interaction.response.send_message("ドロップのデータがまだ作られていない。populate_db.py の再実行が必要だ。")
+            return
+
+        found = self.catalog.find_farm_item(item)
+        if not found:
+            await interaction.response.send_message(f"「{item}」をドロップするステージは見当たらない。候補から選んでくれ。")
+            return
+        item_id, item_name = found
+
+        try:
+            rows = await self.db.get_stage_drops(item_id, count)
+        except sqlite3.OperationalError as e:
+            print(f"❌ /farm 実行中にエラー: {e}", flush=True)
+            await interaction.response.send_message("ドロップのデータが利用できない。populate_db.py の再実行が必要だ。")
+            return
+
+        lines = [
+            f"{i}. **{row['code'] or '-'}** {row['stage_name'] or ''} ({STAGE_TYPE_LABELS.get(row['stage_type'], row['stage_type'] or '-')})"
+            f" — 理性{row['ap_cost']} / {DROP_TYPE_LABELS.get(row['drop_type'], row['drop_type'])}・{OCCURRENCE_LABELS.get(row['occurrence'], '-')}"
+            for i, row in enumerate(rows, start=1)
+        ]
+        embed = discord.Embed(
+            title=f"{item_name} のドロップステージ",
+            description="\n".join(lines) or "-",
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text="ドロップの種類 → 出やすさ → 常設 → 消費理性 の順。出やすさはゲーム内の表示区分 (実測のドロップ率ではない)")
+        await interaction.response.send_message(embed=embed)
+
+    @farm.autocomplete('item')
+    async def farm_item_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        if not self.catalog:
+            return []
+        return [app_commands.Choice(name=name, value=name) for name in self.catalog.farm_item_index.complete(current)]
+
+    # ★★★ /enemy (敵図鑑とステータス) ★★★
+    # 敵は全部カタログ (メモリ) にあるので、SQLite には問い合わせない
+    @app_commands.command(name="enemy", description="敵のステータスと能力を表示します。")
+    @app_commands.describe(enemy_name="敵の名前（入力中に候補が表示されます）")
+    async def enemy(self, interaction: discord.Interaction, enemy_name: str):
+        if not self.db_available or not self.catalog:
+            await interaction.response.send_message("🚨 データベースが利用できないため、検索できません。管理者に連絡してください。")
+            return
+        if not self.catalog.enemies:
+            await interaction.response.send_message("敵のデータがまだ作られていない。populate_db.py の再実行が必要だ。")
+            return
+
+        enemy = self.catalog.find_enemy(enemy_name)
+        if not enemy:
+            await interaction.response.send_message(f"敵「{enemy_name}」に関する記録はない。名称が正確か再確認してくれ。")
+            return
+
+        level = ENEMY_LEVEL_LABELS.get(enemy.enemy_level, enemy.enemy_level or "-")
+        damage_types = "・".join(ENEMY_DAMAGE_TYPE_LABELS.get(kind, kind) for kind in (enemy.damage_type or "").split(",") if kind)
+        embed = discord.Embed(
+            title=f"{enemy.name}" + (f" ({enemy.enemy_index})" if enemy.enemy_index else ""),
+            description=(enemy.description or "")[:1000],
+            color=discord.Color.red() if enemy.enemy_level == "BOSS" else discord.Color.blue()
+        )
+        embed.add_field(name="区分", value=level, inline=True)
+        embed.add_field(name="種族", value=enemy.race or "-", inline=True)
+        embed.add_field(name="攻撃", value=" / ".join(filter(None, (enemy.attack_type, damage_types))) or "-", inline=True)
+        embed.add_field(name="HP", value=_format_stat(enemy.max_hp), inline=True)
+        embed.add_field(name="攻撃力", value=_format_stat(enemy.atk), inline=True)
+        embed.add_field(name="防御力", value=_format_stat(enemy["def"]), inline=True)
+        embed.add_field(name="術耐性", value=_format_stat(enemy.magic_resistance), inline=True)
+        embed.add_field(name="攻撃間隔", value=_format_stat(enemy.base_attack_time), inline=True)
+        embed.add_field(name="移動速度", value=_format_stat(enemy.move_speed), inline=True)
+        embed.add_field(name="重量", value=_format_stat(enemy.mass_level), inline=True)
+        embed.add_field(name="目標耐久減少", value=_format_stat(enemy.life_point_reduce), inline=True)
+        embed.add_field(name="攻撃範囲", value=_format_stat(enemy.range_radius), inline=True)
+        if enemy.ability:
+            embed.add_field(name="能力", value=enemy.ability[:1024], inline=False)
+        embed.set_footer(text="ステータスは敵データのレベル0 (ステージごとの強化は含まない)")
+        await interaction.response.send_message(embed=embed)
+
+    @enemy.autocomplete('enemy_name')
+    async def enemy_name_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        if not self.catalog:
+            return []
+        return [app_commands.Choice(name=name, value=name) for name in self.catalog.enemy_index.complete(current)]
+
+    # ★★★ 全文検索 (populate_db.py が作る lore_fts テーブルを使う) ★★★
+    @app_commands.command(name="lore_search", description="プロファイル・Lore・スキル・素質の本文からオペレーターを全文検索します。")
+    @app_commands.describe(keyword="本文に含まれる言葉（3文字以上、例：チェルノボーグ）")
+    async def lore_search(self, interaction: discord.Interaction, keyword: str):
+        await interaction.response.defer(ephemeral=False)
+
+        if not self.db_available:
+            await interaction.followup.send("🚨 データベースが利用できないため、検索できません。管理者に連絡してください。")
+            return
+
+        keyword = keyword.strip()
+        # trigram トークナイザは3文字未満の語を索引できない
+        if len(keyword) < 3:
+            await interaction.followup.send("検索語は3文字以上で指定してくれ。")
+            return
+
+        try:
+            results = await self.db.search_lore(keyword, LORE_SEARCH_LIMIT)
+        except sqlite3.OperationalError as e:
+            # populate_db.py が古く lore_fts が無い場合など
+            print(f"❌ /lore_search 実行中にエラー: {e}", flush=True)
+            await interaction.followup.send("全文検索インデックスが利用できない。populate_db.py の再実行が必要だ。")
+            return
+        except Exception as e:
+            print(f"❌ /lore_search 実行中にエラー: {e}", flush=True)
             await interaction.followup.send("検索中にエラーが発生しました。", ephemeral=True)
+            return
+
+        if not results:
+            await interaction.followup.send(f"「{keyword}」に言及している記録は見当たらない。")
+            return
 
-        finally:
-            # データベース接続を必ず閉じる
-            if conn:
-                conn.close()
+        embed = discord.Embed(
+            title=f"全文検索: {keyword}",
+            description=f"関連度の高い順に {len(results)} 件",
+            color=discord.Color.blue()
+        )
+        for name, snippet in results:
+            # 改行はスニペットを読みにくくするので空白に置き換える
+            embed.add_field(name=name, value=snippet.replace("\n", " ")[:1024], inline=False)
+        await interaction.followup.send(embed=embed)
 
 # ★★★ Cogをロードするための setup 関数 ★★★
 # main.py の load_extensions で 'commands.arknights_commands' を追加すること！
 async def setup(bot: commands.Bot):
-    await bot.add_cog(ArknightsCommands(bot))
\ No newline at end of file
+    # DBの確認と operators / organizations のカタログ読み込み (GeminiChat と合わせて1回だけ行われる)
+    await get_database().start()
+    await bot.add_cog(ArknightsCommands(bot))
@@ -4,9 +4,12 @@ from discord.ext import commands
 import json
 import os
 from typing import Dict, Any # 型ヒントのため
+from operator_locales import LOCALES, DEFAULT_LOCALE # アークナイツの表示言語
 
 # 設定ファイルのパス (このCogファイルと同じディレクトリにあると仮定)
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.json')
+# ギルドの設定の中で、アークナイツの表示言語を保存するキー (他のキーは VC の ID)
+LOCALE_KEY = "arknights_locale"
 
 # --- 設定ファイルの読み書き関数 ---
 def load_config() -> Dict[str, Any]:
@@ -35,6 +38,37 @@ def save_config(data: Dict[str, Any]):
     except Exception as e:
         print(f"エラー: 設定ファイル {CONFIG_FILE} への書き込み中にエラーが発生しました: {e}")
 
+# ギルドID (文字列) -> 表示言語 (日本語以外を設定したギルドだけ)
+# /search のたびに config.json を読まないように、最初の1回だけ読み込んでメモリに持つ (/configure_locale で更新する)
+_guild_locales = None
+
+def _load_guild_locales() -> Dict[str, str]:
+    """config.json から全ギルドの表示言語を読み込む"""
+    return {
+        guild_id: guild_config[LOCALE_KEY]
+        for guild_id, guild_config in load_config().items()
+        if isinstance(guild_config, dict) and guild_config.get(LOCALE_KEY) in LOCALES
+    }
+
+def get_guild_locale(guild_id) -> str:
+    """ギルドのアークナイツの表示言語 ('ja_JP' など) を返す (未設定・DMの場合は日本語)"""
+    global _guild_locales
+    if guild_id is None:
+        return DEFAULT_LOCALE
+    if _guild_locales is None:
+        _guild_locales = _load_guild_locales()
+    return _guild_locales.get(str(guild_id), DEFAULT_LOCALE)
+
+def set_guild_locale(guild_id, locale: str):
+    """メモリ上のギルドの表示言語を更新する (config.json への保存は呼び出し側で行う)"""
+    global _guild_locales
+    if _guild_locales is None:
+        _guild_locales = _load_guild_locales()
+    if locale == DEFAULT_LOCALE:
+        _guild_locales.pop(str(guild_id), None)
+    else:
+        _guild_locales[str(guild_id)] = locale
+
 # --- ここからCogクラス ---
 class Configure(commands.Cog):
     def __init__(self, bot):
@@ -87,7 +121,12 @@ class Configure(commands.Cog):
 
             settings_message = "🔧 現在の設定：\n"
             found_settings = False
+            if LOCALE_KEY in guild_config:
+                settings_message += f"- アークナイツの表示言語: {LOCALES.get(guild_config[LOCALE_KEY], guild_config[LOCALE_KEY])}\n"
+                found_settings = True
             for vc_id, setting in guild_config.items():
+                if vc_id == LOCALE_KEY:
+                    continue # VC の設定ではない
                 try:
                     # int() に失敗するキーがある可能性を考慮
                     vc = interaction.guild.get_channel(int(vc_id))
@@ -145,6 +184,29 @@ class Configure(commands.Cog):
             print(f"Error during configure_delete: {e}")
             await interaction.response.send_message(f"⚠️ 設定削除中にエラーが発生しました: {e}", ephemeral=True)
 
+    @app_commands.command(name="configure_locale", description="アークナイツの /search を表示する言語を設定")
+    @app_commands.describe(locale="表示する言語 (どの言語の名前でも検索はできる)")
+    @app_commands.choices(locale=[app_commands.Choice(name=label, value=code) for code, label in LOCALES.items()])
+    async def configure_locale(self, interaction: discord.Interaction, locale: app_commands.Choice[str]):
+        try:
+            guild_id = str(interaction.guild.id)
+            all_configs = load_config()
+            guild_config = all_configs.get(guild_id, {})
+            if locale.value == DEFAULT_LOCALE:
+                guild_config.pop(LOCALE_KEY, None) # 既定の言語に戻す時は設定を消す
+            else:
+                guild_config[LOCALE_KEY] = locale.value
+            if guild_config:
+                all_configs[guild_id] = guild_config
+            else:
+                all_configs.pop(guild_id, None)
+            save_config(all_configs)
+            set_guild_locale(guild_id, locale.value) # 次の /search から反映 (config.json は読み直さない)
+            await interaction.response.send_message(f"✅ アークナイツの表示言語を {locale.name} に設定した", ephemeral=True)
+        except Exception as e:
+            print(f"Error during configure_locale: {e}")
+            await interaction.response.send_message(f"⚠️ 設定保存中にエラーが発生しました: {e}", ephemeral=True)
+
 # このCogを読み込むための setup 関数
 async def setup(bot: commands.Bot):
     await bot.add_cog(Configure(bot))
@@ -3,16 +3,8 @@ from discord.ext import commands
 import google.generativeai as genai
 import os
 import re # メンションをキレイにするため
-import sqlite3
-
-# --- データベースファイルのパス ---
-# このファイル (gemini_chat.py) が commands/ の中にあるので、
-# データベース (my_bot 直下) へのパスは '..' で一つ上に戻る
-DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'arknights_data.db')
-
-# --- DBテーブル名 (typo防止用) ---
-OPERATORS_TABLE = "operators"
-ORGANIZATIONS_TABLE = "organizations" # 追加
+from arknights_db import get_database # アークナイツDBへのアクセスは共通モジュール経由
+from enemies import ENEMY_LEVEL_LABELS # 敵の区分 (通常/精鋭/ボス) の表示名
 
 # --- ここから Cog クラス ---
 class GeminiChat(commands.Cog):
@@ -20,22 +12,7 @@ class GeminiChat(commands.Cog):
         self.bot = bot
         self.api_key = os.getenv("GEMINI_API_KEY")
         self.model = None # モデルは後で初期化
-        self.db_path = DB_PATH # データベースパスを保持
-
-        # ★★★ 起動時にデータベース接続テスト (任意だけど推奨) ★★★
-        if not os.path.exists(self.db_path):
-             print(f"🚨 データベースファイルが見つかりません: {self.db_path}")
-             print("🚨 Arknights情報機能は利用できません。")
-        else:
-             try:
-                 conn = sqlite3.connect(self.db_path)
-                 # 簡単なクエリでテーブルが存在するか確認
-                 conn.execute("SELECT name FROM operators LIMIT 1")
-                 conn.close()
-                 print(f"✅ データベース接続確認OK: {self.db_path}")
-             except sqlite3.Error as e:
-                 print(f"🚨 データベース接続またはテーブル確認中にエラー: {e}")
-                 print("🚨 Arknights情報機能は利用できません。")
+        self.db = get_database() # ArknightsCommands と共有のDBアクセス (setup() で start() 済み)
 
         try:
             genai.configure(api_key=self.api_key)
@@ -109,96 +86,82 @@ class GeminiChat(commands.Cog):
 """
         # ★★★ ここまでキャラクター設定 ★★★
     # ★★★ データベースからオペレーター情報を検索するヘルパー関数 ★★★
-    def _find_operator_data(self, operator_name: str) -> str:
+    async def _find_operator_data(self, operator_name: str) -> str:
         """指定されたオペレーター名をDBで検索し、整形した情報を文字列で返す"""
-        if not os.path.exists(self.db_path):
-            return "" # DBファイルがなければ空文字を返す
-
-        conn = None # conn を try の前に初期化
-        try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row # カラム名でアクセスできるようにする
-            cursor = conn.cursor()
-
-            # 部分一致も考慮するなら name LIKE ? を使う (今回は完全一致で)
-            cursor.execute("SELECT * FROM operators WHERE name = ?", (operator_name,))
-            operator = cursor.fetchone()
-
-            if operator:
-                # データベースから取得した情報を分かりやすいテキストに整形
-                # (どの情報をGeminiに渡すかはここで選ぶ！)
-                info_parts = []
-                info_parts.append(f"名前: {operator['name']} (★{operator['rarity']})")
-                info_parts.append(f"クラス/職分: {operator['operator_class']} / {operator['archetype']}")
-                info_parts.append(f"所属/出身: {operator['affiliation']} / {operator['birthplace']}")
-                info_parts.append(f"種族: {operator['race']}")
-                # info_parts.append(f"能力測定: 物{operator['physical_strength']}, 機{operator['combat_skill']}, 耐{operator['mobility']}, 策{operator['endurance']}, 技{operator['tactical_acumen']}, 適{operator['arts_adaptability']}")
-                if operator['profile_summary']:
-                     info_parts.append(f"\nプロファイル概要:\n{operator['profile_summary'][:300]}...") # 長すぎるので最初の300文字
-                if operator['lore_notes']:
-                     info_parts.append(f"\n経歴・Lore:\n{operator['lore_notes'][:500]}...") # 長すぎるので最初の500文字
-                # スキル情報も追加？
-                if operator['skill1_name']: info_parts.append(f"\nS1: {operator['skill1_name']}\n   {operator['skill1_desc']}")
-                if operator['skill2_name']: info_parts.append(f"S2: {operator['skill2_name']}\n   {operator['skill2_desc']}")
-                if operator['skill3_name']: info_parts.append(f"S3: {operator['skill3_name']}\n   {operator['skill3_desc']}")
-                # 素質情報も追加？
-                if operator['talent1_name']: info_parts.append(f"\n素質1: {operator['talent1_name']}\n   {operator['talent1_desc']}")
-                if operator['talent2_name']: info_parts.append(f"素質2: {operator['talent2_name']}\n   {operator['talent2_desc']}")
-
-                return "\n".join(info_parts) # 各情報を改行で繋げた文字列を返す
-            else:
-                return "" # 見つからなければ空文字
-
-        except sqlite3.Error as e:
-            print(f"データベース検索中にエラー (オペレーター: {operator_name}): {e}")
-            return "" # エラー時も空文字
-        finally:
-            if conn:
-                conn.close() # 必ず接続を閉じる
-
-    # ★★★ データベースから組織情報を検索するヘルパー関数 (新規追加) ★★★
-    def _find_organization_data(self, organization_name: str) -> str:
+        if not self.db.available:
+            return "" # DBが使えなければ空文字を返す
+
+        # 表記ゆれ (ｱｰﾐﾔ / あーみや) も吸収される
+        operator = await self.db.get_operator(operator_name)
+        if not operator:
+            return "" # 見つからなければ空文字
+
+        # データベースから取得した情報を分かりやすいテキストに整形
+        # (どの情報をGeminiに渡すかはここで選ぶ！)
+        info_parts = []
+        info_parts.append(f"名前: {operator['name']} (★{operator['rarity']})")
+        info_parts.append(f"クラス/職分: {operator['operator_class']} / {operator['archetype']}")
+        info_parts.append(f"所属/出身: {operator['affiliation']} / {operator['birthplace']}")
+        info_parts.append(f"種族: {operator['race']}")
+        # info_parts.append(f"能力測定: 物{operator['physical_strength']}, 機{operator['mobility']}, 耐{operator['endurance']}, 策{operator['tactical_acumen']}, 技{operator['combat_skill']}, 適{operator['arts_adaptability']}")
+        if operator['profile_summary']:
+             info_parts.append(f"\nプロファイル概要:\n{operator['profile_summary'][:300]}...") # 長すぎるので最初の300文字
+        if operator['lore_notes']:
+             info_parts.append(f"\n経歴・Lore:\n{operator['lore_notes'][:500]}...") # 長すぎるので最初の500文字
+        # スキル情報も追加？
+        if operator['skill1_name']: info_parts.append(f"\nS1: {operator['skill1_name']}\n   {operator['skill1_desc']}")
+        if operator['skill2_name']: info_parts.append(f"S2: {operator['skill2_name']}\n   {operator['skill2_desc']}")
+        if operator['skill3_name']: info_parts.append(f"S3: {operator['skill3_name']}\n   {operator['skill3_desc']}")
+        # 素質情報も追加？
+        if operator['talent1_name']: info_parts.append(f"\n素質1: {operator['talent1_name']}\n   {operator['talent1_desc']}")
+        if operator['talent2_name']: info_parts.append(f"素質2: {operator['talent2_name']}\n   {operator['talent2_desc']}")
+
+        return "\n".join(info_parts) # 各情報を改行で繋げた文字列を返す
+
+    # ★★★ データベースから組織情報を検索するヘルパー関数 ★★★
+    async def _find_organization_data(self, organization_name: str) -> str:
         """指定された組織名をDBで検索し、整形した情報を文字列で返す"""
-        if not os.path.exists(self.db_path):
-            return "" # DBファイルがなければ空文字を返す
-        
-        conn = None
-        try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row # カラム名でアクセスできるようにする
-            cursor = conn.cursor()
-
-            # 日本語名 (name) または ID (id) で検索を試みる
-            cursor.execute(f"SELECT * FROM {ORGANIZATIONS_TABLE} WHERE name = ?", (organization_name,))
-            organization = cursor.fetchone()
-
-            if not organization:
-                # 日本語名で見つからなければIDで検索を試みる (小文字化して比較)
-                cursor.execute(f"SELECT * FROM {ORGANIZATIONS_TABLE} WHERE LOWER(id) = ?", (organization_name.lower(),))
-                organization = cursor.fetchone()
-
-            if organization:
-                # データベースから取得した情報を分かりやすいテキストに整形
-                info_parts = []
-                info_parts.append(f"組織名: {organization['name']} (ID: {organization['id']}, タイプ: {organization['type']})")
-                if organization['description']:
-                    # description も長ければ切り詰め
-                    info_parts.append(f"\n概要:\n{organization['description'][:500]}...")
-                if organization['lore']:
-                    # lore も長ければ切り詰め
-                    info_parts.append(f"\nLore:\n{organization['lore'][:800]}...")
-                # color や order_num はAIへの情報としては不要と判断
-
-                return "\n".join(info_parts) # 各情報を改行で繋げた文字列を返す
-            else:
-                return "" # 見つからなければ空文字
-            
-        except sqlite3.Error as e:
-            print(f"データベース検索中にエラー (組織: {organization_name}): {e}")
-            return "" # エラー時も空文字
-        finally:
-            if conn:
-                conn.close() # 必ず接続を閉じる
+        if not self.db.available:
+            return "" # DBが使えなければ空文字を返す
+
+        # 日本語名 (表記ゆれ可) または ID ('ursus' など) で検索
+        organization = await self.db.get_organization(organization_name)
+        if not organization:
+            return "" # 見つからなければ空文字
+
+        # データベースから取得した情報を分かりやすいテキストに整形
+        info_parts = []
+        info_parts.append(f"組織名: {organization['name']} (ID: {organization['id']}, タイプ: {organization['type']})")
+        if organization['description']:
+            # description も長ければ切り詰め
+            info_parts.append(f"\n概要:\n{organization['description'][:500]}...")
+        if organization['lore']:
+            # lore も長ければ切り詰め
+            info_parts.append(f"\nLore:\n{organization['lore'][:800]}...")
+        # color や order_num はAIへの情報としては不要と判断
+
+        return "\n".join(info_parts) # 各情報を改行で繋げた文字列を返す
+
+    # ★★★ メッセージに名前が出てくる敵 (ボスなど) の情報を集めるヘルパー関数 ★★★
+    async def _find_enemy_data(self, text: str) -> str:
+        """メッセージ中に名前がある敵をカタログ (メモリ) から探し、整形した情報を文字列で返す"""
+        if not self.db.available:
+            return "" # DBが使えなければ空文字を返す
+
+        # 「〇〇について」の形でなくても、文章のどこかに敵の名前があれば見つかる
+        enemies = await self.db.find_enemies_in_text(text)
+        blocks = []
+        for enemy in enemies:
+            info_parts = []
+            info_parts.append(f"敵の名前: {enemy['name']} ({ENEMY_LEVEL_LABELS.get(enemy['enemy_level'], enemy['enemy_level'])})")
+            info_parts.append(f"種族: {enemy['race'] or '不明'} / 攻撃方式: {enemy['attack_type'] or '不明'}")
+            info_parts.append(f"ステータス: HP {enemy['max_hp']}, 攻撃力 {enemy['atk']}, 防御力 {enemy['def']}, 術耐性 {enemy['magic_resistance']}")
+            if enemy['description']:
+                info_parts.append(f"\n説明:\n{enemy['description'][:300]}")
+            if enemy['ability']:
+                info_parts.append(f"\n能力:\n{enemy['ability'][:500]}")
+            blocks.append("\n".join(info_parts))
+        return "\n\n".join(blocks)
 
     async def generate_reply(self, user_message: str, db_context: str = "") -> str:
         """Gemini APIを使って応答を生成する関数"""
@@ -298,6 +261,10 @@ class GeminiChat(commands.Cog):
             # --- ▼▼▼ DB検索処理をオペレーターと組織両方に対応 ▼▼▼ ---
             db_context_data = ""
 
+            # populate_db.py でデータが更新されていたらカタログを読み直す (スラッシュコマンドと同じ間隔で確認)
+            # 読み直しはバックグラウンドで行い、このメッセージには今のカタログで答える
+            self.db.schedule_refresh()
+
             # シンプルなオペレーター名/組織名検出ロジック (改善の余地あり！)
             # 「〇〇について教えて」「〇〇のこと」「〇〇の詳細」「〇〇の情報」のような形式を仮定
             # または、メッセージ中の単語をそのまま候補とする
@@ -324,7 +291,7 @@ class GeminiChat(commands.Cog):
             # 候補名を順に試してDB検索
             for p_name in potential_names:
                  # オペレーター情報を検索
-                 op_info = self._find_operator_data(p_name)
+                 op_info = await self._find_operator_data(p_name)
                  if op_info:
                     found_op_info = op_info
                     print(f"Found operator info for: {p_name}")
@@ -336,13 +303,18 @@ class GeminiChat(commands.Cog):
             # （ここではオペレーターが見つかっても組織は別に検索する設計にする）
             for p_name in potential_names:
                  # 組織情報を検索
-                 org_info = self._find_organization_data(p_name)
+                 org_info = await self._find_organization_data(p_name)
                  if org_info:
                     found_org_info = org_info
                     print(f"Found organization info for: {p_name}")
                     # 組織も見つかったら次の候補は組織検索しない
                     break
 
+            # 敵 (ボスなど) はメッセージ全体から名前を探す
+            found_enemy_info = await self._find_enemy_data(user_text)
+            if found_enemy_info:
+                print("Found enemy info in message.")
+
             # 見つかった情報を結合してGeminiに渡すデータを作成
             if found_op_info:
                 db_context_data += f"--- オペレーター情報 ---\n{found_op_info}\n"
@@ -353,6 +325,11 @@ class GeminiChat(commands.Cog):
                     db_context_data += "\n"
                 db_context_data += f"--- 組織情報 ---\n{found_org_info}\n"
 
+            if found_enemy_info:
+                if db_context_data:
+                    db_context_data += "\n"
+                db_context_data += f"--- 敵情報 ---\n{found_enemy_info}\n"
+
             if not db_context_data:
                 print(f"No relevant DB info found for detected names.")
 
@@ -380,4 +357,6 @@ class GeminiChat(commands.Cog):
 
 # このCogを読み込むための setup 関数
 async def setup(bot: commands.Bot):
+    # DBの確認とカタログ読み込み (ArknightsCommands と合わせて1回だけ行われる)
+    await get_database().start()
     await bot.add_cog(GeminiChat(bot))
@@ -68,6 +68,12 @@ class SystemInfo(commands.Cog):
 
             embed.add_field(name="💽 ディスク使用率 (/)", value=f"{disk_percent:.1f}%", inline=True)
             embed.add_field(name="💾 使用量", value=f"{disk_used_gb:.1f} GB / {disk_total_gb:.1f} GB", inline=True)
+
+            # アークナイツDBのデータバージョンと /search のキャッシュ状況 (Cog が読み込まれていれば)
+            arknights_cog = self.bot.get_cog("ArknightsCommands")
+            if arknights_cog:
+                embed.add_field(name="📚 アークナイツDB", value=f"データバージョン: {arknights_cog.db.data_version}", inline=True)
+                embed.add_field(name="🗃️ /search キャッシュ", value=arknights_cog.search_cache.stats(), inline=True)
             # フッターに現在の時刻とか表示してもいいね！
             embed.set_footer(text=f"取得時刻: {discord.utils.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}")
 
@@ -1,20 +1,41 @@
 # create_db.py
+# テーブル定義はここにまとめる。populate_db.py からも create_tables() を呼んで、古いDBを最新のスキーマに合わせる
 import sqlite3
 import os
+from datetime import datetime
+from ability_ratings import RANK_COLUMNS # 能力測定を数値にしたカラム
+from operator_locales import LOCALIZED_COLUMNS # ロケールごとに持つカラム (get_localized_operator() が読む)
 
 DB_FILENAME = 'arknights_data.db'
 OPERATORS_TABLE = 'operators'
+ORGANIZATIONS_TABLE = 'organizations'
+OPERATOR_SECTIONS_TABLE = 'operator_sections'
+FACTION_MEMBERS_TABLE = 'faction_members'
+META_TABLE = 'meta'
+SIMILARITY_TABLE = 'operator_similarity'
+EFFECT_DOCS_TABLE = 'effect_docs'
+EFFECT_POSTINGS_TABLE = 'effect_postings'
+SKILLS_TABLE = 'skills'
+OPERATOR_SKILLS_TABLE = 'operator_skills'
+OPERATOR_LOCALES_TABLE = 'operator_locales'
+RECRUIT_TAGS_TABLE = 'recruit_tags'
+RECRUIT_POOL_TABLE = 'recruit_pool'
+OPERATOR_ATTRIBUTES_TABLE = 'operator_attributes'
+ITEMS_TABLE = 'items'
+WORKSHOP_FORMULAS_TABLE = 'workshop_formulas'
+OPERATOR_COSTS_TABLE = 'operator_costs'
+STAGE_DROPS_TABLE = 'stage_drops'
+ENEMIES_TABLE = 'enemies'
+LORE_FTS_TABLE = 'lore_fts' # populate_db.py が operators から毎回作り直す全文検索テーブル
 script_dir = os.path.dirname(__file__) # このスクリプトがある場所
 db_path = os.path.join(script_dir, DB_FILENAME)
-print(f"データベースファイルのパス: {db_path}")
-
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
 
 # operators テーブルを作成 (IF NOT EXISTS で安全に)
 create_table_sql = f"""
 CREATE TABLE IF NOT EXISTS {OPERATORS_TABLE} (
-    name TEXT PRIMARY KEY,
+    char_id TEXT PRIMARY KEY, -- ゲーム内のキャラID ('char_002_amiya' など)。同名の別バージョンも別の行になる
+    name TEXT NOT NULL,
+    name_key TEXT,           -- name_normalize.normalize_name(name) (表記ゆれ吸収用の検索キー)
     rarity INTEGER,
     operator_class TEXT,
     archetype TEXT,
@@ -28,6 +49,12 @@ CREATE TABLE IF NOT EXISTS {OPERATORS_TABLE} (
     endurance TEXT,
     tactical_acumen TEXT,
     arts_adaptability TEXT,
+    physical_strength_rank INTEGER, -- 能力測定の評価を数値にしたもの (ability_ratings.parse_rating、1=欠落〜5=卓越)
+    mobility_rank INTEGER,
+    endurance_rank INTEGER,
+    tactical_acumen_rank INTEGER,
+    combat_skill_rank INTEGER,
+    arts_adaptability_rank INTEGER,
     profile_summary TEXT,
     lore_notes TEXT,
     skill1_name TEXT, skill1_desc TEXT,
@@ -39,12 +66,11 @@ CREATE TABLE IF NOT EXISTS {OPERATORS_TABLE} (
 """
 
 # ★★★ 新しい organizations テーブルを作成！ ★★★
-ORGANIZATIONS_TABLE = 'organizations'
-
 create_organizations_table_sql = f"""
 CREATE TABLE IF NOT EXISTS {ORGANIZATIONS_TABLE} (
     id TEXT PRIMARY KEY,     -- 'ursus', 'rhodes', 'penguin' みたいなID
     name TEXT UNIQUE,        -- 'ウルサス', 'ロドス・アイランド', 'ペンギン急便' みたいな日本語名
+    name_key TEXT,           -- name_normalize.normalize_name(name) (表記ゆれ吸収用の検索キー)
     type TEXT,               -- 'Nation' (国), 'Faction' (勢力), 'Team' (チーム) みたいな分類
     description TEXT,        -- 組織の簡単な説明 (もしあれば)
     lore TEXT,               -- 組織に関する詳細な設定や歴史 (もしあれば)
@@ -52,18 +78,427 @@ CREATE TABLE IF NOT EXISTS {ORGANIZATIONS_TABLE} (
     order_num INTEGER
 );
 """
-try:
-    cursor.execute(create_organizations_table_sql) # ★新しいテーブルの作成を実行！
-    print(f"テーブル '{ORGANIZATIONS_TABLE}' を確認/作成しました。")
-except sqlite3.Error as e:
-    print(f"テーブル '{ORGANIZATIONS_TABLE}' 作成中にエラーが発生しました: {e}")
 
-try:
+# ★★★ ハンドブックの各セクション (基礎情報/個人履歴/健康診断...) を1行ずつ保存するテーブル ★★★
+# /search のたびに正規表現で切り出さなくて済むように、populate_db.py の時点で分けておく
+create_operator_sections_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {OPERATOR_SECTIONS_TABLE} (
+    char_id TEXT NOT NULL,   -- operators.char_id
+    title TEXT NOT NULL,     -- '基礎情報', '個人履歴', '健康診断' など
+    ord INTEGER NOT NULL,    -- ハンドブック内での並び順
+    text TEXT,
+    PRIMARY KEY (char_id, ord)
+) WITHOUT ROWID;
+"""
+
+# ★★★ 組織 ⇔ オペレーターの対応表 (populate_db.py が character_table の groupId/nationId/teamId から作る) ★★★
+# 表示名 (affiliation など) で LIKE 検索しなくても、組織IDから所属オペレーターを引ける
+create_faction_members_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {FACTION_MEMBERS_TABLE} (
+    org_id TEXT NOT NULL,    -- organizations.id ('rhodes', 'ursus' など)
+    char_id TEXT NOT NULL,   -- operators.char_id
+    relation TEXT NOT NULL,  -- 'group' (所属), 'nation' (出身), 'team' (チーム)
+    PRIMARY KEY (org_id, relation, char_id)
+) WITHOUT ROWID;
+"""
+
+# ★★★ DB全体の情報 (populate_db.py が書き込む 'data_version' など) ★★★
+# ボットはデータバージョンが変わったことを検知して、カタログやキャッシュを作り直す
+create_meta_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {META_TABLE} (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+# ★★★ /similar 用の類似度行列 (populate_db.py が operator_similarity.build_similarity_table() で作る) ★★★
+# 1行 = 行列の1行分。scores は全オペレーターとのコサイン類似度を float16 で並べたバイト列 (idx の順)
+create_similarity_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {SIMILARITY_TABLE} (
+    char_id TEXT PRIMARY KEY, -- operators.char_id
+    idx INTEGER NOT NULL,     -- 行列での位置
+    scores BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+# ★★★ /effect_search 用の転置インデックス (populate_db.py が effect_index.build_effect_index() で作る) ★★★
+# effect_docs: 説明文1つ (あるオペレーターのスキル/素質1つ) に番号を振ったもの
+create_effect_docs_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {EFFECT_DOCS_TABLE} (
+    doc_id INTEGER PRIMARY KEY,
+    char_id TEXT NOT NULL,   -- operators.char_id
+    slot TEXT NOT NULL       -- 'skill1'〜'skill3', 'talent1', 'talent2'
+);
+"""
+# effect_postings: 文字 bigram -> その bigram を含む説明文の番号 (int32 の昇順の配列のバイト列)
+create_effect_postings_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {EFFECT_POSTINGS_TABLE} (
+    gram TEXT PRIMARY KEY,
+    doc_ids BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+# ★★★ スキルの全レベル (Lv1〜7, 特化1〜3) ★★★
+# operators にはスキルの最終レベルの説明文しか無いので、/skill で好きなレベルを表示できるように全部持っておく
+# 説明文は {atk:0%} のようなプレースホルダを残したテンプレート (タグは除去済み)、値は blackboard_json から埋める
+create_skills_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {SKILLS_TABLE} (
+    skill_id TEXT NOT NULL,   -- skill_table.json のID ('skchr_amiya_1' など)
+    level INTEGER NOT NULL,   -- 1〜7 = Lv1〜7, 8〜10 = 特化1〜3
+    name TEXT,
+    desc_template TEXT,
+    blackboard_json TEXT,     -- {{"キー": 値, ...}} (区切りの空白なし)
+    sp_cost INTEGER,
+    initial_sp INTEGER,
+    duration REAL,
+    sp_type TEXT,             -- SP回復タイプ ('INCREASE_WITH_TIME' / 'INCREASE_WHEN_ATTACK' など)
+    PRIMARY KEY (skill_id, level)
+) WITHOUT ROWID;
+"""
+# オペレーターのスキル枠 (S1〜S3) -> skill_id
+create_operator_skills_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {OPERATOR_SKILLS_TABLE} (
+    char_id TEXT NOT NULL,    -- operators.char_id
+    slot INTEGER NOT NULL,    -- 1〜3
+    skill_id TEXT NOT NULL,
+    PRIMARY KEY (char_id, slot)
+) WITHOUT ROWID;
+"""
+
+# ★★★ 各サーバー (ja_JP / en_US / zh_CN / ko_KR) の名前・クラス・スキルなど (populate_db.py が operator_locales.py で作る) ★★★
+# どの言語の名前でも引けるように name_key も持つ。カラムは operators と同じ名前 (表示する時に上書きする)
+create_operator_locales_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {OPERATOR_LOCALES_TABLE} (
+    locale TEXT NOT NULL,     -- 'ja_JP', 'en_US', 'zh_CN', 'ko_KR'
+    char_id TEXT NOT NULL,    -- operators.char_id (全ロケール共通)
+    name TEXT,
+    name_key TEXT,            -- name_normalize.normalize_name(name)
+    operator_class TEXT,
+    archetype TEXT,
+    affiliation TEXT,
+    team TEXT,
+    birthplace TEXT,
+    skill1_name TEXT, skill1_desc TEXT,
+    skill2_name TEXT, skill2_desc TEXT,
+    skill3_name TEXT, skill3_desc TEXT,
+    talent1_name TEXT, talent1_desc TEXT,
+    talent2_name TEXT, talent2_desc TEXT,
+    PRIMARY KEY (locale, char_id)
+) WITHOUT ROWID;
+"""
+
+# ★★★ 公開求人 (populate_db.py が recruitment.build_recruit_tables() で作る) ★★★
+# recruit_tags: gacha_table.json の募集タグ (tag_id はどのサーバーでも同じ)
+create_recruit_tags_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {RECRUIT_TAGS_TABLE} (
+    tag_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,       -- '上級エリート', '火力' など
+    name_key TEXT             -- name_normalize.normalize_name(name)
+);
+"""
+# recruit_pool: 公開求人に出るオペレーターと、そのオペレーターが持つタグ (クラス・位置・レアリティのタグも含む)
+create_recruit_pool_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {RECRUIT_POOL_TABLE} (
+    char_id TEXT PRIMARY KEY, -- operators.char_id
+    rarity INTEGER NOT NULL,  -- recruitDetail の★の数
+    tag_ids TEXT NOT NULL     -- recruit_tags.tag_id のカンマ区切り ('1,9,19')
+) WITHOUT ROWID;
+"""
+
+# ★★★ /dps 用のステータス (populate_db.py が operator_dps.build_attribute_row() で作る) ★★★
+# keyframes: 各昇進段階の attributesKeyFrames を [昇進段階, レベル, 最大HP, 攻撃力, ...] の float32 の配列にしたバイト列
+# (並びは operator_dps.ATTRIBUTE_KEYS)
+create_operator_attributes_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {OPERATOR_ATTRIBUTES_TABLE} (
+    char_id TEXT PRIMARY KEY, -- operators.char_id
+    damage_type TEXT,         -- 'physical' / 'arts' / 'heal'
+    keyframes BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+# ★★★ /materials 用の素材と育成素材 (populate_db.py が material_planner.build_material_tables() で作る) ★★★
+# items: item_table.json の素材 (名前で引けるように name_key も持つ)
+create_items_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {ITEMS_TABLE} (
+    item_id TEXT PRIMARY KEY, -- '30012' など ('4001' = 龍門幣)
+    name TEXT NOT NULL,
+    name_key TEXT,            -- name_normalize.normalize_name(name)
+    rarity INTEGER,           -- 1〜6
+    classify_type TEXT,       -- 'MATERIAL' など
+    sort_id INTEGER           -- ゲーム内の並び順
+) WITHOUT ROWID;
+"""
+# workshop_formulas: 加工所のレシピ (count 個作るのに costs と gold_cost の龍門幣が要る)
+create_workshop_formulas_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {WORKSHOP_FORMULAS_TABLE} (
+    item_id TEXT PRIMARY KEY, -- 作れる素材
+    count INTEGER NOT NULL,
+    gold_cost INTEGER NOT NULL,
+    costs TEXT NOT NULL       -- {{"item_id": 個数, ...}}
+) WITHOUT ROWID;
+"""
+# operator_costs: 昇進 (kind='elite')・スキルレベル ('skill')・特化 ('mastery') の1段階ごとの素材
+create_operator_costs_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {OPERATOR_COSTS_TABLE} (
+    char_id TEXT NOT NULL,    -- operators.char_id
+    kind TEXT NOT NULL,       -- 'elite' / 'skill' / 'mastery'
+    slot INTEGER NOT NULL,    -- 特化のスキル枠 1〜3 (昇進・スキルレベルは 0)
+    level INTEGER NOT NULL,   -- 昇進段階 1〜2 / スキルレベル 2〜7 / 特化 1〜3
+    costs TEXT NOT NULL,      -- {{"item_id": 個数, ...}}
+    PRIMARY KEY (char_id, kind, slot, level)
+) WITHOUT ROWID;
+"""
+
+# ★★★ /farm 用の「素材 -> ステージ」の転置インデックス (populate_db.py が stage_drops.build_stage_drops() で作る) ★★★
+# priority はおすすめ順の並べ替えキー。主キーの順に並んでいるので WHERE item_id = ? ORDER BY priority は並べ替え無しで読める
+create_stage_drops_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {STAGE_DROPS_TABLE} (
+    item_id TEXT NOT NULL,    -- items.item_id
+    priority INTEGER NOT NULL, -- stage_drops.drop_priority() (小さいほどおすすめ)
+    stage_id TEXT NOT NULL,   -- 'main_01-07' など
+    code TEXT,                -- '1-7' など
+    stage_name TEXT,
+    stage_type TEXT,          -- 'MAIN' / 'SUB' / 'DAILY' / 'ACTIVITY' など
+    ap_cost INTEGER,          -- 消費理性
+    drop_type TEXT,           -- 'NORMAL' / 'SPECIAL' / 'ADDITIONAL'
+    occurrence TEXT,          -- 'ALWAYS' / 'ALMOST' / 'USUAL' / 'OFTEN' / 'SOMETIMES'
+    PRIMARY KEY (item_id, priority, stage_id)
+) WITHOUT ROWID;
+"""
+
+# ★★★ 敵 (populate_db.py が enemies.build_enemies_table() で作る) ★★★
+# 敵図鑑 (enemy_handbook_table.json) の説明・能力と、enemy_database.json のレベル0のステータス
+create_enemies_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {ENEMIES_TABLE} (
+    enemy_id TEXT PRIMARY KEY, -- 'enemy_1007_slime' など
+    name TEXT NOT NULL,
+    name_key TEXT,            -- name_normalize.normalize_name(name)
+    enemy_index TEXT,         -- 図鑑番号 ('B1' など)
+    enemy_level TEXT,         -- 'NORMAL' / 'ELITE' / 'BOSS'
+    race TEXT,
+    attack_type TEXT,         -- '近距離' など
+    damage_type TEXT,         -- 'PHYSIC' / 'MAGIC' などのカンマ区切り
+    description TEXT,
+    ability TEXT,
+    max_hp REAL,
+    atk REAL,
+    def REAL,
+    magic_resistance REAL,
+    base_attack_time REAL,
+    move_speed REAL,
+    mass_level INTEGER,       -- 重量
+    life_point_reduce INTEGER, -- 目標耐久の減少量
+    range_radius REAL,
+    sort_id INTEGER
+);
+"""
+
+# ★★★ 全文検索 (populate_db.py が operators から毎回作り直す。create_tables() では作らない) ★★★
+# プロファイル・Lore・スキル・素質の説明文を trigram で索引化する (日本語も分かち書きなしで部分一致検索できる)
+create_lore_fts_table_sql = f"""
+CREATE VIRTUAL TABLE {LORE_FTS_TABLE} USING fts5(
+    name UNINDEXED,   -- オペレーター名 (表示用、検索対象外)
+    profile_summary,
+    lore_notes,
+    skills,           -- スキル名と説明をまとめたもの
+    talents,          -- 素質名と説明をまとめたもの
+    tokenize = 'trigram'
+)
+"""
+# 検索結果の並び順 (bm25 の列ごとの重み: 名前は検索対象外、スキル・素質は軽め) を FTS5 の rank として保存する
+# ORDER BY rank にすると FTS5 の中で並べてくれる (ORDER BY bm25(...) だと一時 B-tree での並べ替えが入る)
+lore_fts_rank_sql = f"INSERT INTO {LORE_FTS_TABLE} ({LORE_FTS_TABLE}, rank) VALUES ('rank', 'bm25(0.0, 1.0, 1.0, 0.5, 0.5)')"
+
+# 後から追加したカラム (古いDBには ALTER TABLE で追加する)
+ADDED_COLUMNS = [
+    (OPERATORS_TABLE, 'name_key', 'TEXT'),
+    (OPERATORS_TABLE, 'char_id', 'TEXT'),
+    (ORGANIZATIONS_TABLE, 'name_key', 'TEXT'),
+    (SKILLS_TABLE, 'sp_type', 'TEXT'),
+] + [(OPERATORS_TABLE, column, 'INTEGER') for column in RANK_COLUMNS]
+
+# 検索で使うインデックス (主キー以外)
+# 今は HOT_QUERIES がすべて主キーで引けるので無い。名前での検索はカタログ (メモリ) で済むので、name_key などの索引も作らない
+# 追加する時は、そのインデックスを使うクエリを HOT_QUERIES にも入れること！ (使われていない索引は書き込みを遅くして容量を食うだけ)
+create_index_sqls = []
+
+# 以前のバージョンが作っていた、もう使わないインデックス (create_tables() で消す)
+dropped_index_names = [
+    "idx_operators_name_nocase",
+    "idx_organizations_id_lower",
+    "idx_operators_name_key",
+    "idx_organizations_name_key",
+    "idx_operator_sections_title",
+    "idx_faction_members_char",
+    "idx_operator_locales_name_key",
+    "idx_items_name_key",
+    "idx_enemies_name_key",
+]
+
+# ★★★ ボットがよく使うクエリ (arknights_db.py の ArknightsDB が実際に投げるSQLと同じにすること！) ★★★
+# verify_query_plans() で全部インデックス探索 (SEARCH) になっているか確認する
+HOT_QUERIES = [
+    # get_localized_operator()
+    ("オペレーター (ロケール指定)", f"SELECT {', '.join(LOCALIZED_COLUMNS)} FROM {OPERATOR_LOCALES_TABLE} WHERE locale = ? AND char_id = ?", ("en_US", "char_002_amiya")),
+    # get_sections()
+    ("ハンドブック", f"SELECT title, text FROM {OPERATOR_SECTIONS_TABLE} WHERE char_id = ? AND title IN (?, ?, ?) ORDER BY ord",
+     ("char_002_amiya", "基礎情報", "個人履歴", "健康診断")),
+    # get_faction_members()
+    ("組織のメンバー", f"SELECT relation, char_id FROM {FACTION_MEMBERS_TABLE} WHERE org_id = ?", ("rhodes",)),
+    # get_skill_level()
+    ("スキル (レベル指定)", f"""SELECT s.name, s.desc_template, s.blackboard_json, s.sp_cost, s.initial_sp, s.duration
+                              FROM {OPERATOR_SKILLS_TABLE} os
+                              JOIN {SKILLS_TABLE} s ON s.skill_id = os.skill_id AND s.level = ?
+                              WHERE os.char_id = ? AND os.slot = ?""", (10, "char_002_amiya", 1)),
+    # get_stage_drops()
+    ("素材のドロップステージ", f"""SELECT code, stage_name, stage_type, ap_cost, drop_type, occurrence FROM {STAGE_DROPS_TABLE}
+                               WHERE item_id = ? ORDER BY priority LIMIT ?""", ("30012", 10)),
+    # search_lore() (FTS5 の全文検索インデックスを使う。lore_fts は populate_db.py が作るまで無い)
+    ("全文検索", f"""SELECT name, snippet({LORE_FTS_TABLE}, -1, '**', '**', '…', 24) AS snippet
+                   FROM {LORE_FTS_TABLE} WHERE {LORE_FTS_TABLE} MATCH ?
+                   ORDER BY rank LIMIT ?""", ('"アーミヤ"', 10)),
+]
+
+
+def ensure_column(cursor, table, column, column_type):
+    """テーブルにカラムが無ければ ALTER TABLE で追加する"""
+    existing_columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+    if column not in existing_columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        print(f"テーブル '{table}' にカラム '{column}' を追加しました。")
+
+
+def migrate_operators_to_char_id(cursor):
+    """name が主キーだった古い operators テーブルを char_id 主キーのテーブルに作り直す
+
+    char_id が入っていない行は 'legacy:名前' を仮の char_id にする (populate_db.py を実行すれば置き換わる)。
+    """
+    table_info = list(cursor.execute(f"PRAGMA table_info({OPERATORS_TABLE})"))
+    primary_keys = [row[1] for row in table_info if row[5]]
+    if primary_keys != ['name']:
+        return # 既に新しいスキーマ
+
+    print(f"テーブル '{OPERATORS_TABLE}' を char_id 主キーに移行します...")
+    old_columns = [row[1] for row in table_info]
+    cursor.execute(f"ALTER TABLE {OPERATORS_TABLE} RENAME TO {OPERATORS_TABLE}_old")
     cursor.execute(create_table_sql)
-    print(f"テーブル '{OPERATORS_TABLE}' を確認/作成しました。")
-except sqlite3.Error as e:
-    print(f"テーブル作成中にエラーが発生しました: {e}")
+    copy_columns = [column for column in old_columns if column != 'char_id']
+    cursor.execute(f"""
+        INSERT INTO {OPERATORS_TABLE} (char_id, {', '.join(copy_columns)})
+        SELECT COALESCE(char_id, 'legacy:' || name), {', '.join(copy_columns)} FROM {OPERATORS_TABLE}_old
+    """)
+    # 古いテーブルと一緒に古いインデックスも消える (この後 create_tables() で作り直す)
+    cursor.execute(f"DROP TABLE {OPERATORS_TABLE}_old")
+    print(f"テーブル '{OPERATORS_TABLE}' の移行が完了しました。")
+
+
+def plan_uses_index(detail: str) -> bool:
+    """EXPLAIN QUERY PLAN の1行がインデックス (主キー・FTS5 の全文検索インデックスを含む) を使っているか"""
+    if detail.startswith("SEARCH"):
+        return "USING" in detail
+    # FTS5 の MATCH は「SCAN lore_fts VIRTUAL TABLE INDEX 0:M...」と出る (M = 全文検索インデックスを使う)
+    return detail.startswith("SCAN") and "VIRTUAL TABLE INDEX" in detail and ":M" in detail
+
+
+def explain_hot_queries(cursor) -> list[tuple[str, list[str] | None]]:
+    """HOT_QUERIES を EXPLAIN QUERY PLAN して [(ラベル, プランの各行), ...] を返す (まだ無い lore_fts はプランが None)"""
+    plans = []
+    for label, sql, params in HOT_QUERIES:
+        try:
+            plans.append((label, [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)]))
+        except sqlite3.OperationalError as e:
+            if LORE_FTS_TABLE not in str(e):
+                raise
+            plans.append((label, None)) # create_db.py だけ実行した時や、FTS5 が使えない古い SQLite
+    return plans
+
+
+def verify_query_plans(cursor) -> bool:
+    """HOT_QUERIES を EXPLAIN QUERY PLAN して、全部インデックス探索 (テーブル全体のスキャンなし) になっているか確認する"""
+    all_ok = True
+    for label, plan in explain_hot_queries(cursor):
+        if plan is None:
+            print(f"⏭️ クエリプラン確認スキップ: {label}: {LORE_FTS_TABLE} がありません")
+        elif not all(plan_uses_index(detail) for detail in plan):
+            all_ok = False
+            print(f"⚠️ クエリプラン確認NG: {label}: {' / '.join(plan)}")
+        else:
+            print(f"✅ クエリプラン確認OK: {label}: {' / '.join(plan)}")
+    return all_ok
+
+
+def bump_data_version(cursor) -> str:
+    """meta テーブルの data_version を現在時刻で更新する (DBの内容を書き換えたスクリプトの最後に呼ぶ)"""
+    cursor.execute(create_meta_table_sql)
+    data_version = datetime.now().strftime('%Y%m%d%H%M%S')
+    cursor.execute(f"INSERT OR REPLACE INTO {META_TABLE} (key, value) VALUES ('data_version', ?)", (data_version,))
+    return data_version
+
+
+def create_tables(cursor):
+    """全テーブルとインデックスを作成する (既にあれば足りないカラムだけ追加する)
+
+    sqlite3 モジュールは CREATE / ALTER などの DDL をトランザクションの外で実行する (その場で確定する) ので、
+    BEGIN で1つのトランザクションにまとめて最後に commit する。operators の移行の途中で失敗しても古いDBのまま残る。
+    populate_db.py はこの commit の後に、データの作り直しを別のトランザクションで始める。
+    """
+    conn = cursor.connection
+    cursor.execute("BEGIN")
+    try:
+        _create_schema(cursor)
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _create_schema(cursor):
+    for table, sql in [
+        (ORGANIZATIONS_TABLE, create_organizations_table_sql), # ★新しいテーブルの作成を実行！
+        (OPERATORS_TABLE, create_table_sql),
+        (OPERATOR_SECTIONS_TABLE, create_operator_sections_table_sql),
+        (FACTION_MEMBERS_TABLE, create_faction_members_table_sql),
+        (META_TABLE, create_meta_table_sql),
+        (SIMILARITY_TABLE, create_similarity_table_sql),
+        (EFFECT_DOCS_TABLE, create_effect_docs_table_sql),
+        (EFFECT_POSTINGS_TABLE, create_effect_postings_table_sql),
+        (SKILLS_TABLE, create_skills_table_sql),
+        (OPERATOR_SKILLS_TABLE, create_operator_skills_table_sql),
+        (OPERATOR_LOCALES_TABLE, create_operator_locales_table_sql),
+        (RECRUIT_TAGS_TABLE, create_recruit_tags_table_sql),
+        (RECRUIT_POOL_TABLE, create_recruit_pool_table_sql),
+        (OPERATOR_ATTRIBUTES_TABLE, create_operator_attributes_table_sql),
+        (ITEMS_TABLE, create_items_table_sql),
+        (WORKSHOP_FORMULAS_TABLE, create_workshop_formulas_table_sql),
+        (OPERATOR_COSTS_TABLE, create_operator_costs_table_sql),
+        (STAGE_DROPS_TABLE, create_stage_drops_table_sql),
+        (ENEMIES_TABLE, create_enemies_table_sql),
+    ]:
+        try:
+            cursor.execute(sql)
+            print(f"テーブル '{table}' を確認/作成しました。")
+        except sqlite3.Error as e:
+            print(f"テーブル '{table}' 作成中にエラーが発生しました: {e}")
+
+    for table, column, column_type in ADDED_COLUMNS:
+        ensure_column(cursor, table, column, column_type)
+    migrate_operators_to_char_id(cursor)
+
+    for index_name in dropped_index_names:
+        cursor.execute(f"DROP INDEX IF EXISTS {index_name}")
+    for sql in create_index_sqls:
+        cursor.execute(sql)
+
 
-conn.commit()
-conn.close()
-print("データベースの初期化処理が完了しました。")
+if __name__ == '__main__':
+    print(f"データベースファイルのパス: {db_path}")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    create_tables(cursor)
+    plans_ok = verify_query_plans(cursor)
+    conn.commit()
+    conn.close()
+    if not plans_ok:
+        print("❌ インデックスを使わないクエリがあります。create_index_sqls を確認してください。")
+        exit(1)
+    print("データベースの初期化処理が完了しました。")
@@ -0,0 +1,96 @@
+# effect_index.py
+# スキル・素質の説明文の「文字 bigram -> 説明文の番号」の転置インデックス (/effect_search 用)
+#  - populate_db.py: build_effect_index() で effect_docs / effect_postings テーブルに保存する
+#  - ボット: 起動時に EffectIndex.from_connection() で読み込み、bigram ごとのポスティング (番号の昇順の配列) を積集合して候補を絞る
+import sqlite3
+import unicodedata
+from array import array
+import numpy as np
+
+OPERATORS_TABLE = 'operators'
+EFFECT_DOCS_TABLE = 'effect_docs'
+EFFECT_POSTINGS_TABLE = 'effect_postings'
+
+# 索引するカラム (説明文のカラムの接頭辞, 表示名)
+EFFECT_SLOTS = (
+    ("skill1", "S1"),
+    ("skill2", "S2"),
+    ("skill3", "S3"),
+    ("talent1", "素質1"),
+    ("talent2", "素質2"),
+)
+
+
+def normalize_text(text: str) -> str:
+    """索引・検索の両方で使う正規化 (全角/半角と大文字小文字を揃える)"""
+    return unicodedata.normalize('NFKC', text or "").casefold()
+
+
+def text_bigrams(text: str) -> set:
+    """正規化済みの文字列の文字 bigram (空白を含むものは除く)"""
+    return {text[i:i + 2] for i in range(len(text) - 1) if not any(char.isspace() for char in text[i:i + 2])}
+
+
+def build_effect_index(cursor) -> tuple[int, int]:
+    """operators のスキル・素質の説明文から転置インデックスを作り直す (説明文の数, bigram の数) を返す"""
+    cursor.execute(f"DELETE FROM {EFFECT_DOCS_TABLE}")
+    cursor.execute(f"DELETE FROM {EFFECT_POSTINGS_TABLE}")
+
+    columns = ", ".join(f"{slot}_desc" for slot, _ in EFFECT_SLOTS)
+    postings = {} # bigram -> 説明文の番号の配列 (番号順に追加するので自然に昇順になる)
+    docs = []
+    for row in cursor.execute(f"SELECT char_id, {columns} FROM {OPERATORS_TABLE} ORDER BY char_id").fetchall():
+        char_id, descs = row[0], row[1:]
+        for (slot, _), desc in zip(EFFECT_SLOTS, descs):
+            if not desc:
+                continue
+            doc_id = len(docs)
+            docs.append((doc_id, char_id, slot))
+            for gram in text_bigrams(normalize_text(desc)):
+                postings.setdefault(gram, array('i')).append(doc_id)
+
+    cursor.executemany(f"INSERT INTO {EFFECT_DOCS_TABLE} (doc_id, char_id, slot) VALUES (?, ?, ?)", docs)
+    cursor.executemany(
+        f"INSERT INTO {EFFECT_POSTINGS_TABLE} (gram, doc_ids) VALUES (?, ?)",
+        ((gram, doc_ids.tobytes()) for gram, doc_ids in postings.items()),
+    )
+    return len(docs), len(postings)
+
+
+class EffectIndex:
+    """populate_db.py が作った転置インデックスをメモリに持っておき、説明文の候補を絞り込む"""
+
+    def __init__(self, docs, postings):
+        self.docs = docs # 説明文の番号 -> (char_id, slot)
+        self.postings = postings # bigram -> 説明文の番号の昇順の np.ndarray (int32)
+
+    @classmethod
+    def from_connection(cls, conn):
+        """effect_docs / effect_postings を読み込む (テーブルが無い・空の場合は None)"""
+        try:
+            doc_rows = conn.execute(f"SELECT doc_id, char_id, slot FROM {EFFECT_DOCS_TABLE} ORDER BY doc_id").fetchall()
+            posting_rows = conn.execute(f"SELECT gram, doc_ids FROM {EFFECT_POSTINGS_TABLE}").fetchall()
+        except sqlite3.OperationalError:
+            return None # populate_db.py を再実行していない古いDB
+        if not doc_rows:
+            return None
+        docs = [(row[1], row[2]) for row in doc_rows]
+        postings = {row[0]: np.frombuffer(row[1], dtype=np.int32) for row in posting_rows}
+        return cls(docs, postings)
+
+    def candidates(self, query: str) -> np.ndarray:
+        """query の bigram を全部含む説明文の番号 (実際に query を含むかは呼び出し側で確認すること)"""
+        grams = text_bigrams(normalize_text(query))
+        if not grams:
+            return np.empty(0, dtype=np.int32)
+        lists = [self.postings.get(gram) for gram in grams]
+        if any(doc_ids is None for doc_ids in lists):
+            return np.empty(0, dtype=np.int32) # 一度も出てこない bigram がある
+        # 短いポスティングから順に積集合を取ると、途中の配列が小さく済む
+        lists.sort(key=len)
+        result = lists[0]
+        for doc_ids in lists[1:]:
+            result = np.intersect1d(result, doc_ids, assume_unique=True)
+            if not len(result):
+                break
+        return result
@@ -0,0 +1,45 @@
+# embed_cache.py
+# 作成済みの Embed (dict の形で保存) を使い回すための LRU キャッシュ
+# キーには DB のデータバージョンを含めること！ (populate_db.py で更新された後に古い内容を返さないように)
+from collections import OrderedDict
+
+
+class EmbedCache:
+    """件数上限付きの LRU キャッシュ (ヒット/ミスの回数も数える)"""
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # キー -> 値 (末尾ほど最近使った)
+
+    def get(self, key):
+        """キャッシュから取り出す (無ければ None)"""
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """キャッシュに入れる (上限を超えたら一番使われていないものから捨てる)"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """全部捨てる (データバージョンが変わった時用。回数はそのまま)"""
+        self._entries.clear()
+
+    def stats(self) -> str:
+        """ログ・ステータス表示用の文字列"""
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"{len(self._entries)}/{self.maxsize} 件, ヒット {self.hits} / ミス {self.misses} ({rate:.1f}%)"
+
+    def __len__(self):
+        return len(self._entries)
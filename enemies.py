@@ -0,0 +1,106 @@
+# enemies.py
+# 敵 (enemy_handbook_table.json の敵図鑑 + levels/enemydata/enemy_database.json のステータス) を enemies テーブルに入れるモジュール
+#  - populate_db.py: build_enemies_table() で敵図鑑の説明・能力と、レベル0のステータスを1行にまとめて保存する
+#  - ボット: カタログに全部読み込んで /enemy はメモリから返す。GeminiChat はメッセージ中の敵の名前を探して回答の材料にする
+import json
+import os
+import re
+from name_normalize import normalize_name
+
+ENEMIES_TABLE = 'enemies'
+
+# enemies に入れるカラム (create_db.py / カタログと合わせる)
+ENEMY_COLUMNS = (
+    "enemy_id", "name", "name_key", "enemy_index", "enemy_level", "race", "attack_type", "damage_type",
+    "description", "ability", "max_hp", "atk", "def", "magic_resistance", "base_attack_time",
+    "move_speed", "mass_level", "life_point_reduce", "range_radius", "sort_id",
+)
+# enemy_database.json の attributes -> カラム
+ATTRIBUTE_COLUMNS = {
+    "maxHp": "max_hp", "atk": "atk", "def": "def", "magicResistance": "magic_resistance",
+    "baseAttackTime": "base_attack_time", "moveSpeed": "move_speed", "massLevel": "mass_level",
+}
+
+ENEMY_LEVEL_LABELS = {"NORMAL": "通常", "ELITE": "精鋭", "BOSS": "ボス"}
+DAMAGE_TYPE_LABELS = {"PHYSIC": "物理", "MAGIC": "術", "NO_DAMAGE": "なし", "HEAL": "治療"}
+
+_RICH_TEXT_TAG = re.compile(r'<[^>]*>')
+
+
+def _clean(text) -> str | None:
+    """色付けタグを取り除く"""
+    return _RICH_TEXT_TAG.sub('', text).strip() if text else None
+
+
+def _defined(value):
+    """enemy_database.json の {'m_defined': bool, 'm_value': 値} から値を取り出す (未定義なら None)"""
+    if isinstance(value, dict):
+        return value.get('m_value') if value.get('m_defined', True) else None
+    return value
+
+
+def _load_json(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _base_stats(database) -> dict:
+    """enemy_database.json から {enemy_id: {カラム: 値}} (レベル0のステータス) を作る"""
+    stats = {}
+    for entry in (database or {}).get('enemies', []):
+        levels = entry.get('Value') or []
+        if not entry.get('Key') or not levels:
+            continue
+        enemy_data = levels[0].get('enemyData') or {}
+        attributes = enemy_data.get('attributes') or {}
+        values = {column: _defined(attributes.get(key)) for key, column in ATTRIBUTE_COLUMNS.items()}
+        values["life_point_reduce"] = _defined(enemy_data.get('lifePointReduce'))
+        values["range_radius"] = _defined(enemy_data.get('rangeRadius'))
+        stats[entry['Key']] = values
+    return stats
+
+
+def build_enemies_table(cursor, handbook_path: str, database_path: str) -> int | None:
+    """enemies を作り直す (保存した敵の数、敵図鑑が無い場合は None)
+
+    どちらの JSON も大きいので、この関数の中で読み込んで、抜ける時に捨てる。
+    """
+    handbook = _load_json(handbook_path)
+    if handbook is None:
+        return None
+    # 新しいデータは {'enemyData': {...}, 'raceData': {...}}、古いデータは {enemy_id: {...}}
+    enemy_data = handbook.get('enemyData', handbook)
+    races = {race_id: race.get('raceName') for race_id, race in (handbook.get('raceData') or {}).items()}
+    stats = _base_stats(_load_json(database_path))
+    cursor.execute(f"DELETE FROM {ENEMIES_TABLE}")
+
+    rows = []
+    for enemy_id, enemy in enemy_data.items():
+        if not isinstance(enemy, dict) or not enemy.get('name') or enemy.get('hideInHandbook'):
+            continue
+        # 能力は新しいデータでは abilityList (1行ずつ)、古いデータでは ability (1つの文字列)
+        ability_lines = [_clean(item.get('text')) for item in enemy.get('abilityList') or [] if item.get('text')]
+        ability = "\n".join(filter(None, ability_lines)) or _clean(enemy.get('ability'))
+        enemy_races = enemy.get('enemyTags') or []
+        values = {
+            "enemy_id": enemy_id,
+            "name": enemy['name'],
+            "name_key": normalize_name(enemy['name']),
+            "enemy_index": enemy.get('enemyIndex'),
+            "enemy_level": enemy.get('enemyLevel'),
+            "race": "、".join(filter(None, (races.get(race_id, race_id) for race_id in enemy_races))) or enemy.get('enemyRace'),
+            "attack_type": enemy.get('attackType'),
+            "damage_type": ",".join(enemy.get('damageType') or []) or None,
+            "description": _clean(enemy.get('description')),
+            "ability": ability,
+            "sort_id": enemy.get('sortId'),
+            **stats.get(enemy_id, {}),
+        }
+        rows.append(tuple(values.get(column) for column in ENEMY_COLUMNS))
+
+    columns = ", ".join(ENEMY_COLUMNS)
+    placeholders = ", ".join("?" for _ in ENEMY_COLUMNS)
+    cursor.executemany(f"INSERT OR REPLACE INTO {ENEMIES_TABLE} ({columns}) VALUES ({placeholders})", rows)
+    return len(rows)
@@ -10,6 +10,7 @@ from config import DISCORD_TOKEN
 # bot_events.py から on_voice_state_update 関数をインポート
 # (Cog化する方が望ましいが、既存の構造を維持)
 from bot_events import on_voice_state_update as on_voice_impl
+from arknights_db import DB_PATH as ARKNIGHTS_DB_PATH # アークナイツDBのパス (Cog と共通)
 import asyncio # asyncioを追加 (Cogロード後に同期するため)
 print("--- main.py 実行開始！ ---", flush=True)
 # Discordクライアント初期化
@@ -83,9 +84,8 @@ async def on_ready():
     rng = random.Random(total_seed)
     activity_name = rng.choice(activities)
 
-    # データベース自動作成
-    db_path = os.path.join(os.path.dirname(__file__), 'arknights_data.db')
-    if not os.path.exists(db_path):
+    # データベース自動作成 (中身の確認は Cog ロード時に arknights_db がまとめて行う)
+    if not os.path.exists(ARKNIGHTS_DB_PATH):
         print("🚨 データベースが見つからないため作成を試みます...")
         try:
             subprocess.run(['python', 'create_db.py'], check=True)
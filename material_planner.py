@@ -0,0 +1,222 @@
+# material_planner.py
+# /materials 用の育成素材の計算
+#  - populate_db.py: item_table.json の素材、building_data.json の加工所のレシピ (workshopFormulas)、
+#    character_table.json の昇進・スキルレベル・特化の素材を items / workshop_formulas / operator_costs テーブルに保存する
+#  - ボット: 起動時にレシピを「素材 -> 材料」の DAG としてメモリに持ち、素材を基本素材まで分解した結果は素材ごとにメモ化する
+#    複数のオペレーターの必要素材をまとめて足してから1回だけ分解し、同じ目標の計算結果は LRU キャッシュから返す
+import functools
+import json
+import math
+import sqlite3
+from collections import Counter
+from fractions import Fraction
+from name_normalize import normalize_name
+
+ITEMS_TABLE = 'items'
+WORKSHOP_FORMULAS_TABLE = 'workshop_formulas'
+OPERATOR_COSTS_TABLE = 'operator_costs'
+
+# 龍門幣の item_id (昇進と加工の費用)
+GOLD_ITEM_ID = '4001'
+# 分解に使う加工所のレシピの種類 (昇進素材・スキル概論。チップの変換などは分解しない)
+CRAFTABLE_FORMULA_TYPES = {"F_EVOLVE", "F_SKILL"}
+# operator_costs.kind
+COST_ELITE = 'elite'      # 昇進 (level = 昇進段階 1〜2)
+COST_SKILL = 'skill'      # スキルレベル (level = 2〜7、全スキル共通)
+COST_MASTERY = 'mastery'  # 特化 (slot = スキル 1〜3、level = 特化 1〜3)
+MAX_ELITE = 2
+MAX_SKILL_LEVEL = 7
+MAX_MASTERY = 3
+# 同じ目標の計算結果をいくつまで覚えておくか
+PLAN_CACHE_SIZE = 256
+
+
+def _item_rarity(value) -> int | None:
+    """item_table.json の rarity ('TIER_3' または 0 始まりの数値) を 1〜6 にする"""
+    if isinstance(value, str) and value.startswith('TIER_'):
+        return int(value[5:])
+    if isinstance(value, int):
+        return value + 1
+    return None
+
+
+def _cost_json(costs) -> str | None:
+    """[{'id': ..., 'count': ...}, ...] を {"item_id": 個数} の JSON にする (素材が無ければ None)"""
+    totals = Counter()
+    for cost in costs or ():
+        if cost and cost.get('id') and cost.get('count'):
+            totals[cost['id']] += cost['count']
+    return json.dumps(dict(totals), separators=(',', ':')) if totals else None
+
+
+def build_material_tables(cursor, character_data: dict, item_data: dict, building_data: dict, evolve_gold_costs=None) -> tuple[int, int, int]:
+    """items / workshop_formulas / operator_costs を作り直す (素材の数, レシピの数, オペレーターの育成段階の数) を返す
+
+    evolve_gold_costs は gamedata_const.json の evolveGoldCost (レアリティ順の [昇進1, 昇進2] の龍門幣)。
+    """
+    cursor.execute(f"DELETE FROM {ITEMS_TABLE}")
+    cursor.execute(f"DELETE FROM {WORKSHOP_FORMULAS_TABLE}")
+    cursor.execute(f"DELETE FROM {OPERATOR_COSTS_TABLE}")
+
+    item_rows = [
+        (item_id, item['name'], normalize_name(item['name']), _item_rarity(item.get('rarity')), item.get('classifyType'), item.get('sortId'))
+        for item_id, item in (item_data.get('items') or {}).items() if item.get('name')
+    ]
+    cursor.executemany(
+        f"INSERT OR REPLACE INTO {ITEMS_TABLE} (item_id, name, name_key, rarity, classify_type, sort_id) VALUES (?, ?, ?, ?, ?, ?)",
+        item_rows,
+    )
+
+    # 1つの素材にレシピが複数ある場合は最初のものを使う
+    formula_rows = {}
+    for formula in (building_data.get('workshopFormulas') or {}).values():
+        item_id = formula.get('itemId')
+        if not item_id or item_id in formula_rows:
+            continue
+        if formula.get('formulaType') and formula['formulaType'] not in CRAFTABLE_FORMULA_TYPES:
+            continue
+        costs = _cost_json(formula.get('costs'))
+        if costs:
+            formula_rows[item_id] = (item_id, formula.get('count') or 1, formula.get('goldCost') or 0, costs)
+    cursor.executemany(
+        f"INSERT OR REPLACE INTO {WORKSHOP_FORMULAS_TABLE} (item_id, count, gold_cost, costs) VALUES (?, ?, ?, ?)",
+        formula_rows.values(),
+    )
+
+    cost_rows = []
+    for char_id, op_data in character_data.items():
+        if not char_id.startswith('char_') or op_data.get('isNotObtainable', False) or not op_data.get('name'):
+            continue
+        rarity = _item_rarity(op_data.get('rarity'))
+        gold_costs = evolve_gold_costs[rarity - 1] if evolve_gold_costs and rarity and rarity <= len(evolve_gold_costs) else []
+        for phase, phase_data in enumerate(op_data.get('phases') or []):
+            if phase == 0:
+                continue
+            costs = list(phase_data.get('evolveCost') or [])
+            if phase <= len(gold_costs) and gold_costs[phase - 1]:
+                costs.append({'id': GOLD_ITEM_ID, 'count': gold_costs[phase - 1]})
+            cost = _cost_json(costs)
+            if cost:
+                cost_rows.append((char_id, COST_ELITE, 0, phase, cost))
+        for level, lvlup in enumerate(op_data.get('allSkillLvlup') or [], start=2):
+            cost = _cost_json((lvlup or {}).get('lvlUpCost'))
+            if cost:
+                cost_rows.append((char_id, COST_SKILL, 0, level, cost))
+        for slot, skill in enumerate((op_data.get('skills') or [])[:3], start=1):
+            for rank, cond in enumerate((skill or {}).get('levelUpCostCond') or [], start=1):
+                cost = _cost_json((cond or {}).get('levelUpCost'))
+                if cost:
+                    cost_rows.append((char_id, COST_MASTERY, slot, rank, cost))
+    cursor.executemany(
+        f"INSERT OR REPLACE INTO {OPERATOR_COSTS_TABLE} (char_id, kind, slot, level, costs) VALUES (?, ?, ?, ?, ?)",
+        cost_rows,
+    )
+    return len(item_rows), len(formula_rows), len(cost_rows)
+
+
+class MaterialPlanner:
+    """素材・レシピ・オペレーターの育成素材をメモリに持ち、必要素材を計算する"""
+
+    def __init__(self, items, formulas, operator_costs):
+        # items: [(item_id, 名前, レアリティ, sort_id), ...]
+        # formulas: [(item_id, できる個数, 龍門幣, {材料の item_id: 個数}), ...]
+        # operator_costs: [(char_id, kind, slot, level, {item_id: 個数}), ...]
+        self.items = {item_id: (name, rarity or 0, sort_id or 0) for item_id, name, rarity, sort_id in items}
+        self.item_keys = {}
+        for item_id, (name, _, _) in self.items.items():
+            self.item_keys.setdefault(normalize_name(name), item_id)
+        self.formulas = {item_id: (count, gold, costs) for item_id, count, gold, costs in formulas}
+        self.costs = {}
+        for char_id, kind, slot, level, costs in operator_costs:
+            self.costs.setdefault(char_id, {})[(kind, slot, level)] = costs
+        self._expansions = {} # item_id -> {基本素材: 1個あたりの個数} (分解のメモ)
+        self._expanding = set() # レシピが循環していた場合の保護
+        # 同じ目標の計算結果を使い回す (カタログを作り直すと新しいキャッシュになる)
+        self.plan = functools.lru_cache(maxsize=PLAN_CACHE_SIZE)(self._plan)
+
+    @classmethod
+    def from_connection(cls, conn):
+        """items / workshop_formulas / operator_costs を読み込む (テーブルが無い・空の場合は None)"""
+        try:
+            items = conn.execute(f"SELECT item_id, name, rarity, sort_id FROM {ITEMS_TABLE}").fetchall()
+            formulas = conn.execute(f"SELECT item_id, count, gold_cost, costs FROM {WORKSHOP_FORMULAS_TABLE}").fetchall()
+            costs = conn.execute(f"SELECT char_id, kind, slot, level, costs FROM {OPERATOR_COSTS_TABLE}").fetchall()
+        except sqlite3.OperationalError:
+            return None # populate_db.py を再実行していない古いDB
+        if not costs:
+            return None
+        return cls(
+            [tuple(row) for row in items],
+            [(row[0], row[1], row[2], json.loads(row[3])) for row in formulas],
+            [(row[0], row[1], row[2], row[3], json.loads(row[4])) for row in costs],
+        )
+
+    def item_name(self, item_id: str) -> str:
+        return self.items.get(item_id, (item_id,))[0]
+
+    def find_item(self, name: str):
+        """素材名 (表記ゆれ可) から item_id を返す (無ければ None)"""
+        return self.item_keys.get(normalize_name(name))
+
+    def expand(self, item_id: str) -> dict:
+        """素材1個を基本素材 (レシピの無い素材と龍門幣) に分解した {item_id: 個数} (素材ごとにメモ化)"""
+        cached = self._expansions.get(item_id)
+        if cached is not None:
+            return cached
+        formula = self.formulas.get(item_id)
+        if formula is None or item_id in self._expanding:
+            return {item_id: Fraction(1)}
+        self._expanding.add(item_id)
+        try:
+            count, gold, costs = formula
+            result = Counter()
+            for cost_id, cost_count in costs.items():
+                for base_id, base_count in self.expand(cost_id).items():
+                    result[base_id] += Fraction(cost_count) * base_count / count
+            if gold:
+                result[GOLD_ITEM_ID] += Fraction(gold, count)
+        finally:
+            self._expanding.discard(item_id)
+        self._expansions[item_id] = dict(result)
+        return self._expansions[item_id]
+
+    def requirements(self, char_id: str, elite: int, skill_level: int, masteries) -> Counter:
+        """未育成 (昇進0・スキルLv1・特化なし) から目標までに必要な素材 (分解前)
+
+        masteries はスキル1〜3の目標の特化ランク (0〜3) のタプル。
+        """
+        stages = self.costs.get(char_id, {})
+        total = Counter()
+        for phase in range(1, elite + 1):
+            total.update(stages.get((COST_ELITE, 0, phase), {}))
+        for level in range(2, skill_level + 1):
+            total.update(stages.get((COST_SKILL, 0, level), {}))
+        for slot, rank in enumerate(masteries, start=1):
+            for level in range(1, rank + 1):
+                total.update(stages.get((COST_MASTERY, slot, level), {}))
+        return total
+
+    def _plan(self, targets: tuple) -> tuple:
+        """targets ((char_id, 昇進, スキルレベル, (特化1, 特化2, 特化3)), ...) の合計と、それを基本素材まで分解したもの
+
+        戻り値は (必要素材, 基本素材) で、どちらも [(item_id, 個数), ...] (レアリティの高い順)。
+        全員分を先に足してから1回だけ分解する。
+        """
+        direct = Counter()
+        for char_id, elite, skill_level, masteries in targets:
+            direct.update(self.requirements(char_id, elite, skill_level, masteries))
+        base = Counter()
+        for item_id, count in direct.items():
+            for base_id, base_count in self.expand(item_id).items():
+                base[base_id] += base_count * count
+        return self._sorted(direct), self._sorted({item_id: math.ceil(count) for item_id, count in base.items()})
+
+    def _sorted(self, counts: dict) -> tuple:
+        """レアリティの高い順 → ゲーム内の並び順 (龍門幣は最後)"""
+        def key(item_id):
+            _, rarity, sort_id = self.items.get(item_id, (item_id, 0, 0))
+            return (item_id == GOLD_ITEM_ID, -rarity, sort_id, item_id)
+        return tuple((item_id, counts[item_id]) for item_id in sorted(counts, key=key) if counts[item_id])
+
+    def __len__(self):
+        return len(self.costs)
@@ -0,0 +1,29 @@
+# name_normalize.py
+# オペレーター名・組織名の表記ゆれを吸収するための正規化関数
+# populate_db.py (name_key カラムの作成) とボット側の検索の両方で同じ関数を使うこと！
+import unicodedata
+
+# ひらがな (ぁ〜ゖ) をカタカナ (ァ〜ヶ) に変換するテーブル
+_HIRAGANA_TO_KATAKANA = {code: code + 0x60 for code in range(ord('ぁ'), ord('ゖ') + 1)}
+_HIRAGANA_TO_KATAKANA.update({ord('ゝ'): ord('ヽ'), ord('ゞ'): ord('ヾ')})
+
+# 長音・中黒・ハイフン類・空白は表記ゆれが大きいので取り除く
+# (NFKC の後に適用するので、半角の ｰ や ･ はここに来る前に全角になっている)
+_FOLDED_CHARS = "ー〜~-‐‑‒–—―−・·•∙ 　\t"
+_FOLD_TABLE = {ord(char): None for char in _FOLDED_CHARS}
+
+
+def normalize_name(text: str) -> str:
+    """検索キー用に名前を正規化する
+
+    1. NFKC (半角カナ→全角カナ、全角英数字→半角)
+    2. 大文字小文字の同一視 (casefold)
+    3. ひらがな→カタカナ
+    4. 長音・中黒・ハイフン・空白を除去
+
+    例: 'ｱｰﾐﾔ', 'あーみや', 'アーミヤ' → 'アミヤ'
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return text.translate(_HIRAGANA_TO_KATAKANA).translate(_FOLD_TABLE)
@@ -0,0 +1,220 @@
+# operator_card.py
+# /card で送るオペレーターのプロフィールカード (PNG) を Pillow で描画するモジュール
+#  - 描画は重いので、呼び出し側でワーカースレッドから呼ぶこと (イベントループを止めない)
+#  - 描画結果は card_cache/ に「オペレーター + カードに使う内容のハッシュ」をファイル名にして保存し、同じ内容なら読み込むだけにする
+#  - 新しいカードを保存する時に、同じオペレーターの古いカードを消す (ファイル数も CARD_CACHE_MAX_FILES までにする)
+import hashlib
+import io
+import json
+import os
+import threading
+from PIL import Image, ImageDraw, ImageFont
+from ability_ratings import ABILITY_COLUMNS, RATING_LEVELS
+
+# キャッシュの保存先 (このファイルと同じ場所の card_cache/)
+CARD_CACHE_DIR = os.getenv("CARD_CACHE_DIR", os.path.join(os.path.dirname(__file__), 'card_cache'))
+# キャッシュに残すカードの最大数 (超えたら古いファイルから消す。オペレーターは数百人なので普段は超えない)
+CARD_CACHE_MAX_FILES = int(os.getenv("CARD_CACHE_MAX_FILES", "1000"))
+# レイアウトを変えたらここを上げる (古いキャッシュを使わないように、ハッシュに含めている)
+CARD_LAYOUT_VERSION = 1
+
+CARD_WIDTH, CARD_HEIGHT = 800, 450
+MARGIN = 32
+
+# 日本語が表示できるフォント (Dockerfile で fonts-noto-cjk を入れている)。CARD_FONT_PATH で上書き可
+FONT_CANDIDATES = [
+    os.getenv("CARD_FONT_PATH", ""),
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+]
+BOLD_FONT_CANDIDATES = [
+    os.getenv("CARD_BOLD_FONT_PATH", ""),
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Bold.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc",
+]
+
+# 色
+BACKGROUND_COLOR = (28, 30, 36)
+PANEL_COLOR = (40, 43, 51)
+TEXT_COLOR = (235, 235, 235)
+SUB_TEXT_COLOR = (160, 165, 175)
+BAR_EMPTY_COLOR = (70, 74, 84)
+# レアリティごとのアクセントカラー
+RARITY_COLORS = {
+    6: (255, 127, 39),
+    5: (255, 201, 14),
+    4: (185, 154, 255),
+    3: (61, 174, 233),
+    2: (220, 229, 55),
+    1: (200, 200, 200),
+}
+
+# カードに載せるカラム (この値のハッシュがキャッシュのファイル名になる)
+CARD_COLUMNS = (
+    "name", "rarity", "operator_class", "archetype", "affiliation", "race",
+    *(column for column, _ in ABILITY_COLUMNS),
+    *(f"{column}_rank" for column, _ in ABILITY_COLUMNS),
+    "skill1_name", "skill2_name", "skill3_name", "talent1_name", "talent2_name",
+)
+
+_font_cache = {} # (太字か, サイズ) -> フォント
+_warned_missing_font = False
+
+
+def _font(size: int, bold: bool = False):
+    global _warned_missing_font
+    key = (bold, size)
+    if key not in _font_cache:
+        font = None
+        for path in (BOLD_FONT_CANDIDATES if bold else FONT_CANDIDATES):
+            if path and os.path.exists(path):
+                font = ImageFont.truetype(path, size)
+                break
+        if font is None:
+            # 日本語フォントが無い環境 (ローカルで試す時など)。日本語は表示できない
+            if not _warned_missing_font:
+                print("⚠️ カード用の日本語フォントが見つかりません。CARD_FONT_PATH を設定してください。")
+                _warned_missing_font = True
+            font = ImageFont.load_default(size)
+        _font_cache[key] = font
+    return _font_cache[key]
+
+
+def card_prefix(operator) -> str:
+    """キャッシュのファイル名の前半 (オペレーターごとに固定。char_id の無い古いDBでは名前から作る)"""
+    key = operator["char_id"] or operator["name"]
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def card_hash(operator) -> str:
+    """カードの内容 (CARD_COLUMNS の値 + レイアウトのバージョン) のハッシュ"""
+    payload = {column: operator[column] for column in CARD_COLUMNS}
+    payload["_layout"] = CARD_LAYOUT_VERSION
+    data = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def _fit_text(draw, text: str, font, width: int) -> str:
+    """幅に収まらない文字列を「…」で切り詰める"""
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def render_card(operator) -> bytes:
+    """オペレーターのカードを描画して PNG のバイト列を返す"""
+    rarity = operator['rarity'] or 1
+    accent = RARITY_COLORS.get(rarity, RARITY_COLORS[1])
+    image = Image.new("RGB", (CARD_WIDTH, CARD_HEIGHT), BACKGROUND_COLOR)
+    draw = ImageDraw.Draw(image)
+
+    # 左端のアクセントライン
+    draw.rectangle((0, 0, 8, CARD_HEIGHT), fill=accent)
+
+    # --- ヘッダー (名前・レアリティ・クラス) ---
+    x, y = MARGIN, MARGIN - 8
+    draw.text((x, y), _fit_text(draw, operator['name'] or "", _font(44, bold=True), CARD_WIDTH - MARGIN * 2), font=_font(44, bold=True), fill=TEXT_COLOR)
+    y += 62
+    draw.text((x, y), "★" * rarity, font=_font(24, bold=True), fill=accent)
+    class_text = " / ".join(filter(None, [operator['operator_class'], operator['archetype']]))
+    draw.text((x + 170, y + 2), class_text, font=_font(22), fill=TEXT_COLOR)
+    y += 36
+    sub_text = " / ".join(filter(None, [operator['affiliation'], operator['race']]))
+    draw.text((x, y), _fit_text(draw, sub_text, _font(18), CARD_WIDTH - MARGIN * 2), font=_font(18), fill=SUB_TEXT_COLOR)
+    y += 40
+
+    # --- 能力測定 (左のパネル) ---
+    panel_top = y
+    panel_width = 400
+    draw.rounded_rectangle((x, panel_top, x + panel_width, CARD_HEIGHT - MARGIN), radius=10, fill=PANEL_COLOR)
+    draw.text((x + 16, panel_top + 10), "能力測定", font=_font(18, bold=True), fill=SUB_TEXT_COLOR)
+    row_y = panel_top + 42
+    max_level = max(RATING_LEVELS.values())
+    for column, label in ABILITY_COLUMNS:
+        draw.text((x + 16, row_y), label, font=_font(16), fill=TEXT_COLOR)
+        level = operator[f"{column}_rank"] or 0
+        for i in range(max_level):
+            left = x + 120 + i * 30
+            draw.rectangle((left, row_y + 4, left + 24, row_y + 18), fill=accent if i < level else BAR_EMPTY_COLOR)
+        value = operator[column] or "-"
+        draw.text((x + 275, row_y), _fit_text(draw, value, _font(16), panel_width - 285), font=_font(16), fill=SUB_TEXT_COLOR)
+        row_y += 30
+
+    # --- スキル・素質 (右のパネル) ---
+    right = x + panel_width + 16
+    right_width = CARD_WIDTH - MARGIN - right
+    draw.rounded_rectangle((right, panel_top, CARD_WIDTH - MARGIN, CARD_HEIGHT - MARGIN), radius=10, fill=PANEL_COLOR)
+    draw.text((right + 16, panel_top + 10), "スキル / 素質", font=_font(18, bold=True), fill=SUB_TEXT_COLOR)
+    row_y = panel_top + 42
+    entries = [(f"S{n}", operator[f"skill{n}_name"]) for n in (1, 2, 3)]
+    entries += [(f"素質{n}", operator[f"talent{n}_name"]) for n in (1, 2)]
+    for label, value in entries:
+        if not value:
+            continue
+        draw.text((right + 16, row_y), label, font=_font(16, bold=True), fill=accent)
+        draw.text((right + 80, row_y), _fit_text(draw, value, _font(16), right_width - 96), font=_font(16), fill=TEXT_COLOR)
+        row_y += 30
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def get_card_png(operator) -> bytes:
+    """カードの PNG を返す (キャッシュにあれば読むだけ、無ければ描画して保存)
+
+    ファイルの読み書きと描画をするので、ワーカースレッドから呼ぶこと。
+    """
+    prefix = card_prefix(operator)
+    path = os.path.join(CARD_CACHE_DIR, f"{prefix}_{card_hash(operator)}.png")
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    data = render_card(operator)
+    try:
+        os.makedirs(CARD_CACHE_DIR, exist_ok=True)
+        # 書きかけのファイルを他の呼び出しが読まないように、一時ファイルに書いてから置き換える
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # 保存できなくてもカード自体は返す
+        print(f"⚠️ カードのキャッシュを保存できませんでした: {e}")
+        return data
+    _prune_cache(prefix, path)
+    return data
+
+
+def _prune_cache(prefix: str, keep_path: str):
+    """同じオペレーターの古いカード (内容が変わる前のもの) を消し、CARD_CACHE_MAX_FILES を超えた分を古い順に消す"""
+    try:
+        entries = [entry for entry in os.scandir(CARD_CACHE_DIR) if entry.name.endswith(".png") and entry.path != keep_path]
+        stale = [entry for entry in entries if entry.name.startswith(f"{prefix}_")]
+        rest = [entry for entry in entries if not entry.name.startswith(f"{prefix}_")]
+        over = len(rest) + 1 - CARD_CACHE_MAX_FILES # 今保存したカードは必ず残す
+        if over > 0:
+            rest.sort(key=_mtime)
+            stale += rest[:over]
+    except OSError as e:
+        print(f"⚠️ カードのキャッシュの一覧を取得できませんでした: {e}")
+        return
+    for entry in stale:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass # 他のスレッドが先に消した
+        except OSError as e:
+            print(f"⚠️ 古いカードのキャッシュを削除できませんでした: {e}")
+
+
+def _mtime(entry) -> float:
+    try:
+        return entry.stat().st_mtime
+    except FileNotFoundError:
+        return 0.0 # 他のスレッドが消した (先に消す側に並べる)
@@ -0,0 +1,290 @@
+# operator_dps.py
+# /dps 用の「攻撃力・攻撃間隔・スキル倍率」からの DPS 計算
+#  - populate_db.py: character_table.json の各昇進段階の属性キーフレーム (attributesKeyFrames) を
+#    float32 の配列のバイト列にして operator_attributes に保存する (スキルの blackboard / SP / 持続時間は skills テーブルにある)
+#  - ボット: 起動時に全オペレーターの最大ステータスと各スキルの最終レベルの倍率を NumPy 配列 (オペレーター数 x 3) にしておき、
+#    敵の防御力・術耐性が決まったら全員分の通常攻撃/スキル中/平均の DPS を配列演算1回で出す (オペレーターごとのループはしない)
+#
+# 計算の前提 (簡易版): 単体の敵に1ヒットずつ、素質・潜在・信頼度・モジュールは含まない
+#  - 物理: max(攻撃力 - 防御力, 攻撃力の5%) / 術: max(攻撃力 x (1 - 術耐性/100), 攻撃力の5%) / 治療: 攻撃力そのまま
+#  - 攻撃間隔 = 基本攻撃間隔 x (1 + base_attack_time) / (攻撃速度 / 100)
+#  - 平均 DPS は「SP が溜まるまで通常攻撃 → スキル」の1周期で平均したもの
+import json
+import sqlite3
+import numpy as np
+from name_normalize import normalize_name
+
+OPERATOR_ATTRIBUTES_TABLE = 'operator_attributes'
+SKILLS_TABLE = 'skills'
+OPERATOR_SKILLS_TABLE = 'operator_skills'
+
+# キーフレームの data から保存する値 (この順で phase, level の後ろに並べる)
+ATTRIBUTE_KEYS = (
+    "maxHp", "atk", "def", "magicResistance", "cost",
+    "blockCnt", "baseAttackTime", "attackSpeed", "respawnTime",
+)
+# 保存する配列の1行 = [昇進段階, レベル, *ATTRIBUTE_KEYS]
+KEYFRAME_WIDTH = 2 + len(ATTRIBUTE_KEYS)
+
+# ダメージの種類
+DAMAGE_TYPES = ("physical", "arts", "heal")
+DAMAGE_TYPE_LABELS = {"physical": "物理", "arts": "術", "heal": "治療"}
+# 術ダメージのクラス・職分 (それ以外は物理)
+ARTS_PROFESSIONS = {"CASTER"}
+ARTS_ARCHETYPES = {"artsfghter", "artsprotector", "slower", "summoner", "underminer", "ritualist"}
+# 攻撃の代わりに治療するクラス・職分
+HEAL_PROFESSIONS = {"MEDIC"}
+HEAL_ARCHETYPES = {"bard", "blessing"}
+
+# spData.spType (数値のデータと文字列のデータがある) -> 文字列
+SP_TYPES = {1: "INCREASE_WITH_TIME", 2: "INCREASE_WHEN_ATTACK", 4: "INCREASE_WHEN_TAKEN_DAMAGE", 8: "ALWAYS"}
+SP_TYPE_LABELS = {
+    "INCREASE_WITH_TIME": "自然回復",
+    "INCREASE_WHEN_ATTACK": "攻撃回復",
+    "INCREASE_WHEN_TAKEN_DAMAGE": "被撃回復",
+    "ALWAYS": "常時",
+}
+
+# 最低保証ダメージ (攻撃力に対する割合)
+MIN_DAMAGE_RATIO = 0.05
+# 攻撃速度の上下限
+MIN_ATTACK_SPEED, MAX_ATTACK_SPEED = 10.0, 600.0
+SKILL_SLOTS = 3
+
+
+def damage_type(profession: str, sub_profession: str) -> str:
+    """クラスID・職分IDからダメージの種類 ('physical' / 'arts' / 'heal') を決める"""
+    if profession in HEAL_PROFESSIONS or sub_profession in HEAL_ARCHETYPES:
+        return "heal"
+    if profession in ARTS_PROFESSIONS or sub_profession in ARTS_ARCHETYPES:
+        return "arts"
+    return "physical"
+
+
+def normalize_sp_type(sp_type) -> str | None:
+    """spData.spType (1 / 'INCREASE_WITH_TIME' など) を文字列にそろえる"""
+    if sp_type is None:
+        return None
+    if isinstance(sp_type, int):
+        return SP_TYPES.get(sp_type, str(sp_type))
+    return str(sp_type)
+
+
+def build_attribute_row(char_id: str, op_data: dict):
+    """character_table.json のオペレーター1人分から operator_attributes の行 (char_id, damage_type, keyframes) を作る
+
+    キーフレームが1つも無い場合は None。
+    """
+    frames = []
+    for phase, phase_data in enumerate(op_data.get('phases') or []):
+        for keyframe in phase_data.get('attributesKeyFrames') or []:
+            data = keyframe.get('data') or {}
+            frames.append([phase, keyframe.get('level') or 0, *(data.get(key) or 0 for key in ATTRIBUTE_KEYS)])
+    if not frames:
+        return None
+    return (
+        char_id,
+        damage_type(op_data.get('profession'), op_data.get('subProfessionId')),
+        np.array(frames, dtype=np.float32).tobytes(),
+    )
+
+
+def _modifier(blackboard: dict, key: str, default: float = 0.0) -> float:
+    """blackboard から倍率を取り出す ('attack@atk_scale' のような接頭辞付きのキーも見る)"""
+    value = blackboard.get(key)
+    if value is None:
+        value = next((v for k, v in blackboard.items() if k.lower().rpartition('@')[2] == key), None)
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+class DpsTable:
+    """全オペレーターの最大ステータスとスキル倍率の NumPy 配列 (/dps 用)
+
+    atk などはオペレーター数の長さの配列、skill_* は (オペレーター数, 3) の配列 (スキルが無い枠は skill_valid が False)。
+    """
+
+    def __init__(self, records, attributes, skills):
+        # attributes: {char_id: (damage_type, キーフレームの配列)}
+        # skills: {(char_id, スロット): (名前, blackboard の dict, SP, 持続時間, SP回復タイプ)}
+        self.records = [record for record in records if record.char_id in attributes]
+        self.index = {record.char_id: i for i, record in enumerate(self.records)}
+        count = len(self.records)
+
+        # 最後の昇進段階の最大レベルの値 (キーフレームはレベル順に並んでいる)
+        finals = np.zeros((count, len(ATTRIBUTE_KEYS)), dtype=np.float64)
+        types = np.zeros(count, dtype=np.int8)
+        for i, record in enumerate(self.records):
+            kind, frames = attributes[record.char_id]
+            last = frames[frames[:, 0] == frames[:, 0].max()][-1]
+            finals[i] = last[2:]
+            types[i] = DAMAGE_TYPES.index(kind) if kind in DAMAGE_TYPES else 0
+        self.stats = {key: finals[:, j] for j, key in enumerate(ATTRIBUTE_KEYS)}
+        self.damage_types = types
+
+        shape = (count, SKILL_SLOTS)
+        self.skill_valid = np.zeros(shape, dtype=bool)
+        self.skill_atk = np.zeros(shape)          # 攻撃力 +x (割合)
+        self.skill_scale = np.ones(shape)         # 1ヒットの倍率 (atk_scale / 治療は heal_scale)
+        self.skill_attack_speed = np.zeros(shape) # 攻撃速度 +x
+        self.skill_interval = np.zeros(shape)     # 攻撃間隔 +x (割合)
+        self.skill_sp = np.zeros(shape)
+        self.skill_duration = np.zeros(shape)     # 0 = 次の攻撃1回だけ、負 = 退場まで
+        self.skill_offensive = np.zeros(shape, dtype=bool) # 攻撃回復
+        self.skill_passive = np.zeros(shape, dtype=bool)   # 被撃回復など (平均 DPS には入れない)
+        self.skill_names = [[None] * SKILL_SLOTS for _ in range(count)]
+        for (char_id, slot), (name, blackboard, sp_cost, duration, sp_type) in skills.items():
+            i = self.index.get(char_id)
+            if i is None or not 1 <= slot <= SKILL_SLOTS:
+                continue
+            j = slot - 1
+            heal = DAMAGE_TYPES[self.damage_types[i]] == "heal"
+            self.skill_valid[i, j] = True
+            self.skill_names[i][j] = name
+            self.skill_atk[i, j] = _modifier(blackboard, "atk")
+            self.skill_scale[i, j] = _modifier(blackboard, "heal_scale" if heal else "atk_scale", 1.0)
+            self.skill_attack_speed[i, j] = _modifier(blackboard, "attack_speed")
+            self.skill_interval[i, j] = _modifier(blackboard, "base_attack_time")
+            self.skill_sp[i, j] = sp_cost or 0
+            self.skill_duration[i, j] = duration or 0
+            self.skill_offensive[i, j] = sp_type == "INCREASE_WHEN_ATTACK"
+            self.skill_passive[i, j] = sp_type not in (None, "INCREASE_WITH_TIME", "INCREASE_WHEN_ATTACK")
+
+        # クラスは番号にしておく (AbilityMatrix と同じ)
+        self.class_names = sorted({record.operator_class for record in self.records if record.operator_class})
+        self.class_codes = {normalize_name(name): code for code, name in enumerate(self.class_names)}
+        self.classes = np.array(
+            [self.class_codes.get(normalize_name(record.operator_class or ""), -1) for record in self.records],
+            dtype=np.int16,
+        )
+
+    @classmethod
+    def from_connection(cls, conn, records):
+        """operator_attributes と skills の最終レベルを読み込む (テーブルが無い・空の場合は None)"""
+        try:
+            attribute_rows = conn.execute(
+                f"SELECT char_id, damage_type, keyframes FROM {OPERATOR_ATTRIBUTES_TABLE}"
+            ).fetchall()
+            skill_rows = conn.execute(f"""
+                SELECT os.char_id, os.slot, s.name, s.blackboard_json, s.sp_cost, s.duration, s.sp_type
+                FROM {OPERATOR_SKILLS_TABLE} os
+                JOIN {SKILLS_TABLE} s ON s.skill_id = os.skill_id
+                 AND s.level = (SELECT MAX(level) FROM {SKILLS_TABLE} WHERE skill_id = os.skill_id)
+            """).fetchall()
+        except sqlite3.OperationalError:
+            return None # populate_db.py を再実行していない古いDB
+        if not attribute_rows:
+            return None
+        attributes = {
+            row[0]: (row[1], np.frombuffer(row[2], dtype=np.float32).reshape(-1, KEYFRAME_WIDTH))
+            for row in attribute_rows
+        }
+        skills = {
+            (row[0], row[1]): (row[2], json.loads(row[3] or "{}"), row[4], row[5], row[6])
+            for row in skill_rows
+        }
+        return cls(records, attributes, skills)
+
+    def _hit(self, raw: np.ndarray, enemy_def: float, enemy_res: float) -> np.ndarray:
+        """攻撃1回のダメージ (raw は (N,) または (N, 3) の「攻撃力 x 倍率」)"""
+        kinds = self.damage_types.reshape((-1,) + (1,) * (raw.ndim - 1))
+        minimum = raw * MIN_DAMAGE_RATIO
+        physical = np.maximum(raw - enemy_def, minimum)
+        arts = np.maximum(raw * (1.0 - enemy_res / 100.0), minimum)
+        return np.select([kinds == 0, kinds == 1], [physical, arts], default=raw)
+
+    def compute(self, enemy_def: float = 0, enemy_res: float = 0) -> dict:
+        """全オペレーター分の DPS を配列で返す
+
+        戻り値の 'normal' は (N,)、'burst' (スキル中) と 'sustained' (1周期の平均) は (N, 3) (スキルが無い枠は NaN)。
+        """
+        atk = self.stats["atk"]
+        base_interval = self.stats["baseAttackTime"]
+        attack_speed = self.stats["attackSpeed"]
+
+        # 通常攻撃
+        normal_interval = base_interval / (np.clip(attack_speed, MIN_ATTACK_SPEED, MAX_ATTACK_SPEED) / 100.0)
+        normal_hit = self._hit(atk, enemy_def, enemy_res)
+        normal = normal_hit / normal_interval
+
+        # スキル中 (列方向にスキル3枠分をまとめて計算する)
+        skill_speed = np.clip(attack_speed[:, None] + self.skill_attack_speed, MIN_ATTACK_SPEED, MAX_ATTACK_SPEED)
+        skill_interval = base_interval[:, None] * np.maximum(1.0 + self.skill_interval, 0.1) / (skill_speed / 100.0)
+        skill_hit = self._hit(atk[:, None] * (1.0 + self.skill_atk) * self.skill_scale, enemy_def, enemy_res)
+        burst = skill_hit / skill_interval
+
+        # SP が溜まるまでの時間 (自然回復は 1SP/秒、攻撃回復は攻撃1回で 1SP)
+        charge = np.where(self.skill_offensive, self.skill_sp * normal_interval[:, None], self.skill_sp)
+        duration = self.skill_duration
+        # 持続型: (通常攻撃 x 溜める時間 + スキル中 x 持続時間) / 1周期
+        lasting = (normal[:, None] * charge + burst * duration) / np.maximum(charge + duration, 1e-9)
+        # 次の攻撃1回だけのスキル: 1周期に1回、通常攻撃がスキルの攻撃に置き換わる
+        cycle = np.where(
+            self.skill_offensive,
+            (self.skill_sp + 1.0) * normal_interval[:, None],
+            np.maximum(charge, normal_interval[:, None]),
+        )
+        instant = normal[:, None] + (skill_hit - normal_hit[:, None]) / cycle
+        sustained = np.select([duration < 0, duration == 0], [burst, instant], default=lasting)
+        # 被撃回復などは溜まる時間が読めないので、平均は通常攻撃のまま
+        sustained = np.where(self.skill_passive, normal[:, None], sustained)
+
+        burst = np.where(self.skill_valid, burst, np.nan)
+        sustained = np.where(self.skill_valid, sustained, np.nan)
+        return {"normal": normal, "burst": burst, "sustained": sustained, "interval": normal_interval}
+
+    def operator(self, char_id: str, enemy_def: float = 0, enemy_res: float = 0):
+        """1人分の結果 {'record', 'damage_type', 'atk', 'interval', 'normal', 'skills': [(スロット, 名前, スキル中, 平均, SP, 持続時間), ...]}"""
+        i = self.index.get(char_id)
+        if i is None:
+            return None
+        result = self.compute(enemy_def, enemy_res)
+        skills = [
+            (j + 1, self.skill_names[i][j], float(result["burst"][i, j]), float(result["sustained"][i, j]),
+             int(self.skill_sp[i, j]), float(self.skill_duration[i, j]))
+            for j in range(SKILL_SLOTS) if self.skill_valid[i, j]
+        ]
+        return {
+            "record": self.records[i],
+            "damage_type": DAMAGE_TYPES[self.damage_types[i]],
+            "atk": float(self.stats["atk"][i]),
+            "interval": float(result["interval"][i]),
+            "normal": float(result["normal"][i]),
+            "skills": skills,
+        }
+
+    def rank(self, enemy_def: float = 0, enemy_res: float = 0, operator_class: str = None, limit: int = 10) -> list:
+        """平均 DPS (一番高いスキル) の高い順に [(OperatorRecord, ダメージの種類, 平均, スキル中, スロット), ...] を返す
+
+        治療役はダメージと並べられないので除く (医療のように治療役しかいないクラスを指定した時は治療量で並べる)。
+        """
+        mask = np.ones(len(self.records), dtype=bool)
+        if operator_class:
+            code = self.class_codes.get(normalize_name(operator_class))
+            if code is None:
+                return []
+            mask &= self.classes == code
+        heal_code = DAMAGE_TYPES.index("heal")
+        damage_mask = mask & (self.damage_types != heal_code)
+        mask = damage_mask if damage_mask.any() else mask
+
+        result = self.compute(enemy_def, enemy_res)
+        # スキルが無いオペレーターは通常攻撃の値で並べる
+        sustained = np.where(self.skill_valid, result["sustained"], -np.inf)
+        best_slot = sustained.argmax(axis=1)
+        rows = np.arange(len(self.records))
+        best = np.where(self.skill_valid.any(axis=1), sustained[rows, best_slot], result["normal"])
+        burst = np.where(self.skill_valid.any(axis=1), result["burst"][rows, best_slot], result["normal"])
+
+        candidates = np.flatnonzero(mask)
+        order = candidates[np.argsort(-best[candidates], kind='stable')[:limit]]
+        return [
+            (self.records[i], DAMAGE_TYPES[self.damage_types[i]], float(best[i]), float(burst[i]),
+             int(best_slot[i]) + 1 if self.skill_valid[i].any() else None)
+            for i in order
+        ]
+
+    def __len__(self):
+        return len(self.records)
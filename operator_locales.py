@@ -0,0 +1,126 @@
+# operator_locales.py
+# 各サーバー (ja_JP / en_US / zh_CN / ko_KR) のオペレーターの名前・クラス・スキルなどを operator_locales テーブルに入れるモジュール
+#  - populate_db.py: ja_JP は operators からコピーし、他のロケールは ingest_locale() で1つずつ読み込んで commit する
+#    (4ロケール分の JSON を同時にメモリに載せない。ラズパイのメモリ対策)
+#  - ボット: カタログに全ロケールの名前を読み込んで、どの言語の名前でもオペレーターを引けるようにする
+#    /search はサーバーごとの表示言語 (/configure_locale) の行で operators の値を上書きして表示する
+import json
+import os
+from name_normalize import normalize_name
+from skill_template import render_level_text
+
+OPERATORS_TABLE = 'operators'
+OPERATOR_LOCALES_TABLE = 'operator_locales'
+
+# operators テーブルの言語 (ハンドブック・能力測定などはこの言語のものしか持っていない)
+DEFAULT_LOCALE = 'ja_JP'
+# ark_data のディレクトリ名 -> 表示名
+LOCALES = {
+    "ja_JP": "日本語",
+    "en_US": "English",
+    "zh_CN": "简体中文",
+    "ko_KR": "한국어",
+}
+
+# operator_locales に入れるカラム (operators と同じ名前。表示する時に operators の値を上書きする)
+LOCALIZED_COLUMNS = (
+    "name", "operator_class", "archetype", "affiliation", "team", "birthplace",
+    "skill1_name", "skill1_desc", "skill2_name", "skill2_desc", "skill3_name", "skill3_desc",
+    "talent1_name", "talent1_desc", "talent2_name", "talent2_desc",
+)
+
+# クラスID -> 各言語のクラス名 (ja_JP は populate_db.py の class_jp_map)
+CLASS_NAMES = {
+    "en_US": {
+        "PIONEER": "Vanguard", "WARRIOR": "Guard", "SNIPER": "Sniper", "CASTER": "Caster",
+        "SUPPORT": "Supporter", "MEDIC": "Medic", "TANK": "Defender", "SPECIAL": "Specialist",
+    },
+    "zh_CN": {
+        "PIONEER": "先锋", "WARRIOR": "近卫", "SNIPER": "狙击", "CASTER": "术师",
+        "SUPPORT": "辅助", "MEDIC": "医疗", "TANK": "重装", "SPECIAL": "特种",
+    },
+    "ko_KR": {
+        "PIONEER": "뱅가드", "WARRIOR": "가드", "SNIPER": "스나이퍼", "CASTER": "캐스터",
+        "SUPPORT": "서포터", "MEDIC": "메딕", "TANK": "디펜더", "SPECIAL": "스페셜리스트",
+    },
+}
+
+
+def _load_json(path: str, default=None):
+    """JSON ファイルを読み込む (ファイルが無ければ default)"""
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def copy_default_locale(cursor) -> int:
+    """operators (ja_JP) の行をそのまま operator_locales にコピーする (JSON を読み直さない)"""
+    columns = ", ".join(LOCALIZED_COLUMNS)
+    cursor.execute(f"DELETE FROM {OPERATOR_LOCALES_TABLE} WHERE locale = ?", (DEFAULT_LOCALE,))
+    cursor.execute(f"""
+        INSERT INTO {OPERATOR_LOCALES_TABLE} (locale, char_id, name_key, {columns})
+        SELECT ?, char_id, name_key, {columns} FROM {OPERATORS_TABLE}
+    """, (DEFAULT_LOCALE,))
+    return cursor.rowcount
+
+
+def ingest_locale(cursor, data_repo_path: str, locale: str, char_ids) -> int | None:
+    """ark_data/<locale> のオペレーターを operator_locales に入れ直す (入れた件数、データが無いロケールは None)
+
+    operators にいる char_id (= ja_JP に実装済みのオペレーター) だけを入れる。
+    読み込んだ JSON はこの関数を抜けると解放されるので、ロケールごとに呼んで commit すること。
+    """
+    excel_dir = os.path.join(data_repo_path, locale, 'gamedata', 'excel')
+    cursor.execute(f"DELETE FROM {OPERATOR_LOCALES_TABLE} WHERE locale = ?", (locale,))
+    character_data = _load_json(os.path.join(excel_dir, 'character_table.json'))
+    if character_data is None:
+        print(f"  {locale}: character_table.json が無いのでスキップします。")
+        return None
+    skill_data = _load_json(os.path.join(excel_dir, 'skill_table.json'), {})
+    team_data = _load_json(os.path.join(excel_dir, 'handbook_team_table.json'), {})
+    # 職分名は uniequip_table.json の subProfDict にある (無ければIDのまま)
+    sub_professions = (_load_json(os.path.join(excel_dir, 'uniequip_table.json'), {}) or {}).get('subProfDict', {})
+    class_names = CLASS_NAMES.get(locale, {})
+
+    def power_name(org_id):
+        return team_data.get(org_id, {}).get('powerName') if org_id else None
+
+    rows = []
+    for char_id, op_data in character_data.items():
+        if char_id not in char_ids or not op_data.get('name'):
+            continue
+        # スキル・素質は populate_db.py の ja_JP と同じく、最終レベル / 最後の candidate を使う
+        skill_texts = [(None, None)] * 3
+        for i, skill in enumerate(op_data.get('skills', [])[:3]):
+            skill_info = skill_data.get(skill.get('skillId')) if skill and skill.get('skillId') else None
+            if skill_info and skill_info.get('levels'):
+                skill_texts[i] = render_level_text(skill_info['levels'][-1])
+        talent_texts = [(None, None)] * 2
+        for i, talent in enumerate(op_data.get('talents', [])[:2]):
+            if talent and talent.get('candidates'):
+                talent_texts[i] = render_level_text(talent['candidates'][-1])
+
+        name = op_data['name']
+        archetype_id = op_data.get('subProfessionId')
+        values = {
+            "name": name,
+            "operator_class": class_names.get(op_data.get('profession'), op_data.get('profession')),
+            "archetype": sub_professions.get(archetype_id, {}).get('subProfessionName') or archetype_id,
+            "affiliation": power_name(op_data.get('groupId')) or power_name(op_data.get('nationId')),
+            "team": power_name(op_data.get('teamId')),
+            "birthplace": power_name(op_data.get('nationId')),
+        }
+        for n, (skill_name, skill_desc) in enumerate(skill_texts, start=1):
+            values[f"skill{n}_name"], values[f"skill{n}_desc"] = skill_name, skill_desc
+        for n, (talent_name, talent_desc) in enumerate(talent_texts, start=1):
+            values[f"talent{n}_name"], values[f"talent{n}_desc"] = talent_name, talent_desc
+        rows.append((locale, char_id, normalize_name(name), *(values[column] for column in LOCALIZED_COLUMNS)))
+
+    columns = ", ".join(LOCALIZED_COLUMNS)
+    placeholders = ", ".join("?" for _ in LOCALIZED_COLUMNS)
+    cursor.executemany(
+        f"INSERT OR REPLACE INTO {OPERATOR_LOCALES_TABLE} (locale, char_id, name_key, {columns}) VALUES (?, ?, ?, {placeholders})",
+        rows,
+    )
+    return len(rows)
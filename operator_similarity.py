@@ -0,0 +1,133 @@
+# operator_similarity.py
+# /similar 用の「似ているオペレーター」の計算
+#  - populate_db.py: 全オペレーターの特徴ベクトルとコサイン類似度行列を NumPy で計算し、float16 で operator_similarity に保存する
+#  - ボット: 起動時に行列を読み込んでおき、問い合わせは「1行取り出して argpartition」だけで答える
+import sqlite3
+import zlib
+import numpy as np
+from ability_ratings import ABILITY_COLUMNS, RATING_LEVELS
+
+OPERATORS_TABLE = 'operators'
+SIMILARITY_TABLE = 'operator_similarity'
+
+# 特徴ごとの重み (各特徴は長さ1に揃えてから掛ける)
+FEATURE_WEIGHTS = {
+    "class": 1.0,      # クラス (先鋒/前衛/...)
+    "archetype": 1.0,  # 職分
+    "ability": 0.7,    # 能力測定
+    "faction": 0.5,    # 所属・出身
+    "text": 1.0,       # スキル・素質の説明文
+}
+# スキル・素質の説明文の文字 bigram をハッシュで何次元に畳み込むか
+TEXT_FEATURE_DIM = 512
+
+
+def _one_hot(values) -> np.ndarray:
+    """値ごとに1列の 0/1 行列 (None は全部0)"""
+    categories = {value: i for i, value in enumerate(sorted({value for value in values if value}))}
+    matrix = np.zeros((len(values), max(len(categories), 1)), dtype=np.float32)
+    for row, value in enumerate(values):
+        if value:
+            matrix[row, categories[value]] = 1.0
+    return matrix
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """各行を長さ1にする (全部0の行はそのまま)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def _text_features(texts) -> np.ndarray:
+    """説明文の文字 bigram を TEXT_FEATURE_DIM 次元に畳み込み、TF-IDF で重み付けしたもの"""
+    counts = np.zeros((len(texts), TEXT_FEATURE_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for i in range(len(text) - 1):
+            gram = text[i:i + 2]
+            if gram.isspace():
+                continue
+            counts[row, zlib.crc32(gram.encode('utf-8')) % TEXT_FEATURE_DIM] += 1.0
+    # どのオペレーターにも出てくる bigram (「攻撃」など) の重みを下げる
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(texts)) / (1 + document_frequency)) + 1.0
+    return np.log1p(counts) * idf
+
+
+def build_feature_matrix(rows) -> np.ndarray:
+    """operators の行 (sqlite3.Row など) から特徴ベクトルの行列を作る"""
+    max_level = max(RATING_LEVELS.values())
+    abilities = np.array(
+        [[(row[f"{column}_rank"] or 0) / max_level for column, _ in ABILITY_COLUMNS] for row in rows],
+        dtype=np.float32,
+    ).reshape(len(rows), len(ABILITY_COLUMNS))
+    # 全員の平均からのずれにする (そのままだと全員が似た向きのベクトルになる)
+    abilities -= abilities.mean(axis=0, keepdims=True)
+    texts = [
+        "\n".join(filter(None, [row['skill1_desc'], row['skill2_desc'], row['skill3_desc'], row['talent1_desc'], row['talent2_desc']]))
+        for row in rows
+    ]
+    blocks = {
+        "class": _one_hot([row['operator_class'] for row in rows]),
+        "archetype": _one_hot([row['archetype'] for row in rows]),
+        "ability": abilities,
+        "faction": np.hstack([_one_hot([row['affiliation'] for row in rows]), _one_hot([row['birthplace'] for row in rows])]),
+        "text": _text_features(texts),
+    }
+    return _normalize_rows(np.hstack([_normalize_rows(blocks[name]) * weight for name, weight in FEATURE_WEIGHTS.items()]))
+
+
+def build_similarity_table(cursor) -> int:
+    """operators から類似度行列を計算して operator_similarity に保存する (保存した行数を返す)"""
+    rows = cursor.execute(f"""
+        SELECT char_id, operator_class, archetype, affiliation, birthplace,
+               {', '.join(f'{column}_rank' for column, _ in ABILITY_COLUMNS)},
+               skill1_desc, skill2_desc, skill3_desc, talent1_desc, talent2_desc
+        FROM {OPERATORS_TABLE} ORDER BY char_id
+    """).fetchall()
+    columns = [description[0] for description in cursor.description]
+    rows = [dict(zip(columns, row)) for row in rows]
+
+    features = build_feature_matrix(rows)
+    similarity = (features @ features.T).astype(np.float16) # コサイン類似度 (各行は長さ1なので内積でよい)
+    cursor.execute(f"DELETE FROM {SIMILARITY_TABLE}")
+    cursor.executemany(
+        f"INSERT INTO {SIMILARITY_TABLE} (char_id, idx, scores) VALUES (?, ?, ?)",
+        ((row['char_id'], i, similarity[i].tobytes()) for i, row in enumerate(rows)),
+    )
+    return len(rows)
+
+
+class SimilarityIndex:
+    """populate_db.py が保存した類似度行列 (float16) を保持して、似ているオペレーターを返す"""
+
+    def __init__(self, char_ids, matrix: np.ndarray):
+        self.char_ids = list(char_ids)
+        self.index = {char_id: i for i, char_id in enumerate(self.char_ids)}
+        self.matrix = matrix
+
+    @classmethod
+    def from_connection(cls, conn):
+        """operator_similarity を読み込む (テーブルが無い・空の場合は None)"""
+        try:
+            rows = conn.execute(f"SELECT char_id, scores FROM {SIMILARITY_TABLE} ORDER BY idx").fetchall()
+        except sqlite3.OperationalError:
+            return None # populate_db.py を再実行していない古いDB
+        if not rows:
+            return None
+        matrix = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float16).reshape(len(rows), len(rows))
+        return cls([row[0] for row in rows], matrix)
+
+    def most_similar(self, char_id: str, limit: int) -> list:
+        """char_id に似ているオペレーターを [(char_id, 類似度), ...] で類似度の高い順に最大 limit 件返す (自分自身は除く)"""
+        i = self.index.get(char_id)
+        if i is None:
+            return []
+        scores = self.matrix[i].astype(np.float32)
+        scores[i] = -np.inf
+        limit = min(limit, len(scores) - 1)
+        if limit <= 0:
+            return []
+        # 上位 limit 件だけ取り出してから並べる (全体をソートしない)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(self.char_ids[j], float(scores[j])) for j in top]
@@ -1,7 +1,18 @@
 import json
 import sqlite3
 import os
-import re
+from name_normalize import normalize_name # 検索キー (name_key) の作成用
+from create_db import create_tables, verify_query_plans, bump_data_version, LORE_FTS_TABLE, create_lore_fts_table_sql, lore_fts_rank_sql # テーブル定義は create_db.py にまとめてある
+from ability_ratings import parse_rating # 能力測定の評価 (標準/優秀...) を数値にする
+from effect_index import build_effect_index # /effect_search 用の転置インデックス
+from operator_similarity import build_similarity_table # /similar 用の類似度行列 (NumPy)
+from skill_template import compile_template, render_level_text # スキル・素質の説明文の値の埋め込み (ボットと共通)
+from operator_locales import LOCALES, DEFAULT_LOCALE, copy_default_locale, ingest_locale # 他のサーバー (en_US など) のデータ
+from recruitment import build_recruit_tables # /recruit 用の公開求人のタグとオペレーター
+from operator_dps import build_attribute_row, normalize_sp_type # /dps 用のステータスのキーフレーム
+from material_planner import build_material_tables # /materials 用の素材・加工所のレシピ・育成素材
+from stage_drops import build_stage_drops # /farm 用の素材 -> ステージの転置インデックス
+from enemies import build_enemies_table # /enemy 用の敵図鑑とステータス
 
 # --- ① パスの設定 (ここは自分の環境に合わせてね！) ---
 script_dir = os.path.dirname(__file__)
@@ -53,53 +64,17 @@ rarity_map = {
     "TIER_6": 6,
 }
 
-# blackboard_list を引数で受け取るように変更！
-def replace_skill_value(match, blackboard_list):
-    """スキル説明の {...} を blackboard の値で置換する関数 (ver 4: 大文字小文字無視)"""
-    full_match = match.group(0)
-    key_with_format = match.group(1)
-    parts = key_with_format.split(':')
-    key_from_desc = parts[0] # 説明文から取ったキー (例: 大文字混じり)
-    format_str = parts[1] if len(parts) > 1 else None
-
-    # blackboard から lookup_key で値を探す
-    value = None
-    # ★★★ 大文字・小文字を無視して blackboard を検索！ ★★★
-    key_from_desc_lower = key_from_desc.lower() # 検索キーを小文字に変換
-    for item in blackboard_list:
-        bb_key = item.get('key')
-        if bb_key and bb_key.lower() == key_from_desc_lower: # blackboardのキーも小文字にして比較！
-            value = item.get('value')
-            break # 見つかったらループ終了
-
-    if value is not None:
-        try:
-            # フォーマット指定に基づいて数値を文字列に変換 (符号は元の値に従う)
-            num_value = float(value) # 数値に変換
-            if format_str == '0%': return f"{num_value:.0%}" # 例: -0.6 -> -60%
-            elif format_str == '0.0%': return f"{num_value:.1%}" # 例: 0.155 -> 15.5%
-            elif format_str == '0':
-                 if num_value == int(num_value): return f"{int(num_value)}"
-                 else: return f"{num_value}" # 小数点以下も表示
-            elif format_str == '0.0': return f"{num_value:.1f}"
-
-            else:
-                 if num_value == int(num_value): return f"{int(num_value)}"
-                 else: return f"{num_value}"
-
-        except (ValueError, TypeError) as format_e:
-             print(f"  Warning: Formatting error for key '{key}', value '{value}', format '{format_str}': {format_e}")
-             return f"{value}" # フォーマット失敗時は元の値(数値)を文字列にして返す
-
-    else:
-        # Blackboard にキーがなかった場合
-        print(f"  Warning: Key '{key}' not found in blackboard for placeholder '{full_match}'")
-        return full_match # 元の {...} をそのまま返す
-
 char_table_path = os.path.join(data_repo_path, 'ja_JP', 'gamedata', 'excel', 'character_table.json')
 skill_table_path = os.path.join(data_repo_path, 'ja_JP', 'gamedata', 'excel', 'skill_table.json')
 handbook_table_path = os.path.join(data_repo_path, 'ja_JP', 'gamedata', 'excel', 'handbook_info_table.json')
 team_table_path = os.path.join(data_repo_path, 'ja_JP', 'gamedata', 'excel', 'handbook_team_table.json')
+gacha_table_path = os.path.join(data_repo_path, 'ja_JP', 'gamedata', 'excel', 'gacha_table.json') # 公開求人 (無くても続行)
+item_table_path = os.path.join(data_repo_path, 'ja_JP', 'gamedata', 'excel', 'item_table.json') # 素材 (無くても続行)
+building_data_path = os.path.join(data_repo_path, 'ja_JP', 'gamedata', 'excel', 'building_data.json') # 加工所のレシピ
+gamedata_const_path = os.path.join(data_repo_path, 'ja_JP', 'gamedata', 'excel', 'gamedata_const.json') # 昇進の龍門幣
+stage_table_path = os.path.join(data_repo_path, 'ja_JP', 'gamedata', 'excel', 'stage_table.json') # ステージのドロップ (無くても続行)
+enemy_handbook_path = os.path.join(data_repo_path, 'ja_JP', 'gamedata', 'excel', 'enemy_handbook_table.json') # 敵図鑑 (無くても続行)
+enemy_database_path = os.path.join(data_repo_path, 'ja_JP', 'gamedata', 'levels', 'enemydata', 'enemy_database.json') # 敵のステータス
 # 他に uniequip_table.json (モジュール), talent_table.json (素質) なども必要なら追加
 
 # --- ② JSONファイル読み込み ---
@@ -134,10 +109,53 @@ except json.JSONDecodeError as e:
     print(f"エラー: JSONファイルの形式が正しくありません。: {e}")
     exit()
 
+# 公開求人のデータ (/recruit 用)。無い場合は /recruit だけ使えなくなる
+gacha_data = None
+try:
+    with open(gacha_table_path, 'r', encoding='utf-8') as f:
+        gacha_data = json.load(f)
+    print(f"読み込み成功: {os.path.basename(gacha_table_path)}")
+except (FileNotFoundError, json.JSONDecodeError) as e:
+    print(f"警告: {os.path.basename(gacha_table_path)} を読み込めませんでした。公開求人のデータは作成しません。: {e}")
+
+# 素材・加工所のレシピ・昇進の龍門幣 (/materials 用)。item_table.json が無い場合は /materials だけ使えなくなる
+# building_data.json は大きいので、加工所のレシピ (workshopFormulas) だけ残して捨てる
+item_data, workshop_data, evolve_gold_costs = None, {}, None
+try:
+    with open(item_table_path, 'r', encoding='utf-8') as f:
+        item_data = json.load(f)
+    print(f"読み込み成功: {os.path.basename(item_table_path)}")
+    with open(building_data_path, 'r', encoding='utf-8') as f:
+        workshop_data = {'workshopFormulas': json.load(f).get('workshopFormulas', {})}
+    print(f"読み込み成功: {os.path.basename(building_data_path)}")
+    with open(gamedata_const_path, 'r', encoding='utf-8') as f:
+        evolve_gold_costs = json.load(f).get('evolveGoldCost')
+    print(f"読み込み成功: {os.path.basename(gamedata_const_path)}")
+except (FileNotFoundError, json.JSONDecodeError) as e:
+    print(f"警告: 素材のデータを読み込めませんでした。足りない分は作成しません。: {e}")
+
 # ---  データベース接続 ---
 conn = sqlite3.connect(db_path)
 cursor = conn.cursor()
 
+# --- 古いDBのスキーマを最新に合わせる (cron では create_db.py を実行しないため、ここで確認する) ---
+# テーブルの作成・operators の移行は create_tables() の中の1つのトランザクションで、ここで commit 済みになる
+create_tables(cursor)
+
+# オペレーター・ハンドブックのセクション・組織のメンバー表・スキル・ステータスは毎回作り直す (削除されたオペレーターや移行前の仮の行が残らないように)
+# ここから ⑧ のクエリプランの確認までは1つのトランザクション (lore_fts の作り直しも含む) で、⑧ の後にまとめて commit する
+cursor.execute("DELETE FROM operators")
+cursor.execute("DELETE FROM operator_sections")
+cursor.execute("DELETE FROM faction_members")
+cursor.execute("DELETE FROM skills")
+cursor.execute("DELETE FROM operator_skills")
+cursor.execute("DELETE FROM operator_attributes")
+section_insert_count = 0
+member_insert_count = 0
+skill_level_count = 0
+attribute_count = 0
+stored_skill_ids = set() # skills に保存済みの skill_id (同じスキルを持つ別バージョンのオペレーター用)
+
 # --- ★★★ 新しい organizations テーブルにデータを挿入 ★★★ ---
 print(f"--- organizations テーブルにデータを挿入中 ---")
 org_insert_count = 0
@@ -167,14 +185,14 @@ if team_data: # team_data が読み込めていれば処理
                  continue
 
             # ★★★ データベースに挿入 ★★★
-            # organizations テーブルのCREATE TABLE 文とカラム名を合わせる！ (7個のカラム)
+            # organizations テーブルのCREATE TABLE 文とカラム名を合わせる！ (8個のカラム)
             sql = f"""
                 INSERT OR REPLACE INTO {ORGANIZATIONS_TABLE}
-                (id, name, type, description, lore, color, order_num)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                (id, name, name_key, type, description, lore, color, order_num)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """
             # タプルに値を順番に詰める (None もそのまま渡す)
-            cursor.execute(sql, (id, name, type, description, lore, color, order_num))
+            cursor.execute(sql, (id, name, normalize_name(name), type, description, lore, color, order_num))
             org_insert_count += 1
 
         # organizations テーブルへの変更をコミット (operators と一緒に最後にまとめてもOK)
@@ -239,13 +257,20 @@ for char_id, op_data in character_data.items():
 
         if op_handbook and op_handbook.get('storyTextAudio'):
             print(f"\n--- Processing Handbook for: {name} ---") # ★ デバッグ: ハンドブック処理開始
-            for section in op_handbook['storyTextAudio']:
+            for section_ord, section in enumerate(op_handbook['storyTextAudio']):
                 title = section.get('storyTitle')
                 story_text = section.get('stories', [{}])[0].get('storyText', '')
                 if not title or not story_text: continue
 
                 print(f"  Found Section: '{title}'") # ★ デバッグ: 見つかったセクション名
 
+                # ★★★ セクションはそのまま operator_sections に保存 (/search などで必要なものだけ引く) ★★★
+                cursor.execute(
+                    "INSERT OR REPLACE INTO operator_sections (char_id, title, ord, text) VALUES (?, ?, ?, ?)",
+                    (char_id, title, section_ord, story_text.strip())
+                )
+                section_insert_count += 1
+
                 # --- ★★★ 基礎情報から種族を抽出 ★★★ ---
                 if title == "基礎情報":
                     print(f"    Parsing '基礎情報'...") # ★ デバッグ
@@ -277,11 +302,12 @@ for char_id, op_data in character_data.items():
 
                                 # print(f"        Parsed Stat - Key: '{key}', Value: '{value}'") # ★ デバッグ: パースした値
                         print(f"      Stats Dict: {stats}") # ★ デバッグ: stats辞書の中身確認
+                        # カラムと項目名の対応は ability_ratings.ABILITY_COLUMNS と合わせる
                         physical_strength = stats.get('物理強度')
-                        combat_skill = stats.get('戦場機動')
-                        mobility = stats.get('生理的耐性')
-                        endurance = stats.get('戦術立案')
-                        tactical_acumen = stats.get('戦闘技術')
+                        mobility = stats.get('戦場機動')
+                        endurance = stats.get('生理的耐性')
+                        tactical_acumen = stats.get('戦術立案')
+                        combat_skill = stats.get('戦闘技術')
                         arts_adaptability = stats.get('アーツ適性')
 
                     except Exception as parse_e:
@@ -301,124 +327,84 @@ for char_id, op_data in character_data.items():
         lore_notes = "\n\n".join(filter(None, lore_notes_parts))
 
         # === ④skill_table.json からスキル情報を取得 ===
+        # 各スキルの最終レベル (特化3 があればそれ) の名前と、値を埋め込んだ説明文
         skills = op_data.get('skills', [])
-        s1_name, s1_desc = None, None
-        s2_name, s2_desc = None, None
-        s3_name, s3_desc = None, None
-        # skill_data は事前に読み込んでおく
-        # --- スキル1 ---
-        if len(skills) >= 1 and skills[0] and skills[0].get('skillId'):
-            skill_id = skills[0]['skillId']
-            skill_info = skill_data.get(skill_id)
-            if skill_info and skill_info.get('levels') and len(skill_info['levels']) > 0:
-                last_level_data = skill_info['levels'][-1]
-                s1_name = last_level_data.get('name')
-                raw_desc = last_level_data.get('description')
-                blackboard = last_level_data.get('blackboard', []) # このスキルのblackboardを取得
-
-                if raw_desc:
-                    cleaned_desc = re.sub(r'<.*?>', '', raw_desc)
-                    cleaned_desc = re.sub(r'\$.*?>', '', cleaned_desc)
-
-                    # ★★★ lambda を使って、現在の blackboard を関数に渡す！ ★★★
-                    final_desc = re.sub(r'{([^}:]+(?::[\w.%]+)?)}',
-                                        lambda m: replace_skill_value(m, blackboard), # ここ！
-                                        cleaned_desc)
-                    s1_desc = final_desc.strip()
-
-        # --- スキル2 (同様に) ---
-        if len(skills) >= 2 and skills[1] and skills[1].get('skillId'):
-             skill_id = skills[1]['skillId']
-             skill_info = skill_data.get(skill_id)
-             if skill_info and skill_info.get('levels') and len(skill_info['levels']) > 0:
-                 last_level_data = skill_info['levels'][-1]
-                 s2_name = last_level_data.get('name')
-                 raw_desc = last_level_data.get('description')
-                 blackboard = last_level_data.get('blackboard', []) # スキル2のblackboard
-                 if raw_desc:
-                     cleaned_desc = re.sub(r'<.*?>', '', raw_desc)
-                     cleaned_desc = re.sub(r'\$.*?>', '', cleaned_desc)
-                     # ★★★ lambda を使って、現在の blackboard を関数に渡す！ ★★★
-                     final_desc = re.sub(r'{([^}:]+(?::[\w.%]+)?)}',
-                                         lambda m: replace_skill_value(m, blackboard), # ここ！
-                                         cleaned_desc)
-                     s2_desc = final_desc.strip()
-
-        # --- スキル3 (同様に) ---
-        if len(skills) >= 3 and skills[2] and skills[2].get('skillId'):
-             skill_id = skills[2]['skillId']
-             skill_info = skill_data.get(skill_id)
-             if skill_info and skill_info.get('levels') and len(skill_info['levels']) > 0:
-                 last_level_data = skill_info['levels'][-1]
-                 s3_name = last_level_data.get('name')
-                 raw_desc = last_level_data.get('description')
-                 blackboard = last_level_data.get('blackboard', []) # スキル3のblackboard
-                 if raw_desc:
-                     cleaned_desc = re.sub(r'<.*?>', '', raw_desc)
-                     cleaned_desc = re.sub(r'\$.*?>', '', cleaned_desc)
-                     # ★★★ lambda を使って、現在の blackboard を関数に渡す！ ★★★
-                     final_desc = re.sub(r'{([^}:]+(?::[\w.%]+)?)}',
-                                         lambda m: replace_skill_value(m, blackboard), # ここ！
-                                         cleaned_desc)
-                     s3_desc = final_desc.strip()
+        skill_texts = [(None, None)] * 3
+        for i, skill in enumerate(skills[:3]):
+            skill_info = skill_data.get(skill.get('skillId')) if skill and skill.get('skillId') else None
+            if skill_info and skill_info.get('levels'):
+                skill_texts[i] = render_level_text(skill_info['levels'][-1])
+        (s1_name, s1_desc), (s2_name, s2_desc), (s3_name, s3_desc) = skill_texts
+
+        # === ④' スキルの全レベルを skills / operator_skills に保存 (/skill 用) ===
+        # 説明文はタグだけ取り除いたテンプレートのまま保存し、値の埋め込みは表示する時に行う
+        for slot, skill in enumerate(skills[:3], start=1):
+            skill_id = skill.get('skillId') if skill else None
+            skill_info = skill_data.get(skill_id) if skill_id else None
+            if not skill_info:
+                continue
+            cursor.execute(
+                "INSERT OR REPLACE INTO operator_skills (char_id, slot, skill_id) VALUES (?, ?, ?)",
+                (char_id, slot, skill_id)
+            )
+            if skill_id in stored_skill_ids:
+                continue
+            stored_skill_ids.add(skill_id)
+            for level, level_data in enumerate(skill_info.get('levels', []), start=1): # 1〜7 = Lv1〜7, 8〜10 = 特化1〜3
+                desc_template = level_data.get('description')
+                if desc_template:
+                    desc_template = compile_template(desc_template).text # タグを取り除いたテンプレート
+                blackboard = {item['key']: item.get('value') for item in level_data.get('blackboard', []) if item.get('key')}
+                sp_data = level_data.get('spData') or {}
+                cursor.execute("""
+                    INSERT OR REPLACE INTO skills
+                    (skill_id, level, name, desc_template, blackboard_json, sp_cost, initial_sp, duration, sp_type)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    skill_id, level, level_data.get('name'), desc_template,
+                    json.dumps(blackboard, ensure_ascii=False, separators=(',', ':')),
+                    sp_data.get('spCost'), sp_data.get('initSp'), level_data.get('duration'),
+                    normalize_sp_type(sp_data.get('spType')),
+                ))
+                skill_level_count += 1
+
+        # === ④'' 各昇進段階のステータスを operator_attributes に保存 (/dps 用) ===
+        # キーフレーム (レベル1と最大レベルの値) を float32 の配列のまま保存し、計算はボット側で NumPy で行う
+        attribute_row = build_attribute_row(char_id, op_data)
+        if attribute_row:
+            cursor.execute(
+                "INSERT OR REPLACE INTO operator_attributes (char_id, damage_type, keyframes) VALUES (?, ?, ?)",
+                attribute_row
+            )
+            attribute_count += 1
 
         # === ⑤talent_table.json などから素質を取得 ===
-        # talents キーがあるはずなので、スキルと同じように処理する
+        # スキルと同じように、各素質の candidates の最後 (最新の強化状態) を使う
         talents = op_data.get('talents', [])
-        t1_name, t1_desc = None, None
-        t2_name, t2_desc = None, None
-        # ... 素質データを talent_table.json (仮) から取得する処理 ...
-        # --- 1つ目の素質 ---
-        if len(talents) >= 1 and talents[0] and talents[0].get('candidates'):
-            # candidates リストが空でないことを確認
-            if len(talents[0]['candidates']) > 0:
-                # candidates リストの最後の要素 (最新の強化状態) を取得
-                last_candidate = talents[0]['candidates'][-1]
-                t1_name = last_candidate.get('name')
-                raw_talent_desc = last_candidate.get('description')
-                talent_blackboard = last_candidate.get('blackboard', []) # 素質用のblackboardを取得
-
-                if raw_talent_desc:
-                    # スキル説明と同じようにクリーニング＆置換
-                    cleaned_talent_desc = re.sub(r'<.*?>', '', raw_talent_desc)
-                    cleaned_talent_desc = re.sub(r'\$.*?>', '', cleaned_talent_desc)
-                    # ★★★ 前に作った replace_skill_value 関数を再利用！ ★★★
-                    final_talent_desc = re.sub(r'{([^}:]+(?::[\w.%]+)?)}',
-                                               lambda m: replace_skill_value(m, talent_blackboard),
-                                               cleaned_talent_desc)
-                    t1_desc = final_talent_desc.strip()
-
-        # --- 2つ目の素質 (1つ目と全く同じロジック) ---
-        if len(talents) >= 2 and talents[1] and talents[1].get('candidates'):
-            if len(talents[1]['candidates']) > 0:
-                last_candidate = talents[1]['candidates'][-1]
-                t2_name = last_candidate.get('name')
-                raw_talent_desc = last_candidate.get('description')
-                talent_blackboard = last_candidate.get('blackboard', []) # 2つ目の素質用のblackboard
-                if raw_talent_desc:
-                    cleaned_talent_desc = re.sub(r'<.*?>', '', raw_talent_desc)
-                    cleaned_talent_desc = re.sub(r'\$.*?>', '', cleaned_talent_desc)
-                    # ★★★ replace_skill_value 関数を再利用！ ★★★
-                    final_talent_desc = re.sub(r'{([^}:]+(?::[\w.%]+)?)}',
-                                               lambda m: replace_skill_value(m, talent_blackboard),
-                                               cleaned_talent_desc)
-                    t2_desc = final_talent_desc.strip()
+        talent_texts = [(None, None)] * 2
+        for i, talent in enumerate(talents[:2]):
+            if talent and talent.get('candidates'):
+                talent_texts[i] = render_level_text(talent['candidates'][-1])
+        (t1_name, t1_desc), (t2_name, t2_desc) = talent_texts
 
         # === ⑥ データベースに挿入 ===
-        # SQL文: operatorsテーブルの全カラム名を指定し、VALUES に ? をカラム数分書く！ (26個！)
+        # SQL文: operatorsテーブルの全カラム名を指定し、VALUES に ? をカラム数分書く！ (34個！)
         sql = """
             INSERT OR REPLACE INTO operators (
-                name, rarity, operator_class, archetype, affiliation, team, race, birthplace,
+                name, name_key, char_id, rarity, operator_class, archetype, affiliation, team, race, birthplace,
                 physical_strength, combat_skill, mobility, endurance, tactical_acumen, arts_adaptability,
+                physical_strength_rank, combat_skill_rank, mobility_rank, endurance_rank, tactical_acumen_rank, arts_adaptability_rank,
                 profile_summary, lore_notes,
                 skill1_name, skill1_desc, skill2_name, skill2_desc, skill3_name, skill3_desc,
                 talent1_name, talent1_desc, talent2_name, talent2_desc
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
         # 実行: 上のSQL文のカラム名の順番に合わせて、取得した変数を入れたタプルを渡す！
         #      取得できなかった情報は None が入るので、DBには NULL として保存される
         cursor.execute(sql, (
             name,              # 1. name
+            normalize_name(name), # 1'. name_key (検索用の正規化キー)
+            char_id,           # 1''. char_id (主キー。同名の別バージョンも別の行として保存される)
             rarity,            # 2. rarity
             op_class_jp,       # 3. operator_class
             archetype_name_jp, # 4. archetype (日本語名)
@@ -432,6 +418,12 @@ for char_id, op_data in character_data.items():
             endurance,         # 12. endurance (能力測定から取得)
             tactical_acumen,   # 13. tactical_acumen (能力測定から取得)
             arts_adaptability, # 14. arts_adaptability (能力測定から取得)
+            parse_rating(physical_strength), # 14'. *_rank (能力測定の評価を 1〜5 の数値にしたもの。■■ などは NULL)
+            parse_rating(combat_skill),
+            parse_rating(mobility),
+            parse_rating(endurance),
+            parse_rating(tactical_acumen),
+            parse_rating(arts_adaptability),
             profile_summary,   # 15. profile_summary (ハンドブックから結合)
             lore_notes,        # 16. lore_notes (ハンドブック等から結合)
             s1_name,           # 17. skill1_name
@@ -446,6 +438,17 @@ for char_id, op_data in character_data.items():
             t2_desc            # 26. talent2_desc (クリーニング後)
         ))
         insert_count += 1
+
+        # === 組織のメンバー表 (faction_members) に追加 ===
+        # 表示名に変換する前のIDで保存しておくと、/faction で組織IDから1回のクエリで引ける
+        for relation, org_key in (('group', group_id), ('nation', nation_id), ('team', team_id)):
+            if org_key and org_key in team_data:
+                org_id = team_data[org_key].get('powerId') or org_key # organizations.id と同じID
+                cursor.execute(
+                    "INSERT OR IGNORE INTO faction_members (org_id, char_id, relation) VALUES (?, ?, ?)",
+                    (org_id, char_id, relation)
+                )
+                member_insert_count += cursor.rowcount
         # print(f"挿入/置換: {name}") # デバッグ時以外はコメントアウト
 
     except Exception as e:
@@ -455,7 +458,129 @@ for char_id, op_data in character_data.items():
         print("------------------------------------------------")
 
 
+# --- ⑦ 全文検索用 FTS5 テーブルを作り直す ---
+# プロファイル・Lore・スキル・素質の説明文を trigram で索引化する (テーブル定義は create_db.py の create_lore_fts_table_sql)
+# operators テーブルから毎回作り直すので、populate のたびに最新の内容になる
+print(f"--- {LORE_FTS_TABLE} (全文検索インデックス) を作成中 ---")
+try:
+    cursor.execute(f"DROP TABLE IF EXISTS {LORE_FTS_TABLE}")
+    cursor.execute(create_lore_fts_table_sql)
+    cursor.execute(lore_fts_rank_sql)
+    fts_rows = []
+    for row in cursor.execute("""
+        SELECT rowid, name, profile_summary, lore_notes,
+               skill1_name, skill1_desc, skill2_name, skill2_desc, skill3_name, skill3_desc,
+               talent1_name, talent1_desc, talent2_name, talent2_desc
+        FROM operators
+    """).fetchall():
+        skills_text = "\n".join(filter(None, row[4:10]))
+        talents_text = "\n".join(filter(None, row[10:14]))
+        fts_rows.append((row[0], row[1], row[2], row[3], skills_text, talents_text))
+    cursor.executemany(f"""
+        INSERT INTO {LORE_FTS_TABLE} (rowid, name, profile_summary, lore_notes, skills, talents)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, fts_rows)
+    # セグメントを1つにまとめておくと検索が速くなる
+    cursor.execute(f"INSERT INTO {LORE_FTS_TABLE} ({LORE_FTS_TABLE}) VALUES ('optimize')")
+    print(f"{LORE_FTS_TABLE} に {cursor.execute(f'SELECT count(*) FROM {LORE_FTS_TABLE}').fetchone()[0]} 件登録しました。")
+except sqlite3.Error as e:
+    # FTS5 (trigram) が使えない古い SQLite の場合はここに来る。/lore_search 以外はそのまま動く
+    print(f"--- エラー発生 --- {LORE_FTS_TABLE} 作成中 (SQLite {sqlite3.sqlite_version}) ---")
+    print(f"エラー内容: {e}")
+    print("------------------------------------------------")
+
+
+# --- ⑦' /effect_search 用の転置インデックスを作る ---
+# スキル・素質の説明文を文字 bigram に分けて「bigram -> 説明文の番号の配列」にしておく
+print(f"--- effect_postings (効果検索インデックス) を作成中 ---")
+effect_doc_count, effect_gram_count = build_effect_index(cursor)
+print(f"effect_postings に {effect_doc_count} 件の説明文 / {effect_gram_count} 種類の bigram を登録しました。")
+
+# --- ⑦'' /similar 用の類似度行列を作る ---
+# クラス・職分・能力測定・所属・スキル説明文の特徴から、全オペレーター同士のコサイン類似度を NumPy で計算しておく
+print(f"--- operator_similarity (類似度行列) を作成中 ---")
+similarity_count = build_similarity_table(cursor)
+print(f"operator_similarity に {similarity_count} 件保存しました。")
+
+# --- ⑦''' /recruit 用の公開求人のタグとオペレーターを保存 ---
+# オペレーターごとに、tagList に加えてクラス・位置 (近距離/遠距離)・レアリティ (エリート/上級エリート) のタグもまとめておく
+if gacha_data:
+    print(f"--- recruit_pool (公開求人) を作成中 ---")
+    recruit_tag_count, recruit_pool_count = build_recruit_tables(cursor, gacha_data, character_data)
+    print(f"recruit_pool に {recruit_pool_count} 名 / recruit_tags に {recruit_tag_count} 個のタグを保存しました。")
+
+# --- ⑦'''' /materials 用の素材・加工所のレシピ・育成素材を保存 ---
+# 昇進・スキルレベル・特化ごとの素材を {item_id: 個数} で持っておき、基本素材までの分解はボット側で行う
+if item_data:
+    print(f"--- operator_costs (育成素材) を作成中 ---")
+    item_count, formula_count, cost_count = build_material_tables(cursor, character_data, item_data, workshop_data, evolve_gold_costs)
+    print(f"items に {item_count} 個の素材 / workshop_formulas に {formula_count} 個のレシピ / operator_costs に {cost_count} 段階分を保存しました。")
+
+# --- ⑦''''' /farm 用の「素材 -> ステージ」の転置インデックスを作る ---
+# stage_table.json は大きいので、build_stage_drops() の中で読み込んで、終わったらすぐ捨てる
+print(f"--- stage_drops (ドロップステージ) を作成中 ---")
+try:
+    stage_drop_counts = build_stage_drops(cursor, stage_table_path)
+    if stage_drop_counts is None:
+        print(f"警告: {os.path.basename(stage_table_path)} が無いので、ドロップのデータは作成しません。")
+    else:
+        print(f"stage_drops に {stage_drop_counts[0]} ステージ分 / {stage_drop_counts[1]} 件のドロップを保存しました。")
+except json.JSONDecodeError as e:
+    print(f"警告: {os.path.basename(stage_table_path)} を読み込めませんでした。: {e}")
+
+# --- ⑦'''''' /enemy 用の敵図鑑とステータスを保存 ---
+# どちらの JSON も大きいので、build_enemies_table() の中で読み込んで、終わったらすぐ捨てる
+print(f"--- enemies (敵図鑑) を作成中 ---")
+try:
+    enemy_count = build_enemies_table(cursor, enemy_handbook_path, enemy_database_path)
+    if enemy_count is None:
+        print(f"警告: {os.path.basename(enemy_handbook_path)} が無いので、敵のデータは作成しません。")
+    else:
+        print(f"enemies に {enemy_count} 体の敵を保存しました。")
+except json.JSONDecodeError as e:
+    print(f"警告: 敵のデータを読み込めませんでした。: {e}")
+
+# --- ⑧ よく使うクエリがインデックスで引けるか確認 ---
+# インデックスを使わないクエリがあれば、データの作り直しを commit せずに止める (ボットが遅くなったDBを作らない)
+# rollback で戻るのは DELETE 以降のデータの作り直しだけ。スキーマの変更は create_tables() で commit 済み
+if not verify_query_plans(cursor):
+    print("❌ インデックスを使わないクエリがあります。create_db.py のインデックス定義を確認してください。")
+    conn.rollback()
+    conn.close()
+    exit(1)
+
+# ここまで (ja_JP のデータ) を commit しておく
+conn.commit()
+
+# --- ⑧' 他のサーバーのデータ (operator_locales) を作る ---
+# ラズパイのメモリに4ロケール分の JSON を同時に載せないように、ja_JP の JSON を捨ててから1ロケールずつ読み込んで commit する
+del character_data, skill_data, handbook_data, team_data, gacha_data, item_data, workshop_data
+print(f"--- operator_locales (多言語データ) を作成中 ---")
+locale_counts = {DEFAULT_LOCALE: copy_default_locale(cursor)}
+conn.commit()
+known_char_ids = {row[0] for row in cursor.execute("SELECT char_id FROM operators")}
+for locale in LOCALES:
+    if locale == DEFAULT_LOCALE:
+        continue
+    try:
+        locale_counts[locale] = ingest_locale(cursor, data_repo_path, locale, known_char_ids)
+        conn.commit()
+    except (OSError, json.JSONDecodeError, sqlite3.Error) as e:
+        # 1つのロケールが読めなくても、他のロケール (と ja_JP) はそのまま使える
+        conn.rollback()
+        print(f"--- エラー発生 --- {locale} の読み込み中 ---")
+        print(f"エラー内容: {e}")
+        print("------------------------------------------------")
+print("operator_locales: " + " / ".join(f"{locale} {count} 件" for locale, count in locale_counts.items() if count is not None))
+
+# --- ⑨ データバージョンを更新 (ボットはこれが変わったらカタログとキャッシュを作り直す) ---
+print(f"データバージョン: {bump_data_version(cursor)}")
+
 # --- ⑥ 完了処理 ---
 conn.commit()
 conn.close()
 print(f"処理完了！ {insert_count} 件のオペレーター情報をデータベースに挿入/置換しました。")
+print(f"operator_sections に {section_insert_count} 件のハンドブックセクションを保存しました。")
+print(f"faction_members に {member_insert_count} 件の所属情報を保存しました。")
+print(f"skills に {len(stored_skill_ids)} 個のスキルの {skill_level_count} レベル分を保存しました。")
+print(f"operator_attributes に {attribute_count} 名分のステータスを保存しました。")
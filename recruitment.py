@@ -0,0 +1,168 @@
+# recruitment.py
+# 公開求人 (/recruit) の計算
+#  - populate_db.py: gacha_table.json の募集タグ (gachaTags) と公開求人に出るオペレーター (recruitDetail) を
+#    recruit_tags / recruit_pool テーブルに保存する (オペレーターごとに、クラス・位置・レアリティのタグも含めたタグIDの一覧)
+#  - ボット: 起動時にオペレーターごとのタグとレアリティを1つの整数のビットマスクにしておき、
+#    選んだタグの全組み合わせ (5個なら31通り) を「(マスク & 組み合わせ) == 組み合わせ」だけで絞り込む (SQL は使わない)
+import re
+import sqlite3
+import numpy as np
+from name_normalize import normalize_name
+
+RECRUIT_TAGS_TABLE = 'recruit_tags'
+RECRUIT_POOL_TABLE = 'recruit_pool'
+
+# gachaTags の tagId (どのサーバーでも同じ)
+CLASS_TAG_IDS = {
+    "WARRIOR": 1, "SNIPER": 2, "TANK": 3, "MEDIC": 4,
+    "SUPPORT": 5, "CASTER": 6, "SPECIAL": 7, "PIONEER": 8,
+}
+POSITION_TAG_IDS = {"MELEE": 9, "RANGED": 10}
+TOP_OPERATOR_TAG_ID = 11 # 上級エリート (★6)
+SENIOR_OPERATOR_TAG_ID = 14 # エリート (★5)
+ROBOT_TAG_ID = 28 # ロボット (★1。求人時間 3:50 以下の時だけ出る)
+
+# 1回の求人で選べるタグの数
+MAX_SELECTED_TAGS = 5
+# レアリティのビットはタグのビットの後ろに置く (タグは RARITY_BIT_BASE 個まで)
+RARITY_BIT_BASE = 56
+
+_RICH_TEXT_TAG = re.compile(r'<[^>]*>')
+
+
+def parse_recruit_detail(recruit_detail: str) -> dict:
+    """recruitDetail (★の行の次の行に「/」区切りで名前が並ぶ文字列) を {名前: レアリティ} にする"""
+    pool = {}
+    rarity = None
+    for line in _RICH_TEXT_TAG.sub('', recruit_detail or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if set(line) <= {'★', '☆'}:
+            rarity = line.count('★')
+        elif line.startswith('-'):
+            rarity = None # 区切り線
+        elif rarity:
+            for name in line.split('/'):
+                if name.strip():
+                    pool[name.strip()] = rarity
+    return pool
+
+
+def build_recruit_tables(cursor, gacha_data: dict, character_data: dict) -> tuple[int, int]:
+    """gacha_table.json から recruit_tags / recruit_pool を作り直す (タグの数, オペレーターの数) を返す"""
+    cursor.execute(f"DELETE FROM {RECRUIT_TAGS_TABLE}")
+    cursor.execute(f"DELETE FROM {RECRUIT_POOL_TABLE}")
+    tags = {tag['tagName']: tag['tagId'] for tag in gacha_data.get('gachaTags', []) if tag.get('tagName') and tag.get('tagId') is not None}
+    cursor.executemany(
+        f"INSERT INTO {RECRUIT_TAGS_TABLE} (tag_id, name, name_key) VALUES (?, ?, ?)",
+        ((tag_id, name, normalize_name(name)) for name, tag_id in tags.items()),
+    )
+
+    # 名前 -> char_id (公開求人に出るのは実装済みのオペレーターだけなので、最初に見つかったもの)
+    char_ids = {}
+    for char_id, op_data in character_data.items():
+        if char_id.startswith('char_') and op_data.get('name'):
+            char_ids.setdefault(op_data['name'], char_id)
+
+    pool_rows = []
+    for name, rarity in parse_recruit_detail(gacha_data.get('recruitDetail')).items():
+        char_id = char_ids.get(name)
+        if not char_id:
+            print(f"  Warning: 公開求人のオペレーター '{name}' が character_table に見つかりません")
+            continue
+        op_data = character_data[char_id]
+        tag_ids = {CLASS_TAG_IDS.get(op_data.get('profession')), POSITION_TAG_IDS.get(op_data.get('position'))}
+        if rarity == 6:
+            tag_ids.add(TOP_OPERATOR_TAG_ID)
+        elif rarity == 5:
+            tag_ids.add(SENIOR_OPERATOR_TAG_ID)
+        tag_ids.update(tags.get(tag_name) for tag_name in op_data.get('tagList') or [])
+        tag_ids.discard(None)
+        pool_rows.append((char_id, rarity, ",".join(str(tag_id) for tag_id in sorted(tag_ids))))
+    cursor.executemany(f"INSERT OR REPLACE INTO {RECRUIT_POOL_TABLE} (char_id, rarity, tag_ids) VALUES (?, ?, ?)", pool_rows)
+    return len(tags), len(pool_rows)
+
+
+def _rarity_bit(rarity: int) -> int:
+    return 1 << (RARITY_BIT_BASE + rarity)
+
+
+class RecruitIndex:
+    """公開求人のオペレーターをビットマスクにしたもの
+
+    masks[i] は i 番目のオペレーターのタグのビット (タグの並び順) とレアリティのビット (RARITY_BIT_BASE + レアリティ) の OR。
+    """
+
+    def __init__(self, tags, pool, records_by_id):
+        # tags: [(tag_id, 名前), ...] / pool: [(char_id, レアリティ, タグIDのリスト), ...]
+        self.tags = sorted(tags)[:RARITY_BIT_BASE]
+        self.tag_bits = {tag_id: 1 << bit for bit, (tag_id, _) in enumerate(self.tags)}
+        self.tag_names = {tag_id: name for tag_id, name in self.tags}
+        self.tag_keys = {normalize_name(name): tag_id for tag_id, name in self.tags}
+        self.records = []
+        masks, rarities = [], []
+        for char_id, rarity, tag_ids in pool:
+            record = records_by_id.get(char_id)
+            if record is None:
+                continue
+            mask = _rarity_bit(rarity)
+            for tag_id in tag_ids:
+                mask |= self.tag_bits.get(tag_id, 0)
+            self.records.append(record)
+            masks.append(mask)
+            rarities.append(rarity)
+        self.masks = np.array(masks, dtype=np.uint64)
+        self.rarities = np.array(rarities, dtype=np.int8) # 並べ替え・最低レアリティ用
+
+    @classmethod
+    def from_connection(cls, conn, records_by_id):
+        """recruit_tags / recruit_pool を読み込む (テーブルが無い・空の場合は None)"""
+        try:
+            tags = conn.execute(f"SELECT tag_id, name FROM {RECRUIT_TAGS_TABLE}").fetchall()
+            pool = conn.execute(f"SELECT char_id, rarity, tag_ids FROM {RECRUIT_POOL_TABLE}").fetchall()
+        except sqlite3.OperationalError:
+            return None # populate_db.py を再実行していない古いDB
+        if not tags or not pool:
+            return None
+        return cls(
+            [(row[0], row[1]) for row in tags],
+            [(row[0], row[1], [int(tag_id) for tag_id in row[2].split(',') if tag_id]) for row in pool],
+            records_by_id,
+        )
+
+    def resolve_tag(self, name: str):
+        """入力されたタグ名 (表記ゆれ可) を tag_id にする (無ければ None)"""
+        return self.tag_keys.get(normalize_name(name))
+
+    def combinations(self, tag_ids) -> list:
+        """選んだタグの空でない全組み合わせについて、出現するオペレーターを返す
+
+        戻り値は [(タグIDのタプル, 最低レアリティ, [OperatorRecord, ...]), ...] (該当者がいない組み合わせは除く)。
+        求人時間 9:00 を前提に ★1・★2 は除く (ただしロボットタグを含む組み合わせの ★1 は残す)。
+        ★6 は上級エリートを含む組み合わせでしか出ない。
+        """
+        tag_ids = list(dict.fromkeys(tag_ids))[:MAX_SELECTED_TAGS]
+        results = []
+        for subset in range(1, 1 << len(tag_ids)):
+            chosen = tuple(tag_id for bit, tag_id in enumerate(tag_ids) if subset >> bit & 1)
+            required = 0
+            for tag_id in chosen:
+                required |= self.tag_bits[tag_id]
+            # 出現しうるレアリティのビット
+            allowed = _rarity_bit(3) | _rarity_bit(4) | _rarity_bit(5)
+            if TOP_OPERATOR_TAG_ID in chosen:
+                allowed |= _rarity_bit(6)
+            if ROBOT_TAG_ID in chosen:
+                allowed |= _rarity_bit(1)
+            required, allowed = np.uint64(required), np.uint64(allowed)
+            indices = np.flatnonzero(((self.masks & required) == required) & ((self.masks & allowed) != 0))
+            if not len(indices):
+                continue
+            # レアリティの高い順に並べる (同じレアリティは records の並び順)
+            indices = indices[np.argsort(-self.rarities[indices], kind='stable')]
+            results.append((chosen, int(self.rarities[indices].min()), [self.records[i] for i in indices]))
+        return results
+
+    def __len__(self):
+        return len(self.records)
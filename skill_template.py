@@ -0,0 +1,190 @@
+# skill_template.py
+# スキル・素質の説明文 ('攻撃力+{atk:0%}、{duration}秒間...') に blackboard の値を埋め込むモジュール
+# populate_db.py (operators の説明文の作成) とボット (/skill) の両方でここを使うこと！
+#  - 説明文は1回だけ「文字列とプレースホルダの並び」にコンパイルしてキャッシュする (タグの除去もこの時に済ませる)
+#  - blackboard はキーを小文字にした dict にして引く (リストを毎回先頭から探さない)
+#  - 書式 ('0%' など) ごとの変換関数は最初に用意しておく
+#
+# python skill_template.py でコンパイル前 (旧 replace_skill_value 方式) との速度比較ができる
+import functools
+import json
+import re
+
+# 説明文の色付けタグ (<@ba.vup> や </>) と $ で始まるタグ
+_TAG_PATTERN = re.compile(r'<.*?>')
+_DOLLAR_TAG_PATTERN = re.compile(r'\$.*?>')
+# {キー} または {キー:書式}
+_PLACEHOLDER_PATTERN = re.compile(r'{([^}:]+(?::[\w.%]+)?)}')
+
+
+def _format_plain(value: float) -> str:
+    """整数ならそのまま、小数ならそのまま表示 (書式なし / '0')"""
+    return f"{int(value)}" if value == int(value) else f"{value}"
+
+
+# 書式 -> 数値を文字列にする関数 (符号は元の値に従う)
+FORMATTERS = {
+    '0%': lambda value: f"{value:.0%}",    # 例: -0.6 -> -60%
+    '0.0%': lambda value: f"{value:.1%}",  # 例: 0.155 -> 15.5%
+    '0': _format_plain,
+    '0.0': lambda value: f"{value:.1f}",
+}
+
+
+class _Placeholder:
+    """説明文中の {キー:書式} 1つ分"""
+    __slots__ = ("key", "formatter", "text")
+
+    def __init__(self, key_with_format: str, text: str):
+        key, _, format_str = key_with_format.partition(':')
+        self.key = key.lower() # blackboard のキーと大文字小文字を無視して比べる
+        self.formatter = FORMATTERS.get(format_str, _format_plain)
+        self.text = text # 値が見つからなかった時はそのまま残す
+
+    def render(self, blackboard: dict) -> str:
+        value = blackboard.get(self.key)
+        if value is None:
+            return self.text
+        try:
+            return self.formatter(float(value))
+        except (ValueError, TypeError, OverflowError):
+            return f"{value}"
+
+
+class CompiledTemplate:
+    """コンパイル済みの説明文 (文字列と _Placeholder の並び)"""
+    __slots__ = ("tokens",)
+
+    def __init__(self, description: str):
+        text = _DOLLAR_TAG_PATTERN.sub('', _TAG_PATTERN.sub('', description or ""))
+        tokens = []
+        position = 0
+        for match in _PLACEHOLDER_PATTERN.finditer(text):
+            if match.start() > position:
+                tokens.append(text[position:match.start()])
+            tokens.append(_Placeholder(match.group(1), match.group(0)))
+            position = match.end()
+        if position < len(text):
+            tokens.append(text[position:])
+        self.tokens = tuple(tokens)
+
+    @property
+    def text(self) -> str:
+        """タグを取り除いただけのテンプレート (skills テーブルに保存する形)"""
+        return "".join(token if isinstance(token, str) else token.text for token in self.tokens).strip()
+
+    def render(self, blackboard: dict) -> str:
+        """blackboard_dict() で作った dict の値を埋め込む"""
+        return "".join(token if isinstance(token, str) else token.render(blackboard) for token in self.tokens).strip()
+
+    def missing_keys(self, blackboard: dict) -> list:
+        """blackboard に値が無いプレースホルダ (populate_db.py の警告用)"""
+        return [token.text for token in self.tokens if not isinstance(token, str) and blackboard.get(token.key) is None]
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_template(description: str) -> CompiledTemplate:
+    """説明文をコンパイルする (同じ説明文は2回目からキャッシュを返す)"""
+    return CompiledTemplate(description)
+
+
+def blackboard_dict(blackboard) -> dict:
+    """skill_table.json の blackboard ([{'key': ..., 'value': ...}, ...]) または {キー: 値} を、小文字のキーの dict にする
+
+    同じキーが複数ある場合は最初のものを使う (旧 replace_skill_value と同じ)。
+    """
+    items = blackboard.items() if isinstance(blackboard, dict) else ((item.get('key'), item.get('value')) for item in blackboard or ())
+    result = {}
+    for key, value in items:
+        if key:
+            result.setdefault(key.lower(), value)
+    return result
+
+
+def render(description: str, blackboard) -> str:
+    """説明文に blackboard の値を埋め込んだ文字列を返す"""
+    return compile_template(description).render(blackboard_dict(blackboard))
+
+
+def render_level_text(level_data) -> tuple:
+    """スキルのレベル / 素質の candidate から (名前, blackboard の値を埋め込んだ説明文) を返す (populate 用)"""
+    raw_desc = level_data.get('description')
+    if not raw_desc:
+        return level_data.get('name'), None
+    template = compile_template(raw_desc)
+    blackboard = blackboard_dict(level_data.get('blackboard', []))
+    missing = template.missing_keys(blackboard)
+    if missing:
+        # Blackboard にキーがなかった場合は {...} がそのまま残る
+        print(f"  Warning: Keys not found in blackboard for {level_data.get('name')}: {', '.join(missing)}")
+    return level_data.get('name'), template.render(blackboard)
+
+
+@functools.lru_cache(maxsize=1024)
+def render_json(description: str, blackboard_json: str) -> str:
+    """skills テーブルの (desc_template, blackboard_json) から表示用の説明文を作る (結果もキャッシュする)"""
+    return render(description, json.loads(blackboard_json or "{}"))
+
+
+if __name__ == '__main__':
+    # --- マイクロベンチマーク: 旧方式 (3回の re.sub + blackboard を毎回線形探索) との比較 ---
+    import os
+    import timeit
+
+    def _legacy_replace(match, blackboard_list):
+        full_match = match.group(0)
+        parts = match.group(1).split(':')
+        key_lower = parts[0].lower()
+        format_str = parts[1] if len(parts) > 1 else None
+        value = None
+        for item in blackboard_list:
+            bb_key = item.get('key')
+            if bb_key and bb_key.lower() == key_lower:
+                value = item.get('value')
+                break
+        if value is None:
+            return full_match
+        try:
+            num_value = float(value)
+            if format_str == '0%': return f"{num_value:.0%}"
+            elif format_str == '0.0%': return f"{num_value:.1%}"
+            elif format_str == '0.0': return f"{num_value:.1f}"
+            elif num_value == int(num_value): return f"{int(num_value)}"
+            else: return f"{num_value}"
+        except (ValueError, TypeError):
+            return f"{value}"
+
+    def _legacy_render(description, blackboard_list):
+        cleaned = re.sub(r'<.*?>', '', description)
+        cleaned = re.sub(r'\$.*?>', '', cleaned)
+        return re.sub(r'{([^}:]+(?::[\w.%]+)?)}', lambda m: _legacy_replace(m, blackboard_list), cleaned).strip()
+
+    # ark_data があれば実際のスキルの全レベルを使う (無ければサンプル)
+    skill_table_path = os.path.join(os.path.dirname(__file__), 'ark_data', 'ja_JP', 'gamedata', 'excel', 'skill_table.json')
+    samples = []
+    if os.path.exists(skill_table_path):
+        with open(skill_table_path, 'r', encoding='utf-8') as f:
+            for skill in json.load(f).values():
+                for level in skill.get('levels', []):
+                    if level.get('description'):
+                        samples.append((level['description'], level.get('blackboard', [])))
+    if not samples:
+        samples = [(
+            "攻撃力+<@ba.vup>{atk:0%}</>、攻撃速度+<@ba.vup>{attack_speed}</>、<@ba.vup>{duration}</>秒間 "
+            "攻撃時<@ba.vup>{prob:0.0%}</>の確率で敵を<$ba.stun>スタン</>させる（<@ba.vup>{stun}</>秒）",
+            [{'key': 'atk', 'value': 0.8}, {'key': 'attack_speed', 'value': 35.0}, {'key': 'duration', 'value': 30.0},
+             {'key': 'prob', 'value': 0.155}, {'key': 'stun', 'value': 1.5}],
+        )] * 1000
+
+    # 結果が変わっていないことを確認
+    mismatches = sum(1 for desc, bb in samples if _legacy_render(desc, bb) != render(desc, bb))
+    print(f"サンプル {len(samples)} 件 / 結果の不一致 {mismatches} 件")
+
+    rounds = 5
+    legacy = min(timeit.repeat(lambda: [_legacy_render(d, bb) for d, bb in samples], number=1, repeat=rounds))
+    compiled = min(timeit.repeat(lambda: [render(d, bb) for d, bb in samples], number=1, repeat=rounds))
+    # ボット (/skill) のように blackboard の dict も使い回す場合
+    prepared = [(compile_template(d), blackboard_dict(bb)) for d, bb in samples]
+    prepared_time = min(timeit.repeat(lambda: [t.render(bb) for t, bb in prepared], number=1, repeat=rounds))
+    for label, elapsed in [("旧方式 (re.sub x3 + 線形探索)", legacy), ("コンパイル済み", compiled), ("コンパイル済み + dict 使い回し", prepared_time)]:
+        print(f"{label:<32} {len(samples) / elapsed:>12,.0f} 件/秒 ({elapsed * 1000:.1f}ms)")
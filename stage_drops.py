@@ -0,0 +1,103 @@
+# stage_drops.py
+# /farm 用の「素材 -> ドロップするステージ」の転置インデックス
+#  - populate_db.py: stage_table.json の各ステージのドロップ (stageDropInfo) を素材ごとに並べ替えて stage_drops に保存する
+#    主キーが (item_id, priority, stage_id) なので、ボットは「WHERE item_id = ? ORDER BY priority LIMIT ?」の
+#    インデックス1回の範囲読み出しでおすすめ順のステージが取れる (並べ替えもしない)
+#  - ボット: ドロップのある素材の名前だけカタログに読み込んで、オートコンプリートに使う
+import json
+import os
+import sqlite3
+
+STAGE_DROPS_TABLE = 'stage_drops'
+ITEMS_TABLE = 'items'
+
+# dropType (数値のデータと文字列のデータがある) -> 文字列
+DROP_TYPES = {1: "ONCE", 2: "NORMAL", 3: "SPECIAL", 4: "ADDITIONAL", 8: "COMPLETE"}
+# 周回で手に入るドロップの種類 (初回・全滅報酬は除く)。数字が小さいほどおすすめ
+DROP_TYPE_RANKS = {"NORMAL": 0, "SPECIAL": 1, "ADDITIONAL": 2}
+DROP_TYPE_LABELS = {"NORMAL": "通常", "SPECIAL": "特別", "ADDITIONAL": "追加"}
+# occPercent (数値は 0 = ALWAYS 〜 4 = SOMETIMES) -> 文字列
+OCCURRENCES = ("ALWAYS", "ALMOST", "USUAL", "OFTEN", "SOMETIMES")
+OCCURRENCE_LABELS = {"ALWAYS": "確定", "ALMOST": "高確率", "USUAL": "中確率", "OFTEN": "低確率", "SOMETIMES": "ごく稀"}
+# 常設のステージ (イベントのステージより優先する)
+PERMANENT_STAGE_TYPES = {"MAIN", "SUB", "DAILY"}
+STAGE_TYPE_LABELS = {"MAIN": "メイン", "SUB": "サイド", "DAILY": "資源調達", "ACTIVITY": "イベント", "CAMPAIGN": "殲滅作戦"}
+
+
+def _normalize(value, names):
+    """数値または文字列の区分を文字列にそろえる (names は数値 -> 文字列の dict またはタプル)"""
+    if isinstance(value, int):
+        if isinstance(names, dict):
+            return names.get(value)
+        return names[value] if 0 <= value < len(names) else None
+    return value
+
+
+def drop_priority(drop_type: str, occurrence: str, stage_type: str, ap_cost: int) -> int:
+    """おすすめ順の並べ替えキー (小さいほど上)
+
+    ドロップの種類 → 出やすさ → 常設かどうか → 消費理性 の順に比べる。
+    """
+    occurrence_rank = OCCURRENCES.index(occurrence) if occurrence in OCCURRENCES else len(OCCURRENCES)
+    temporary = 0 if stage_type in PERMANENT_STAGE_TYPES else 1
+    return ((DROP_TYPE_RANKS[drop_type] * 10 + occurrence_rank) * 10 + temporary) * 1000 + min(max(ap_cost, 0), 999)
+
+
+def build_stage_drops(cursor, stage_table_path: str) -> tuple[int, int] | None:
+    """stage_table.json から stage_drops を作り直す (ステージの数, 行数) を返す (ファイルが無ければ None)
+
+    stage_table.json は大きいので、この関数の中で読み込んで、抜ける時に捨てる。
+    """
+    if not os.path.exists(stage_table_path):
+        return None
+    with open(stage_table_path, 'r', encoding='utf-8') as f:
+        stages = json.load(f).get('stages', {})
+    cursor.execute(f"DELETE FROM {STAGE_DROPS_TABLE}")
+
+    best = {} # (item_id, stage_id) -> 行 (同じステージに同じ素材が複数の種類で出る場合は一番おすすめのもの)
+    stage_count = 0
+    for stage_id, stage in stages.items():
+        ap_cost = stage.get('apCost') or 0
+        # 強襲作戦 ('#f#') はドロップが通常と同じ。理性を使わないステージ (チュートリアルなど) も除く
+        if stage_id.endswith('#f#') or ap_cost <= 0:
+            continue
+        drop_info = stage.get('stageDropInfo') or {}
+        rewards = drop_info.get('displayDetailRewards') or drop_info.get('displayRewards') or []
+        stage_type = stage.get('stageType')
+        counted = False
+        for reward in rewards:
+            item_id = reward.get('id')
+            drop_type = _normalize(reward.get('dropType'), DROP_TYPES)
+            if not item_id or drop_type not in DROP_TYPE_RANKS:
+                continue
+            occurrence = _normalize(reward.get('occPercent'), OCCURRENCES)
+            row = (
+                item_id, drop_priority(drop_type, occurrence, stage_type, ap_cost), stage_id,
+                stage.get('code'), stage.get('name'), stage_type, ap_cost, drop_type, occurrence,
+            )
+            key = (item_id, stage_id)
+            if key not in best or row[1] < best[key][1]:
+                best[key] = row
+            counted = True
+        stage_count += counted
+
+    cursor.executemany(f"""
+        INSERT OR REPLACE INTO {STAGE_DROPS_TABLE}
+        (item_id, priority, stage_id, code, stage_name, stage_type, ap_cost, drop_type, occurrence)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, best.values())
+    return stage_count, len(best)
+
+
+def load_farm_items(conn) -> list:
+    """ドロップするステージがある素材を [(item_id, 名前), ...] で返す (テーブルが無い古いDBでは空)"""
+    try:
+        return [
+            (row[0], row[1]) for row in conn.execute(f"""
+                SELECT i.item_id, i.name FROM {ITEMS_TABLE} i
+                WHERE EXISTS (SELECT 1 FROM {STAGE_DROPS_TABLE} d WHERE d.item_id = i.item_id)
+                ORDER BY i.sort_id
+            """)
+        ]
+    except sqlite3.OperationalError:
+        return [] # populate_db.py を再実行していない古いDB
@@ -0,0 +1,6 @@
+# tests/conftest.py
+# リポジトリ直下のモジュール (create_db.py など) を import できるようにする
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,47 @@
+# tests/test_catalog_legacy.py
+# populate_db.py を再実行していない古いDB (create_db.py で *_rank カラムだけ足したもの) の能力測定の読み替えを確認する
+import sqlite3
+
+import pytest
+
+import create_db
+from arknights_catalog import OperatorCatalog
+
+# 古いDBでのカラム -> 値 (正しくは mobility=優秀 / endurance=標準 / tactical_acumen=卓越 / combat_skill=普通)
+LEGACY_ROW = {"combat_skill": "優秀", "mobility": "標準", "endurance": "卓越", "tactical_acumen": "普通"}
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    create_db.create_tables(conn.cursor())
+    yield conn
+    conn.close()
+
+
+def insert_operator(conn, char_id, name, values):
+    columns = ["char_id", "name", *values]
+    conn.execute(
+        f"INSERT INTO {create_db.OPERATORS_TABLE} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        (char_id, name, *values.values()),
+    )
+
+
+def test_legacy_rows_are_remapped_after_rank_columns_were_added(conn):
+    insert_operator(conn, "char_001", "オペレーターA", {"physical_strength": "標準", **LEGACY_ROW})
+    record = OperatorCatalog.from_connection(conn).records[0]
+
+    assert (record.mobility, record.endurance, record.tactical_acumen, record.combat_skill) == ("優秀", "標準", "卓越", "普通")
+    assert (record.mobility_rank, record.endurance_rank, record.tactical_acumen_rank, record.combat_skill_rank) == (4, 3, 5, 2)
+    assert record.physical_strength_rank == 3
+
+
+def test_populated_rows_are_left_alone(conn):
+    values = {"mobility": "優秀", "mobility_rank": 4, "combat_skill": "普通", "combat_skill_rank": 2}
+    insert_operator(conn, "char_001", "オペレーターA", values)
+    insert_operator(conn, "char_002", "オペレーターB", {"mobility": "■■"}) # 評価が読めない行は順位が NULL のまま
+    records = {record.char_id: record for record in OperatorCatalog.from_connection(conn).records}
+
+    assert (records["char_001"].mobility, records["char_001"].mobility_rank) == ("優秀", 4)
+    assert (records["char_001"].combat_skill, records["char_001"].combat_skill_rank) == ("普通", 2)
+    assert (records["char_002"].mobility, records["char_002"].mobility_rank) == ("■■", None)
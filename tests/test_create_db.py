@@ -0,0 +1,75 @@
+# tests/test_create_db.py
+# create_db.create_tables() の operators の移行が1つのトランザクションになっているか、使われていないインデックスが無いかを確認する
+import sqlite3
+
+import pytest
+
+import create_db
+
+OLD_OPERATORS_SQL = f"""
+CREATE TABLE {create_db.OPERATORS_TABLE} (
+    name TEXT PRIMARY KEY,
+    char_id TEXT,
+    rarity INTEGER
+)
+"""
+
+
+@pytest.fixture
+def old_db():
+    """name が主キーだった頃の operators テーブルが入ったDB"""
+    conn = sqlite3.connect(":memory:")
+    conn.execute(OLD_OPERATORS_SQL)
+    conn.executemany(
+        f"INSERT INTO {create_db.OPERATORS_TABLE} (name, char_id, rarity) VALUES (?, ?, ?)",
+        [("アーミヤ", "char_002_amiya", 5), ("レガシー", None, 3)],
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def table_names(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_migration_is_committed_by_create_tables(old_db):
+    create_db.create_tables(old_db.cursor())
+    old_db.rollback() # create_tables() の中で commit 済みなので何も戻らない
+
+    assert f"{create_db.OPERATORS_TABLE}_old" not in table_names(old_db)
+    rows = sorted(old_db.execute(f"SELECT char_id, name, rarity FROM {create_db.OPERATORS_TABLE}"))
+    assert rows == [("char_002_amiya", "アーミヤ", 5), ("legacy:レガシー", "レガシー", 3)]
+
+
+def test_failed_migration_leaves_old_table(old_db, monkeypatch):
+    monkeypatch.setattr(create_db, "create_table_sql", "CREATE TABLE broken (")
+    with pytest.raises(sqlite3.OperationalError):
+        create_db.create_tables(old_db.cursor())
+
+    assert f"{create_db.OPERATORS_TABLE}_old" not in table_names(old_db)
+    assert create_db.ORGANIZATIONS_TABLE not in table_names(old_db) # 途中で作ったテーブルも戻る
+    rows = sorted(old_db.execute(f"SELECT name, char_id, rarity FROM {create_db.OPERATORS_TABLE}"))
+    assert rows == [("アーミヤ", "char_002_amiya", 5), ("レガシー", None, 3)]
+
+
+def test_every_index_is_used_by_hot_queries():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    create_db.create_tables(cursor)
+    index_names = {row[0] for row in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+    )} # sql が NULL のものは主キー・UNIQUE の自動インデックス
+    used = " / ".join(" / ".join(plan) for _, plan in create_db.explain_hot_queries(cursor) if plan)
+    conn.close()
+
+    assert [name for name in index_names if name not in used] == []
+
+
+def test_create_tables_drops_old_indexes(old_db):
+    old_db.execute(f"CREATE INDEX idx_operators_name_nocase ON {create_db.OPERATORS_TABLE} (name COLLATE NOCASE)")
+    old_db.commit()
+    create_db.create_tables(old_db.cursor())
+
+    index_names = {row[0] for row in old_db.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert not index_names & set(create_db.dropped_index_names)
@@ -0,0 +1,49 @@
+# tests/test_db_refresh.py
+# ArknightsDB.schedule_refresh() がコマンドを待たせずにバックグラウンドでカタログを作り直すか確認する
+import asyncio
+import sqlite3
+
+import create_db
+from arknights_db import ArknightsDB
+
+
+def write_db(path, version, names):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    create_db.create_tables(cursor)
+    cursor.execute(f"DELETE FROM {create_db.OPERATORS_TABLE}")
+    cursor.executemany(
+        f"INSERT INTO {create_db.OPERATORS_TABLE} (char_id, name) VALUES (?, ?)",
+        [(f"char_{i:03d}", name) for i, name in enumerate(names)],
+    )
+    cursor.execute(f"INSERT OR REPLACE INTO {create_db.META_TABLE} (key, value) VALUES ('data_version', ?)", (version,))
+    conn.commit()
+    conn.close()
+
+
+def test_schedule_refresh_swaps_catalog_in_background(tmp_path):
+    path = str(tmp_path / "arknights_data.db")
+    write_db(path, "v1", ["アーミヤ"])
+
+    async def scenario():
+        db = ArknightsDB(path, workers=1)
+        await db.start()
+        old_catalog = db.catalog
+        write_db(path, "v2", ["アーミヤ", "ケルシー"])
+        db._last_version_check = 0.0 # VERSION_CHECK_SEC を待たずに確認させる
+
+        db.schedule_refresh()
+        task = db._refresh_task
+        db.schedule_refresh() # 作り直しの途中なので2つ目は動かさない
+        assert db._refresh_task is task
+        # 戻った時点ではまだ今のカタログのまま
+        assert db.catalog is old_catalog and db.data_version == "v1"
+
+        assert await task is True
+        assert db.catalog is not old_catalog and len(db.catalog) == 2
+        assert db.data_version == "v2"
+
+        db.schedule_refresh() # 確認したばかりなので何もしない
+        assert db._refresh_task is task
+
+    asyncio.run(scenario())
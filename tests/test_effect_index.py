@@ -0,0 +1,75 @@
+# tests/test_effect_index.py
+# EffectIndex.candidates() (bigram のポスティングの積集合) を、説明文を全部調べる素直な実装と突き合わせる
+import sqlite3
+
+import numpy as np
+import pytest
+
+import create_db
+from effect_index import EffectIndex, build_effect_index, normalize_text, text_bigrams
+
+OPERATORS = {
+    "char_a": ("攻撃力+50%、攻撃速度+30", "HPが50%以下の時、防御力+20%", None, "配置中、味方全員の攻撃力+8%", None),
+    "char_b": ("次の通常攻撃時、攻撃力の200%の物理ダメージを与える", None, None, "敵をスタンさせる", "SPを回復する"),
+    "char_c": ("攻撃範囲内の敵全員に術ダメージ", "敵の防御力-30%", "ＳＰを1回復", None, None),
+    "char_d": ("HPを回復する", "防御力が上昇し、HPを持続回復", None, "攻撃力+10%", None),
+}
+
+
+@pytest.fixture
+def index():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    create_db.create_tables(cursor)
+    for char_id, descs in OPERATORS.items():
+        cursor.execute(
+            f"""INSERT INTO {create_db.OPERATORS_TABLE}
+                (char_id, name, skill1_desc, skill2_desc, skill3_desc, talent1_desc, talent2_desc)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (char_id, char_id, *descs),
+        )
+    build_effect_index(cursor)
+    index = EffectIndex.from_connection(conn)
+    conn.close()
+    return index
+
+
+def brute_force(index, query):
+    """query の bigram を全部含む説明文の番号 (説明文をそのまま調べる)"""
+    slots = {"skill1": 0, "skill2": 1, "skill3": 2, "talent1": 3, "talent2": 4}
+    grams = text_bigrams(normalize_text(query))
+    if not grams:
+        return []
+    return [
+        doc_id for doc_id, (char_id, slot) in enumerate(index.docs)
+        if grams <= text_bigrams(normalize_text(OPERATORS[char_id][slots[slot]]))
+    ]
+
+
+@pytest.mark.parametrize("query", [
+    "攻撃力", "攻撃力+", "防御力", "防御力-30%", "回復", "SP", "sp", "ＳＰ", "HP を回復",
+    "スタン", "攻撃力+50%、攻撃速度", "存在しない効果",
+    "",   # 空
+    "攻",  # 1文字は bigram が無い
+    "  ",
+])
+def test_candidates_match_brute_force(index, query):
+    result = index.candidates(query)
+    assert result.dtype == np.int32
+    assert list(result) == brute_force(index, query)
+
+
+def test_candidates_contain_every_real_match(index):
+    # 候補は実際に含む説明文の上位集合 (最後の部分一致の確認は呼び出し側)
+    slots = ("skill1", "skill2", "skill3", "talent1", "talent2")
+    for query in ("攻撃力", "回復する", "敵の防御力"):
+        expected = {
+            doc_id for doc_id, (char_id, slot) in enumerate(index.docs)
+            if normalize_text(query) in normalize_text(OPERATORS[char_id][slots.index(slot)])
+        }
+        assert expected <= set(index.candidates(query).tolist())
+
+
+def test_postings_are_sorted_and_unique(index):
+    for doc_ids in index.postings.values():
+        assert list(doc_ids) == sorted(set(doc_ids))
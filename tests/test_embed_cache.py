@@ -0,0 +1,72 @@
+# tests/test_embed_cache.py
+# EmbedCache (件数上限付きの LRU) の追い出しの順番とヒット/ミスの回数を、OrderedDict を使わない素直な実装と突き合わせる
+import random
+
+import pytest
+
+from embed_cache import EmbedCache
+
+
+class ListLru:
+    """最近使った順のリストで持つだけの LRU (比較用)"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = [] # [(キー, 値), ...] 末尾ほど最近使った
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        for i, (entry_key, value) in enumerate(self.entries):
+            if entry_key == key:
+                self.entries.append(self.entries.pop(i))
+                self.hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.entries = [entry for entry in self.entries if entry[0] != key] + [(key, value)]
+        del self.entries[:max(len(self.entries) - self.maxsize, 0)]
+
+
+@pytest.mark.parametrize("maxsize", [1, 3, 8])
+def test_random_operations_match_reference(maxsize):
+    rng = random.Random(maxsize)
+    cache, reference = EmbedCache(maxsize), ListLru(maxsize)
+    for step in range(2000):
+        key = rng.randrange(12)
+        if rng.random() < 0.6:
+            assert cache.get(key) == reference.get(key), step
+        else:
+            cache.put(key, step)
+            reference.put(key, step)
+        assert len(cache) == len(reference.entries)
+    assert (cache.hits, cache.misses) == (reference.hits, reference.misses)
+
+
+def test_eviction_order():
+    cache = EmbedCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1 # a を使ったので、次に追い出されるのは b
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    cache.put("a", 10) # 上書きも「使った」扱い
+    cache.put("d", 4)
+    assert cache.get("c") is None and cache.get("a") == 10
+
+
+def test_clear_keeps_counters():
+    cache = EmbedCache(4)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    cache.clear()
+    assert len(cache) == 0 and cache.get("a") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.stats() == "0/4 件, ヒット 1 / ミス 2 (33.3%)"
+
+
+def test_stats_without_lookups():
+    assert EmbedCache(3).stats() == "0/3 件, ヒット 0 / ミス 0 (0.0%)"
@@ -0,0 +1,67 @@
+# tests/test_enemy_mentions.py
+# OperatorCatalog.enemies_in_text() (GeminiChat の敵の名前探し) が普通の単語や長い名前の一部に反応しないか確かめる
+import pytest
+
+from arknights_catalog import OperatorCatalog, EnemyRecord
+
+ENEMIES = [
+    # (enemy_id, 名前, 区分, sort_id)
+    ("enemy_1000_gopro", "ソルジャー", "NORMAL", 1),
+    ("enemy_1001_dog", "猟犬", "NORMAL", 2),
+    ("enemy_1002_slug", "ナメクジ", "NORMAL", 3),
+    ("enemy_1003_mage", "術師", "NORMAL", 4),
+    ("enemy_1501_skull", "スカルシュレッダー", "BOSS", 5),
+    ("enemy_1502_crown", "クラウンスレイヤー", "BOSS", 6),
+    ("enemy_1503_talu", "タルラ", "BOSS", 7),
+    ("enemy_1504_cqbw", "W", "BOSS", 8),
+    ("enemy_1505_mon3tr", "Mon3tr", "BOSS", 8),
+    ("enemy_1506_frstar", "フロストノヴァ", "BOSS", 9),
+    ("enemy_2001_duckmi", "ダック卿", "ELITE", 10),
+]
+
+
+@pytest.fixture
+def catalog():
+    enemies = [
+        EnemyRecord({"enemy_id": enemy_id, "name": name, "enemy_level": level, "sort_id": sort_id})
+        for enemy_id, name, level, sort_id in ENEMIES
+    ]
+    return OperatorCatalog([], [], enemies=enemies)
+
+
+def names(records):
+    return [record.name for record in records]
+
+
+def test_boss_mentioned_in_sentence(catalog):
+    assert names(catalog.enemies_in_text("スカルシュレッダーについて教えて")) == ["スカルシュレッダー"]
+    assert names(catalog.enemies_in_text("タルラとフロストノヴァ、どっちが強い？")) == ["フロストノヴァ", "タルラ"]
+    assert names(catalog.enemies_in_text("ダック卿の倒し方は？")) == ["ダック卿"]
+
+
+def test_short_normal_enemies_are_not_mentions(catalog):
+    # 「猟犬」「術師」は普通の単語なので、通常の敵としては拾わない (4文字未満)
+    assert catalog.enemies_in_text("猟犬みたいな術師オペレーターっている？") == []
+    # 4文字以上の通常の敵は拾う
+    assert names(catalog.enemies_in_text("ソルジャーが多い")) == ["ソルジャー"]
+
+
+def test_name_inside_longer_word_is_not_a_mention(catalog):
+    # カタカナの名前の前後にカタカナが続く場合は別の単語
+    assert catalog.enemies_in_text("タルラフィンって誰？") == []
+    assert catalog.enemies_in_text("ナメクジラの話") == []
+    # 英字の名前は英単語の一部なら拾わない
+    assert catalog.enemies_in_text("Mon3trs and Mon3tr2") == []
+    assert names(catalog.enemies_in_text("Mon3trの攻撃力は？")) == ["Mon3tr"]
+    # 1文字の名前はボスでも拾わない
+    assert catalog.enemies_in_text("W って強い？") == []
+
+
+def test_width_and_case_are_folded(catalog):
+    assert names(catalog.enemies_in_text("ＭＯＮ３ＴＲ って強い？")) == ["Mon3tr"]
+    assert names(catalog.enemies_in_text("ｸﾗｳﾝｽﾚｲﾔｰの技")) == ["クラウンスレイヤー"]
+
+
+def test_limit(catalog):
+    text = "スカルシュレッダー、クラウンスレイヤー、フロストノヴァ、タルラ"
+    assert names(catalog.enemies_in_text(text, limit=2)) == ["スカルシュレッダー", "クラウンスレイヤー"]
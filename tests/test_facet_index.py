@@ -0,0 +1,96 @@
+# tests/test_facet_index.py
+# FacetIndex (ビットマップの絞り込み・件数・キーセット方式のページング) を、レコードを全部調べる素直な実装と突き合わせる
+import pytest
+
+from arknights_catalog import FacetIndex
+
+
+class Record(dict):
+    """OperatorRecord と同じように record.name でも record['name'] でも読めるレコード"""
+    __getattr__ = dict.get
+
+
+CLASSES = ["先鋒", "前衛", "重装", "狙撃", "術師", "医療"]
+AFFILIATIONS = ["ロドス", "龍門近衛局", "レユニオン", None]
+RECORDS = [
+    Record(
+        char_id=f"char_{i:03d}", name=f"オペレーター{i:02d}", rarity=i % 6 + 1,
+        operator_class=CLASSES[i % len(CLASSES)], archetype=f"職分{i % 4}",
+        affiliation=AFFILIATIONS[i % len(AFFILIATIONS)], race="ヴイーヴル" if i % 5 == 0 else "ペッロー",
+    )
+    for i in range(37)
+]
+
+
+@pytest.fixture
+def index():
+    return FacetIndex(RECORDS)
+
+
+def brute_force(filters):
+    """表示順 (レアリティ降順 → 名前順) に並べて、条件を全部満たすレコードだけ残す"""
+    ordered = sorted(RECORDS, key=lambda r: (-(r.rarity or 0), r.name or "", r.char_id or ""))
+    return [r for r in ordered if all(value is None or r[facet] == value for facet, value in filters.items())]
+
+
+def read_all_pages(index, mask, limit):
+    """start を次のページの位置に進めながら最後のページまで読む"""
+    records, start, pages = [], 0, 0
+    while start is not None:
+        page, start = index.page(mask, start, limit)
+        records.extend(page)
+        pages += 1
+        assert len(page) <= limit
+    return records, pages
+
+
+FILTERS = [
+    {},
+    {"rarity": 6},
+    {"operator_class": "術師"},
+    {"operator_class": "術師", "rarity": 5},
+    {"affiliation": "ロドス", "race": "ヴイーヴル"},
+    {"operator_class": "医療", "affiliation": "レユニオン", "archetype": "職分1"},
+    {"operator_class": "医療", "rarity": 1}, # 該当者なし
+    {"affiliation": None, "operator_class": "前衛"}, # 値が None の条件は無視
+]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("limit", [1, 4, 10, 100])
+def test_pages_match_brute_force(index, filters, limit):
+    expected = brute_force(filters)
+    records, pages = read_all_pages(index, index.mask(filters), limit)
+    assert records == expected
+    assert pages == max(1, -(-len(expected) // limit))
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_counts_match_brute_force(index, filters):
+    for facet in index.facets:
+        others = {key: value for key, value in filters.items() if key != facet}
+        values = {r[facet] for r in RECORDS if r[facet] not in (None, "")}
+        expected = [(value, len(brute_force({**others, facet: value}))) for value in values]
+        expected = sorted((item for item in expected if item[1]), key=lambda item: (-item[1], str(item[0])))
+        assert index.counts(facet, filters) == expected
+
+
+def test_last_page_has_no_next(index):
+    mask = index.mask({"operator_class": "狙撃"})
+    total = bin(mask).count("1")
+    page, next_start = index.page(mask, 0, total)
+    assert len(page) == total and next_start is None
+    # 最後の1件の直前から読むと、その1件だけ返る
+    _, start = index.page(mask, 0, total - 1)
+    page, next_start = index.page(mask, start, 10)
+    assert len(page) == 1 and next_start is None
+
+
+def test_empty_mask(index):
+    assert index.page(0, 0, 10) == ([], None)
+    assert index.mask({"rarity": 7}) == 0
+
+
+def test_resolve_normalizes_values(index):
+    assert index.resolve("affiliation", "ﾛﾄﾞｽ") == "ロドス"
+    assert index.mask({"affiliation": "ろどす"}) == index.mask({"affiliation": "ロドス"})
@@ -0,0 +1,87 @@
+# tests/test_material_planner.py
+# MaterialPlanner の基本素材への分解 (多段の加工・レシピの無い素材・メモ化・LRU キャッシュ) を小さなレシピで確かめる
+from fractions import Fraction
+
+import pytest
+
+from material_planner import MaterialPlanner, GOLD_ITEM_ID, COST_ELITE, COST_SKILL, COST_MASTERY
+
+# 基本素材: ORE / DEVICE / SUGAR、加工品: ORE_PLUS (2段目)、ORE_MAX (3段目)、DEVICE_PAIR (1回で2個できる)
+# CHIP はレシピが無い (分解しない)
+ITEMS = [
+    ("ORE", "源岩", 1, 10), ("DEVICE", "装置", 2, 20), ("SUGAR", "糖", 2, 30),
+    ("ORE_PLUS", "上級源岩", 3, 11), ("ORE_MAX", "特級源岩", 5, 12), ("DEVICE_PAIR", "装置セット", 3, 21),
+    ("CHIP", "チップ", 4, 40), (GOLD_ITEM_ID, "龍門幣", 4, 1),
+]
+FORMULAS = [
+    ("ORE_PLUS", 1, 100, {"ORE": 3, "DEVICE": 1}),
+    ("ORE_MAX", 1, 300, {"ORE_PLUS": 2, "SUGAR": 1}),
+    ("DEVICE_PAIR", 2, 50, {"DEVICE": 3}),
+]
+OPERATOR_COSTS = [
+    ("char_a", COST_ELITE, 0, 1, {"ORE_PLUS": 2, GOLD_ITEM_ID: 1000}),
+    ("char_a", COST_ELITE, 0, 2, {"ORE_MAX": 1, "CHIP": 2, GOLD_ITEM_ID: 5000}),
+    ("char_a", COST_SKILL, 0, 2, {"ORE": 4}),
+    ("char_a", COST_MASTERY, 1, 1, {"DEVICE_PAIR": 1}),
+    ("char_b", COST_ELITE, 0, 1, {"ORE_PLUS": 1, "SUGAR": 2}),
+]
+
+
+@pytest.fixture
+def planner():
+    return MaterialPlanner(ITEMS, FORMULAS, OPERATOR_COSTS)
+
+
+def test_expand_base_material_is_itself(planner):
+    assert planner.expand("ORE") == {"ORE": 1}
+    assert planner.expand("CHIP") == {"CHIP": 1} # レシピの無い素材はそのまま
+
+
+def test_expand_multi_level(planner):
+    assert planner.expand("ORE_PLUS") == {"ORE": 3, "DEVICE": 1, GOLD_ITEM_ID: 100}
+    # 特級 = 上級2個 (源岩6, 装置2, 龍門幣200) + 糖1 + 龍門幣300
+    assert planner.expand("ORE_MAX") == {"ORE": 6, "DEVICE": 2, "SUGAR": 1, GOLD_ITEM_ID: 500}
+
+
+def test_expand_formula_with_multiple_outputs(planner):
+    assert planner.expand("DEVICE_PAIR") == {"DEVICE": Fraction(3, 2), GOLD_ITEM_ID: 25}
+
+
+def test_expand_is_memoized(planner):
+    planner.expand("ORE_MAX")
+    assert set(planner._expansions) >= {"ORE_MAX", "ORE_PLUS"} # 途中の加工品も覚えている
+    assert planner.expand("ORE_MAX") is planner.expand("ORE_MAX")
+
+
+def test_plan_totals(planner):
+    direct, base = planner.plan((("char_a", 2, 2, (1, 0, 0)),))
+    assert dict(direct) == {
+        "ORE_PLUS": 2, "ORE_MAX": 1, "CHIP": 2, "ORE": 4, "DEVICE_PAIR": 1, GOLD_ITEM_ID: 6000,
+    }
+    # 源岩 6 + 6 + 4、装置 2 + 2 + 1.5 (切り上げ)、龍門幣 6000 + 200 + 500 + 25
+    assert dict(base) == {"ORE": 16, "DEVICE": 6, "SUGAR": 1, "CHIP": 2, GOLD_ITEM_ID: 6725}
+    assert base[-1][0] == GOLD_ITEM_ID # 龍門幣は最後
+
+
+def test_plan_sums_before_expanding(planner):
+    # 全員分を足してから分解するので、端数の切り上げは1回だけ
+    _, base = planner.plan((("char_a", 0, 1, (1, 0, 0)), ("char_a", 0, 1, (1, 0, 0))))
+    assert dict(base)["DEVICE"] == 3
+    _, base = planner.plan((("char_a", 0, 1, (1, 0, 0)), ("char_b", 1, 1, (0, 0, 0))))
+    assert dict(base) == {"DEVICE": 3, "ORE": 3, "SUGAR": 2, GOLD_ITEM_ID: 125}
+
+
+def test_plan_lru_cache_is_per_instance(planner):
+    targets = (("char_b", 1, 1, (0, 0, 0)),)
+    first = planner.plan(targets)
+    assert planner.plan(targets) is first
+    assert planner.plan.cache_info().hits == 1
+    other = MaterialPlanner(ITEMS, FORMULAS, OPERATOR_COSTS)
+    assert other.plan.cache_info().currsize == 0 # カタログを作り直すと空のキャッシュから始まる
+    assert other.plan(targets) == first
+    assert planner.plan.cache_info().hits == 1
+
+
+def test_cyclic_formula_does_not_recurse_forever():
+    planner = MaterialPlanner(ITEMS, [("X", 1, 0, {"Y": 1}), ("Y", 1, 0, {"X": 2})], [])
+    assert planner.expand("X") == {"X": 2}
@@ -0,0 +1,65 @@
+# tests/test_name_index.py
+# NameIndex.complete() (接頭辞トライ + bigram の転置インデックス) を、全部の名前を毎回調べる素直な実装と突き合わせる
+import pytest
+
+from arknights_catalog import NameIndex
+
+# 正規化しても変わらない名前だけにしておく (正規化そのものは test_name_normalize.py で確かめる)
+NAMES = [
+    "アミヤ", "アステシア", "アステジニ", "アズリウス", "アンジェリナ", "エクシア", "エイヤフィヤトラ",
+    "シャイニング", "シルバアッシュ", "スカジ", "スズラン", "チェン", "ニアル", "ホシグマ", "ヤトウ",
+    "w", "mon3tr", "ace", "ash", "ashlock", "amiya",
+]
+
+
+def brute_force(names, text, limit):
+    """接頭辞が一致する名前 (名前順) → 共有する bigram の割合が大きい順 (同点は長さの差 → 名前順)"""
+    def bigrams(key):
+        if len(key) < 2:
+            return {key} if key else set()
+        return {key[i:i + 2] for i in range(len(key) - 1)}
+
+    names = sorted(set(names))
+    key = text.strip().casefold()
+    prefix = [name for name in names if name.startswith(key)]
+    if len(prefix) >= limit or not key:
+        return prefix[:limit]
+    query_grams = bigrams(key)
+    scored = [(len(query_grams & bigrams(name)), name) for name in names if name not in prefix]
+    ranked = sorted(
+        ((score, name) for score, name in scored if score),
+        key=lambda item: (-item[0] / len(query_grams), abs(len(item[1]) - len(key)), item[1]),
+    )
+    return (prefix + [name for _, name in ranked])[:limit]
+
+
+@pytest.mark.parametrize("text", [
+    "ア", "アス", "アステ", "エ", "シ", "スカジ", "as", "ash", "a", "m", "W",
+    "ステジ",  # 途中一致 (bigram だけ)
+    "ジニ", "リウス", "イニング",
+    "zzz",     # どれにも一致しない
+    "ヤ",      # 1文字で接頭辞に無い
+])
+@pytest.mark.parametrize("limit", [1, 3, 25])
+def test_complete_matches_brute_force(text, limit):
+    index = NameIndex(NAMES, limit=limit)
+    assert index.complete(text) == brute_force(NAMES, text, limit)
+
+
+def test_empty_query_returns_first_names():
+    index = NameIndex(NAMES, limit=5)
+    assert index.complete("") == sorted(NAMES)[:5]
+
+
+def test_prefix_list_is_capped_at_limit():
+    names = [f"name{i:02d}" for i in range(40)]
+    index = NameIndex(names, limit=25)
+    assert index.complete("name") == names[:25]
+    assert index.complete("name3")[:10] == names[30:40] # 接頭辞の一致が先、残りは bigram で補う
+
+
+def test_duplicates_and_empty_names_are_ignored():
+    index = NameIndex(["スカジ", "アミヤ", "アミヤ", "", None])
+    assert index.names == ["アミヤ", "スカジ"]
+    assert index.complete("アミ") == ["アミヤ"]
+    assert index.complete("zz") == []
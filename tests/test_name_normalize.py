@@ -0,0 +1,35 @@
+# tests/test_name_normalize.py
+# normalize_name() の表記ゆれの吸収と、カタログのオートコンプリートがそれを使っていることを確かめる
+import pytest
+
+from name_normalize import normalize_name
+from arknights_catalog import NameIndex
+
+
+@pytest.mark.parametrize("variants, expected", [
+    (["アーミヤ", "ｱｰﾐﾔ", "あーみや", "アミヤ", " アーミヤ "], "アミヤ"),
+    (["シルバーアッシュ", "しるばーあっしゅ", "ｼﾙﾊﾞｰｱｯｼｭ"], "シルバアッシュ"),
+    (["エイヤフィヤトラ", "エイヤ・フィヤトラ", "エイヤ フィヤトラ"], "エイヤフィヤトラ"),
+    (["Mon3tr", "MON3TR", "Ｍｏｎ３ｔｒ", "mon-3tr"], "mon3tr"),
+    (["W", "ｗ", "Ｗ"], "w"),
+    (["ゞ", "ヾ"], "ヾ"),
+])
+def test_variants_share_one_key(variants, expected):
+    assert {normalize_name(variant) for variant in variants} == {expected}
+
+
+@pytest.mark.parametrize("text", ["", None])
+def test_empty(text):
+    assert normalize_name(text) == ""
+
+
+@pytest.mark.parametrize("text", ["アーミヤ", "ｼﾙﾊﾞｰｱｯｼｭ", "Mon3tr", "エイヤ・フィヤトラ", "龍門近衛局"])
+def test_idempotent(text):
+    assert normalize_name(normalize_name(text)) == normalize_name(text)
+
+
+def test_name_index_uses_normalized_keys():
+    index = NameIndex(["アーミヤ", "アステシア", "シルバーアッシュ"])
+    assert index.complete("あーみ") == ["アーミヤ"]
+    assert index.complete("ｼﾙﾊﾞ") == ["シルバーアッシュ"]
+    assert index.complete("") == ["アステシア", "アーミヤ", "シルバーアッシュ"]
@@ -0,0 +1,60 @@
+# tests/test_operator_card.py
+# operator_card.get_card_png() のディスクキャッシュ (内容が変わったら古いカードを消す・ファイル数の上限) を確認する
+import os
+
+import pytest
+
+import operator_card
+from operator_card import CARD_COLUMNS
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(operator_card, "CARD_CACHE_DIR", str(tmp_path))
+    # 描画は重い (フォントも要る) ので、内容のハッシュだけを書いたバイト列で代用する
+    monkeypatch.setattr(operator_card, "render_card", lambda operator: operator_card.card_hash(operator).encode())
+    return tmp_path
+
+
+def make_operator(char_id, **values):
+    operator = {column: None for column in CARD_COLUMNS}
+    operator.update(char_id=char_id, name=char_id, rarity=6, **values)
+    return operator
+
+
+def cached_files(cache_dir):
+    return sorted(os.listdir(cache_dir))
+
+
+def test_cached_card_is_reused(cache_dir):
+    operator = make_operator("char_002_amiya")
+    data = operator_card.get_card_png(operator)
+    with open(os.path.join(cache_dir, cached_files(cache_dir)[0]), "wb") as f:
+        f.write(b"cached") # 2回目はファイルを読むだけ
+
+    assert operator_card.get_card_png(operator) == b"cached"
+    assert data == operator_card.card_hash(operator).encode()
+
+
+def test_changed_card_replaces_old_file(cache_dir):
+    operator_card.get_card_png(make_operator("char_002_amiya", skill1_name="旧スキル"))
+    operator_card.get_card_png(make_operator("char_003_kalts"))
+    updated = make_operator("char_002_amiya", skill1_name="新スキル")
+    operator_card.get_card_png(updated)
+
+    files = cached_files(cache_dir)
+    assert len(files) == 2
+    assert f"{operator_card.card_prefix(updated)}_{operator_card.card_hash(updated)}.png" in files
+
+
+def test_cache_is_capped(cache_dir, monkeypatch):
+    monkeypatch.setattr(operator_card, "CARD_CACHE_MAX_FILES", 3)
+    operators = [make_operator(f"char_{i:03d}") for i in range(5)]
+    for i, operator in enumerate(operators):
+        operator_card.get_card_png(operator)
+        # 保存した順に更新時刻をずらす (同じ秒の中だと順番が決まらないので)
+        path = os.path.join(cache_dir, f"{operator_card.card_prefix(operator)}_{operator_card.card_hash(operator)}.png")
+        os.utime(path, (i, i))
+
+    expected = sorted(f"{operator_card.card_prefix(op)}_{operator_card.card_hash(op)}.png" for op in operators[-3:])
+    assert cached_files(cache_dir) == expected
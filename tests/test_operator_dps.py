@@ -0,0 +1,172 @@
+# tests/test_operator_dps.py
+# DpsTable (NumPy でまとめて計算) を、オペレーター1人ずつ計算する素直な実装と突き合わせる
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from operator_dps import (
+    DpsTable, build_attribute_row, normalize_sp_type, KEYFRAME_WIDTH,
+    MIN_DAMAGE_RATIO, MIN_ATTACK_SPEED, MAX_ATTACK_SPEED,
+)
+
+Record = namedtuple("Record", "char_id operator_class")
+
+
+def keyframes(atk, base_attack_time, attack_speed=100):
+    """昇進段階ごとのキーフレーム (最後の昇進段階の最大レベルだけ atk が最終値になる)"""
+    def frame(level, value):
+        return {"level": level, "data": {"maxHp": 1000, "atk": value, "def": 100, "magicResistance": 0, "cost": 10,
+                                         "blockCnt": 1, "baseAttackTime": base_attack_time, "attackSpeed": attack_speed}}
+    return [{"attributesKeyFrames": [frame(1, atk // 3), frame(50, atk // 2)]},
+            {"attributesKeyFrames": [frame(1, atk // 2), frame(80, atk)]}]
+
+
+# (char_id, クラス, profession, subProfessionId, 攻撃力, 攻撃間隔, 攻撃速度)
+OPERATORS = [
+    ("char_guard", "前衛", "WARRIOR", "fighter", 600, 1.2, 100),
+    ("char_heavy", "前衛", "WARRIOR", "lord", 1200, 1.3, 100),
+    ("char_sniper", "狙撃", "SNIPER", "fastshot", 450, 1.0, 100),
+    ("char_caster", "術師", "CASTER", "corecaster", 700, 1.6, 100),
+    ("char_artsguard", "前衛", "WARRIOR", "artsfghter", 550, 1.25, 110),
+    ("char_medic", "医療", "MEDIC", "physician", 500, 2.85, 100),
+    ("char_noskill", "狙撃", "SNIPER", "fastshot", 380, 1.0, 100),
+]
+# (char_id, スロット): (名前, blackboard, SP, 持続時間, spType (数値と文字列が混ざっている))
+SKILLS = {
+    ("char_guard", 1): ("攻撃力強化", {"atk": 0.5}, 30, 20, 1),
+    ("char_guard", 2): ("強撃", {"atk_scale": 2.0}, 4, 0, 2),
+    ("char_heavy", 1): ("真銀斬", {"atk": 1.0, "base_attack_time": 0.5}, 20, -1, "INCREASE_WITH_TIME"),
+    ("char_sniper", 1): ("速射", {"attack@attack_speed": 45}, 35, 30, "INCREASE_WITH_TIME"),
+    ("char_sniper", 2): ("反撃", {"atk": 0.8}, 10, 15, 4),
+    ("char_caster", 1): ("高速詠唱", {"atk": 0.6, "attack_speed": 30}, 40, 25, 1),
+    ("char_caster", 3): ("一撃", {"attack@atk_scale": 3.2}, 3, 0, "INCREASE_WHEN_ATTACK"),
+    ("char_artsguard", 2): ("術剣", {"atk": 0.7}, 25, 30, 8),
+    ("char_medic", 1): ("治療強化", {"heal_scale": 1.5}, 4, 0, 2),
+}
+
+
+@pytest.fixture
+def table():
+    records, attributes, skills = [], {}, {}
+    for char_id, class_name, profession, archetype, atk, interval, speed in OPERATORS:
+        op_data = {"profession": profession, "subProfessionId": archetype, "phases": keyframes(atk, interval, speed)}
+        _, kind, blob = build_attribute_row(char_id, op_data)
+        # populate_db.py → DB → DpsTable.from_connection() と同じバイト列の往復
+        attributes[char_id] = (kind, np.frombuffer(blob, dtype=np.float32).reshape(-1, KEYFRAME_WIDTH))
+        records.append(Record(char_id, class_name))
+    for key, (name, blackboard, sp, duration, sp_type) in SKILLS.items():
+        skills[key] = (name, blackboard, sp, duration, normalize_sp_type(sp_type))
+    return DpsTable(records, attributes, skills)
+
+
+def scalar_hit(raw, kind, enemy_def, enemy_res):
+    minimum = raw * MIN_DAMAGE_RATIO
+    if kind == "physical":
+        return max(raw - enemy_def, minimum)
+    if kind == "arts":
+        return max(raw * (1 - enemy_res / 100), minimum)
+    return raw
+
+
+def scalar_dps(char_id, enemy_def, enemy_res):
+    """1人分の (ダメージの種類, 通常攻撃, {スロット: (スキル中, 平均)}) をループ無しの式そのままで計算する"""
+    _, _, profession, archetype, atk, base_interval, speed = next(op for op in OPERATORS if op[0] == char_id)
+    kind = "heal" if profession == "MEDIC" else "arts" if profession == "CASTER" or archetype == "artsfghter" else "physical"
+    atk, base_interval = float(np.float32(atk)), float(np.float32(base_interval))
+    interval = base_interval / (min(max(speed, MIN_ATTACK_SPEED), MAX_ATTACK_SPEED) / 100)
+    normal_hit = scalar_hit(atk, kind, enemy_def, enemy_res)
+    normal = normal_hit / interval
+
+    skills = {}
+    for (owner, slot), (_, blackboard, sp, duration, sp_type) in SKILLS.items():
+        if owner != char_id:
+            continue
+        value = lambda key, default=0.0: next((v for k, v in blackboard.items() if k.rpartition('@')[2] == key), default)
+        scale = value("heal_scale" if kind == "heal" else "atk_scale", 1.0)
+        skill_speed = min(max(speed + value("attack_speed"), MIN_ATTACK_SPEED), MAX_ATTACK_SPEED)
+        skill_interval = base_interval * max(1 + value("base_attack_time"), 0.1) / (skill_speed / 100)
+        skill_hit = scalar_hit(atk * (1 + value("atk")) * scale, kind, enemy_def, enemy_res)
+        burst = skill_hit / skill_interval
+
+        sp_type = normalize_sp_type(sp_type)
+        offensive = sp_type == "INCREASE_WHEN_ATTACK"
+        charge = sp * interval if offensive else sp
+        if sp_type not in ("INCREASE_WITH_TIME", "INCREASE_WHEN_ATTACK"):
+            sustained = normal
+        elif duration < 0:
+            sustained = burst
+        elif duration == 0:
+            cycle = (sp + 1) * interval if offensive else max(charge, interval)
+            sustained = normal + (skill_hit - normal_hit) / cycle
+        else:
+            sustained = (normal * charge + burst * duration) / (charge + duration)
+        skills[slot] = (burst, sustained)
+    return kind, normal, skills
+
+
+def scalar_rank(enemy_def, enemy_res, operator_class=None):
+    rows = []
+    for char_id, class_name, *_ in OPERATORS:
+        if operator_class and class_name != operator_class:
+            continue
+        kind, normal, skills = scalar_dps(char_id, enemy_def, enemy_res)
+        if skills:
+            slot = max(sorted(skills), key=lambda s: skills[s][1]) # 同じ値なら小さいスロット (argmax と同じ)
+            rows.append((char_id, kind, skills[slot][1], skills[slot][0], slot))
+        else:
+            rows.append((char_id, kind, normal, normal, None))
+    damage_rows = [row for row in rows if row[1] != "heal"]
+    rows = damage_rows or rows
+    return sorted(rows, key=lambda row: -row[2]) # 安定ソート
+
+
+@pytest.mark.parametrize("enemy_def, enemy_res", [
+    (0, 0), (300, 20), (800, 50),
+    (2000, 0),  # 防御力 > 攻撃力: 物理は攻撃力の5% になる
+    (0, 100),   # 術耐性100: 術も攻撃力の5% になる
+    (5000, 100),
+])
+@pytest.mark.parametrize("operator_class", [None, "前衛", "医療"])
+def test_rank_matches_scalar(table, enemy_def, enemy_res, operator_class):
+    ranked = table.rank(enemy_def, enemy_res, operator_class, limit=len(OPERATORS))
+    expected = scalar_rank(enemy_def, enemy_res, operator_class)
+    assert [(record.char_id, kind, slot) for record, kind, _, _, slot in ranked] == [(row[0], row[1], row[4]) for row in expected]
+    for (_, _, sustained, burst, _), row in zip(ranked, expected):
+        assert sustained == pytest.approx(row[2], rel=1e-6)
+        assert burst == pytest.approx(row[3], rel=1e-6)
+
+
+def test_damage_floor(table):
+    # 防御力が攻撃力を上回っても、物理は攻撃力の5%、術耐性100でも術は攻撃力の5%
+    result = table.operator("char_guard", enemy_def=5000)
+    assert result["normal"] == pytest.approx(600 * MIN_DAMAGE_RATIO / 1.2)
+    result = table.operator("char_caster", enemy_res=100)
+    assert result["normal"] == pytest.approx(700 * MIN_DAMAGE_RATIO / 1.6)
+    # 術は防御力、物理は術耐性の影響を受けない
+    assert table.operator("char_caster", enemy_def=5000)["normal"] == pytest.approx(700 / 1.6)
+    assert table.operator("char_guard", enemy_res=100)["normal"] == pytest.approx(600 / 1.2)
+    # 術耐性は割合で効く
+    assert table.operator("char_caster", enemy_res=40)["normal"] == pytest.approx(700 * 0.6 / 1.6)
+
+
+def test_heal_ignores_defense(table):
+    result = table.operator("char_medic", enemy_def=5000, enemy_res=100)
+    assert result["damage_type"] == "heal"
+    assert result["normal"] == pytest.approx(500 / 2.85)
+
+
+@pytest.mark.parametrize("sp_type, expected", [
+    (1, "INCREASE_WITH_TIME"), (2, "INCREASE_WHEN_ATTACK"), (4, "INCREASE_WHEN_TAKEN_DAMAGE"), (8, "ALWAYS"),
+    ("INCREASE_WHEN_ATTACK", "INCREASE_WHEN_ATTACK"), (16, "16"), (None, None),
+])
+def test_normalize_sp_type(sp_type, expected):
+    assert normalize_sp_type(sp_type) == expected
+
+
+def test_passive_sp_skill_averages_to_normal(table):
+    # 被撃回復 (4) と常時 (8) のスキルは平均 DPS に入れない
+    sniper = table.operator("char_sniper")
+    assert sniper["skills"][1][3] == pytest.approx(sniper["normal"])
+    artsguard = table.operator("char_artsguard")
+    assert artsguard["skills"][0][3] == pytest.approx(artsguard["normal"])
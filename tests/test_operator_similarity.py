@@ -0,0 +1,66 @@
+# tests/test_operator_similarity.py
+# SimilarityIndex.most_similar() (argpartition で上位だけ取り出す) を、行全体を並べ替える素直な実装と突き合わせる
+import sqlite3
+
+import numpy as np
+import pytest
+
+import create_db
+from ability_ratings import ABILITY_COLUMNS
+from operator_similarity import SimilarityIndex, build_similarity_table
+
+SIZE = 20
+
+
+@pytest.fixture
+def index():
+    # 値が重ならない (float16 でも同点が出ない) 対称でない行列
+    rng = np.random.default_rng(0)
+    matrix = (rng.permutation(SIZE * SIZE) / (SIZE * SIZE)).astype(np.float16).reshape(SIZE, SIZE)
+    return SimilarityIndex([f"char_{i:03d}" for i in range(SIZE)], matrix)
+
+
+def brute_force(index, char_id, limit):
+    i = index.char_ids.index(char_id)
+    others = [(float(index.matrix[i, j]), index.char_ids[j]) for j in range(SIZE) if j != i]
+    return [(other, score) for score, other in sorted(others, reverse=True)[:limit]]
+
+
+@pytest.mark.parametrize("limit", [1, 5, SIZE - 1, SIZE + 10])
+@pytest.mark.parametrize("row", [0, 7, SIZE - 1])
+def test_most_similar_matches_brute_force(index, row, limit):
+    char_id = index.char_ids[row]
+    result = index.most_similar(char_id, limit)
+    assert result == brute_force(index, char_id, limit)
+    assert char_id not in [other for other, _ in result]
+
+
+def test_unknown_operator_and_zero_limit(index):
+    assert index.most_similar("char_999", 5) == []
+    assert index.most_similar("char_000", 0) == []
+    assert SimilarityIndex(["char_000"], np.ones((1, 1), dtype=np.float16)).most_similar("char_000", 5) == []
+
+
+def test_populate_round_trip():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    create_db.create_tables(cursor)
+    rank_columns = [f"{column}_rank" for column, _ in ABILITY_COLUMNS]
+    operators = [
+        ("char_a", "A", "術師", "中堅術師", "ロドス", "炎国", "敵に術ダメージを与える", 3),
+        ("char_b", "B", "術師", "中堅術師", "ロドス", "炎国", "敵に術ダメージを与える、攻撃力上昇", 3),
+        ("char_c", "C", "重装", "重盾衛士", "ウルサス", "ウルサス", "防御力が上昇し、HPを回復する", 1),
+    ]
+    for char_id, name, operator_class, archetype, affiliation, birthplace, desc, rank in operators:
+        cursor.execute(
+            f"""INSERT INTO {create_db.OPERATORS_TABLE}
+                (char_id, name, operator_class, archetype, affiliation, birthplace, skill1_desc, {', '.join(rank_columns)})
+                VALUES (?, ?, ?, ?, ?, ?, ?, {', '.join('?' for _ in rank_columns)})""",
+            (char_id, name, operator_class, archetype, affiliation, birthplace, desc, *[rank] * len(rank_columns)),
+        )
+    assert build_similarity_table(cursor) == 3
+    index = SimilarityIndex.from_connection(conn)
+    # 各行は長さ1なので自分自身との類似度は1、同じクラス・所属・説明文の B が A に一番似ている
+    assert np.allclose(np.diag(index.matrix.astype(np.float32)), 1.0, atol=1e-2)
+    assert [other for other, _ in index.most_similar("char_a", 2)] == ["char_b", "char_c"]
+    conn.close()
@@ -0,0 +1,65 @@
+# tests/test_query_plans.py
+# create_db.py の HOT_QUERIES (ボットが実際に投げるSQL) が全部インデックス探索になっているか確認する
+import re
+import sqlite3
+
+import pytest
+
+import create_db
+
+# SEARCH テーブル USING (COVERING) INDEX ... / USING PRIMARY KEY ... / USING INTEGER PRIMARY KEY ...
+INDEX_SEARCH = re.compile(r"^SEARCH \S+ USING (COVERING INDEX|INDEX|PRIMARY KEY|INTEGER PRIMARY KEY)\b")
+# FTS5 の MATCH (テーブル全体のスキャンではなく、全文検索インデックスを引く)
+FTS_MATCH = re.compile(rf"^SCAN {create_db.LORE_FTS_TABLE} VIRTUAL TABLE INDEX \d+:M")
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    create_db.create_tables(cursor)
+    try:
+        cursor.execute(create_db.create_lore_fts_table_sql)
+        cursor.execute(create_db.lore_fts_rank_sql)
+    except sqlite3.OperationalError as e:
+        pytest.skip(f"FTS5 (trigram) が使えない SQLite です: {e}")
+    yield cursor
+    conn.close()
+
+
+def test_hot_queries_use_indexes(cursor):
+    plans = create_db.explain_hot_queries(cursor)
+    assert len(plans) == len(create_db.HOT_QUERIES)
+    for label, plan in plans:
+        assert plan, label
+        for detail in plan:
+            assert INDEX_SEARCH.match(detail) or FTS_MATCH.match(detail), f"{label}: {detail}"
+    assert create_db.verify_query_plans(cursor)
+
+
+def test_verify_query_plans_fails_on_scan(cursor, monkeypatch):
+    monkeypatch.setattr(create_db, "HOT_QUERIES", [
+        ("スキャン", f"SELECT * FROM {create_db.ENEMIES_TABLE} WHERE description = ?", ("x",)),
+    ])
+    assert not create_db.verify_query_plans(cursor)
+
+
+def test_lore_fts_missing_is_skipped():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    create_db.create_tables(cursor)
+    plans = dict(create_db.explain_hot_queries(cursor))
+    assert plans["全文検索"] is None
+    assert create_db.verify_query_plans(cursor)
+    conn.close()
+
+
+def test_old_indexes_are_dropped():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    create_db.create_tables(cursor)
+    cursor.execute(f"CREATE INDEX idx_operators_name_nocase ON {create_db.OPERATORS_TABLE}(name COLLATE NOCASE)")
+    create_db.create_tables(cursor)
+    indexes = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert not indexes & set(create_db.dropped_index_names)
+    conn.close()
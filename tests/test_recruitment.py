@@ -0,0 +1,105 @@
+# tests/test_recruitment.py
+# RecruitIndex.combinations() (ビットマスク) を、タグの集合をそのまま比べる総当たりの計算と突き合わせる
+import itertools
+
+import pytest
+
+from recruitment import (
+    RecruitIndex, parse_recruit_detail, CLASS_TAG_IDS, POSITION_TAG_IDS,
+    TOP_OPERATOR_TAG_ID, SENIOR_OPERATOR_TAG_ID, ROBOT_TAG_ID,
+)
+
+SNIPER, CASTER, MEDIC = CLASS_TAG_IDS["SNIPER"], CLASS_TAG_IDS["CASTER"], CLASS_TAG_IDS["MEDIC"]
+MELEE, RANGED = POSITION_TAG_IDS["MELEE"], POSITION_TAG_IDS["RANGED"]
+STARTER, DPS, HEALING, SUPPORT = 17, 20, 21, 22
+
+TAGS = [
+    (SNIPER, "狙撃タイプ"), (CASTER, "術師タイプ"), (MEDIC, "医療タイプ"),
+    (MELEE, "近距離"), (RANGED, "遠距離"),
+    (TOP_OPERATOR_TAG_ID, "上級エリート"), (SENIOR_OPERATOR_TAG_ID, "エリート"),
+    (STARTER, "初期"), (DPS, "火力"), (HEALING, "治療"), (SUPPORT, "支援"), (ROBOT_TAG_ID, "ロボット"),
+]
+
+# (char_id, レアリティ, タグID)
+POOL = [
+    ("char_six_sniper", 6, [SNIPER, RANGED, TOP_OPERATOR_TAG_ID, DPS]),
+    ("char_six_caster", 6, [CASTER, RANGED, TOP_OPERATOR_TAG_ID, DPS, SUPPORT]),
+    ("char_five_medic", 5, [MEDIC, RANGED, SENIOR_OPERATOR_TAG_ID, HEALING, SUPPORT]),
+    ("char_four_sniper", 4, [SNIPER, RANGED, DPS]),
+    ("char_three_caster", 3, [CASTER, RANGED, DPS]),
+    ("char_three_medic", 3, [MEDIC, RANGED, HEALING]),
+    ("char_two_starter", 2, [SNIPER, RANGED, STARTER, DPS]),
+    ("char_one_robot", 1, [MEDIC, RANGED, ROBOT_TAG_ID, HEALING]),
+    ("char_one_robot_melee", 1, [MELEE, ROBOT_TAG_ID, SUPPORT]),
+]
+
+
+@pytest.fixture
+def index():
+    return RecruitIndex(TAGS, POOL, {char_id: char_id for char_id, _, _ in POOL})
+
+
+def brute_force(tag_ids):
+    """タグの集合とレアリティをそのまま比べて、組み合わせごとの結果を作る"""
+    results = []
+    for size in range(1, len(tag_ids) + 1):
+        for chosen in itertools.combinations(tag_ids, size):
+            allowed = {3, 4, 5}
+            if TOP_OPERATOR_TAG_ID in chosen:
+                allowed.add(6)
+            if ROBOT_TAG_ID in chosen:
+                allowed.add(1)
+            members = [(char_id, rarity) for char_id, rarity, tags in POOL if set(chosen) <= set(tags) and rarity in allowed]
+            if members:
+                members.sort(key=lambda member: -member[1]) # 安定ソート (同じレアリティは POOL の順)
+                results.append((frozenset(chosen), min(rarity for _, rarity in members), [char_id for char_id, _ in members]))
+    return sorted(results, key=lambda result: sorted(result[0]))
+
+
+def as_comparable(results):
+    return sorted(((frozenset(chosen), rarity, records) for chosen, rarity, records in results), key=lambda result: sorted(result[0]))
+
+
+@pytest.mark.parametrize("tag_ids", [
+    [TOP_OPERATOR_TAG_ID, DPS, RANGED],
+    [TOP_OPERATOR_TAG_ID, CASTER, SUPPORT, SNIPER, DPS],
+    [SENIOR_OPERATOR_TAG_ID, HEALING, SUPPORT],
+    [ROBOT_TAG_ID, HEALING, MEDIC, MELEE],
+    [STARTER, SNIPER, DPS, RANGED],
+    [SNIPER, CASTER, MEDIC, MELEE, RANGED],
+])
+def test_combinations_match_brute_force(index, tag_ids):
+    assert as_comparable(index.combinations(tag_ids)) == brute_force(tag_ids)
+
+
+def test_top_operator_only_alone_gives_six_stars(index):
+    results = {chosen: (rarity, records) for chosen, rarity, records in index.combinations([TOP_OPERATOR_TAG_ID])}
+    assert results == {(TOP_OPERATOR_TAG_ID,): (6, ["char_six_sniper", "char_six_caster"])}
+
+
+def test_six_stars_need_top_operator(index):
+    for chosen, _, records in index.combinations([DPS, RANGED, SUPPORT]):
+        assert not {"char_six_sniper", "char_six_caster"} & set(records), chosen
+
+
+def test_nine_hour_timer_drops_one_and_two_stars(index):
+    results = {chosen: records for chosen, _, records in index.combinations([STARTER, MEDIC])}
+    assert (STARTER,) not in results # ★2 しかいない
+    assert results[(MEDIC,)] == ["char_five_medic", "char_three_medic"] # ロボットの ★1 は出ない
+
+
+def test_robot_keeps_one_star(index):
+    results = {chosen: (rarity, records) for chosen, rarity, records in index.combinations([ROBOT_TAG_ID, HEALING])}
+    assert results[(ROBOT_TAG_ID,)] == (1, ["char_one_robot", "char_one_robot_melee"])
+    assert results[(ROBOT_TAG_ID, HEALING)] == (1, ["char_one_robot"])
+    assert results[(HEALING,)] == (3, ["char_five_medic", "char_three_medic"])
+
+
+def test_duplicate_and_extra_tags_are_ignored(index):
+    tag_ids = [DPS, DPS, SNIPER, RANGED, CASTER, MEDIC, SUPPORT]
+    assert as_comparable(index.combinations(tag_ids)) == brute_force([DPS, SNIPER, RANGED, CASTER, MEDIC])
+
+
+def test_parse_recruit_detail():
+    detail = "<@rc.title>公開求人の説明</>\n★\nヤトウ/ノイルホーン\n-----\n★★★★★★\n<@rc.eml>シャイニング</>/ エクシア\n"
+    assert parse_recruit_detail(detail) == {"ヤトウ": 1, "ノイルホーン": 1, "シャイニング": 6, "エクシア": 6}
@@ -0,0 +1,84 @@
+# tests/test_skill_template.py
+# コンパイル済みの説明文 (skill_template.render) を、以前の populate_db.py の replace_skill_value 方式と突き合わせる
+import re
+
+import pytest
+
+from skill_template import render, compile_template, blackboard_dict, render_json
+
+
+def legacy_render(description, blackboard_list):
+    """以前の方式: タグを re.sub で2回消してから、プレースホルダごとに blackboard を先頭から探す"""
+    def replace(match):
+        parts = match.group(1).split(':')
+        key_lower = parts[0].lower()
+        format_str = parts[1] if len(parts) > 1 else None
+        value = None
+        for item in blackboard_list:
+            bb_key = item.get('key')
+            if bb_key and bb_key.lower() == key_lower:
+                value = item.get('value')
+                break
+        if value is None:
+            return match.group(0)
+        try:
+            num_value = float(value)
+            if format_str == '0%': return f"{num_value:.0%}"
+            elif format_str == '0.0%': return f"{num_value:.1%}"
+            elif format_str == '0.0': return f"{num_value:.1f}"
+            elif num_value == int(num_value): return f"{int(num_value)}"
+            else: return f"{num_value}"
+        except (ValueError, TypeError):
+            return f"{value}"
+
+    cleaned = re.sub(r'<.*?>', '', description)
+    cleaned = re.sub(r'\$.*?>', '', cleaned)
+    return re.sub(r'{([^}:]+(?::[\w.%]+)?)}', replace, cleaned).strip()
+
+
+BLACKBOARD = [
+    {'key': 'atk', 'value': 0.8}, {'key': 'attack_speed', 'value': 35.0}, {'key': 'duration', 'value': 30.0},
+    {'key': 'prob', 'value': 0.155}, {'key': 'Stun', 'value': 1.5}, {'key': 'def', 'value': -0.6},
+    {'key': 'atk', 'value': 9.9},          # 同じキーが2回目に出ても最初の値を使う
+    {'key': 'name', 'value': 'ブレイズ'},  # 数値ではない値
+    {'key': 'times', 'value': 3},
+]
+
+
+@pytest.mark.parametrize("description", [
+    "攻撃力+<@ba.vup>{atk:0%}</>、攻撃速度+<@ba.vup>{attack_speed}</>、<@ba.vup>{duration}</>秒間",
+    "攻撃時<@ba.vup>{prob:0.0%}</>の確率で敵を<$ba.stun>スタン</>させる（<@ba.vup>{STUN}</>秒）",
+    "防御力<@ba.vdown>{def:0%}</>、{stun:0.0}秒、{duration:0}秒",
+    "{name}の{times}回攻撃",
+    "{missing}と{missing:0%}はそのまま残る",  # blackboard に無いキー
+    "{atk:0%}{atk}{atk:0.0}{atk:unknown}",       # 知らない書式は書式なし扱い
+    "プレースホルダなし",
+    "  前後の空白 {times}  ",
+    "",
+    "{}{:0%}閉じていない{atk",
+])
+def test_render_matches_legacy(description):
+    assert render(description, BLACKBOARD) == legacy_render(description, BLACKBOARD)
+
+
+def test_missing_keys_are_kept_and_reported():
+    template = compile_template("<@ba.vup>{atk:0%}</>、{nothing}秒、{Nothing:0.0}")
+    blackboard = blackboard_dict(BLACKBOARD)
+    assert template.render(blackboard) == "80%、{nothing}秒、{Nothing:0.0}"
+    assert template.missing_keys(blackboard) == ["{nothing}", "{Nothing:0.0}"]
+    assert template.render({}) == template.text == "{atk:0%}、{nothing}秒、{Nothing:0.0}"
+
+
+def test_blackboard_dict_accepts_list_and_dict():
+    assert blackboard_dict(BLACKBOARD)["atk"] == 0.8
+    assert blackboard_dict({"ATK": 0.5, "duration": 10}) == {"atk": 0.5, "duration": 10}
+    assert blackboard_dict(None) == {} and blackboard_dict([{'key': None, 'value': 1}]) == {}
+
+
+def test_compile_is_cached():
+    assert compile_template("{atk:0%}") is compile_template("{atk:0%}")
+
+
+def test_render_json():
+    assert render_json("攻撃力+{atk:0%}", '{"atk": 0.5}') == "攻撃力+50%"
+    assert render_json("攻撃力+{atk:0%}", None) == "攻撃力+{atk:0%}"